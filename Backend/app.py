@@ -19,8 +19,28 @@ from modules import (
     class_timetable_handler,
     timetable_generator,
     lecture_tt_generator,
+    joint_tt_generator,
+    persistence,
+    schedule_format,
+    timetable_sessions,
+    faculty_timetable,
+    timetable_cache,
+    responses,
+    timetable_export,
+    input_snapshot,
+    db_indexes,
+    bulk_import,
+    generation_pool,
+    health,
+    single_flight,
+    checkpoints,
+    whatif,
+    timetable_history,
 )
 
+# One JSON encoder for every handler: ObjectId/datetime aware, orjson-backed
+app.json = responses.FastJSONProvider(app)
+
 
 # ============================================================================
 # HOME
@@ -58,6 +78,11 @@ def delete_faculty():
     return faculty_handler.delete_faculty(data)
 
 
+@app.route('/api/faculty/bulk', methods=['POST'])
+def bulk_import_faculty():
+    return bulk_import.bulk_import('faculty', request)
+
+
 # ============================================================================
 # LABS
 # ============================================================================
@@ -85,6 +110,11 @@ def delete_lab():
     return labs_handler.delete_lab(data)
 
 
+@app.route('/api/labs/bulk', methods=['POST'])
+def bulk_import_labs():
+    return bulk_import.bulk_import('labs', request)
+
+
 @app.route('/api/confirm_labs', methods=['POST'])
 def confirm_labs():
     data = request.json
@@ -133,6 +163,11 @@ def update_subject():
     return subjects_handler.update_subject(data)
 
 
+@app.route('/api/subjects/bulk', methods=['POST'])
+def bulk_import_subjects():
+    return bulk_import.bulk_import('subjects', request)
+
+
 # ============================================================================
 # FACULTY WORKLOAD
 # ============================================================================
@@ -160,60 +195,151 @@ def update_faculty_workload():
     return workload_handler.update_faculty_workload(data)
 
 
+@app.route('/api/faculty_workload/bulk', methods=['POST'])
+def bulk_import_workload():
+    return bulk_import.bulk_import('workload', request)
+
+
 # ============================================================================
 # MASTER PRACTICAL TIMETABLE — main generation pipeline
 # ============================================================================
 
 @app.route('/api/regenerate_master_practical_timetable', methods=['POST'])
 def regenerate_master_practical_timetable():
+    # One pipeline at a time across all workers (single_flight); it runs on
+    # the generation pool, not on a request thread (generation_pool).
+    # Requests share a run only if it generates from the same inputs, so
+    # the run uses exactly the inputs its key was computed from.
+    options = request.get_json(silent=True) or {}
+    inputs  = input_snapshot.InputSnapshot.load()
+    return single_flight.run(single_flight.request_key(options, inputs.fingerprint),
+                             lambda: generation_pool.run(_regenerate, inputs))
+
+
+def _regenerate(inputs=None):
     """
     Full pipeline:
       1. Snapshot existing data (for rollback)
-      2. Delete existing timetables
-      3. timetable_generator   → practicals → master_lab_timetable
-      4. class_timetable_handler → class timetables
-      5. lecture_tt_generator  → lectures merged into class timetables
-
-    AP-01 FIX: if step 4 or 5 raises an unrecoverable error the collections
-    that were cleared in step 2 are restored from the snapshot taken before
-    deletion, leaving the DB in its original state instead of empty.
+      2. timetable_generator   → practicals → master_lab_timetable
+      3. class_timetable_handler → class timetables (in memory)
+      4. lecture_tt_generator  → lectures merged into class timetables
+
+    Saves are diff-based (persistence.sync_many): only documents whose
+    content fingerprint changed are rewritten, and labs/classes that no
+    longer exist are deleted.  The response reports the counts.
+
+    A run that changes stored documents stamps a new timetable version,
+    which invalidates the ETags and cached bodies of the read endpoints
+    (timetable_cache); one that changes nothing leaves them valid.  A
+    successful run is also recorded in the version history
+    (timetable_history); the response carries its number.
+
+    AP-01 FIX: if step 3 or 4 raises an unrecoverable error the collections
+    that were written are restored from the snapshot taken before the run,
+    leaving the DB in its original state.
+
+    Optional body:
+      "engine": "joint" replaces steps 3-5 with joint_tt_generator, which
+                places practicals and lectures together (default "staged").
+      "write_concern": {"w": ..., "j": ..., "wtimeout": ...} applied to
+                every bulk save of this run (default: collection's own).
+      "resume": false recomputes every stage instead of resuming from the
+                stage checkpoints (checkpoints.py); staged engine only.
     """
     from config import db
 
-    master_col = db['master_lab_timetable']
-    class_col  = db['class_timetable']
+    options = request.get_json(silent=True) or {}
+    engine  = options.get('engine', 'staged')
+    if engine not in ('staged', 'joint'):
+        return jsonify({"error": f"Unknown engine '{engine}'. "
+                                 f"Use 'staged' or 'joint'."}), 400
+    try:
+        write_concern = persistence.parse_write_concern(options.get('write_concern'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Every collection the pipeline writes to
+    output_cols = [db[name] for name in (
+        'master_lab_timetable', 'class_timetable',
+        'timetable_sessions', 'faculty_timetable',
+    )]
 
     logger.info("=" * 80)
     logger.info("STARTING COMPLETE TIMETABLE GENERATION")
     logger.info("=" * 80)
 
     # ── Snapshot for rollback (AP-01) ────────────────────────────────────────
-    snapshot_master = list(master_col.find({}))
-    snapshot_class  = list(class_col.find({}))
-    logger.info(f"Snapshot taken: {len(snapshot_master)} lab docs, "
-                f"{len(snapshot_class)} class docs")
+    snapshots = {col.name: list(col.find({})) for col in output_cols}
+    logger.info("Snapshot taken: " + ", ".join(
+        f"{len(docs)} {name} docs" for name, docs in snapshots.items()))
+
+    # Whether the run changed stored documents; None (unknown, e.g. the
+    # rollback itself failed) stamps a new version to be safe.
+    changes = {'documents': None}
+    interrupted = timetable_cache.begin_writes()
+
+    # Stage outputs are saved write-behind while the next stage computes.
+    writer = persistence.WriteBehindWriter()
 
     def _rollback(reason: str):
-        """Restore both collections from the pre-run snapshot."""
+        """Restore the timetable collections from the pre-run snapshot."""
         logger.error(f"Rolling back due to: {reason}")
-        master_col.delete_many({})
-        class_col.delete_many({})
-        if snapshot_master:
-            master_col.insert_many(snapshot_master)
-        if snapshot_class:
-            class_col.insert_many(snapshot_class)
-        logger.info("Rollback complete — DB restored to pre-run state")
+        # Let queued saves land first so none of them overwrites the restore
+        writer.join()
+        restored = 0
+        for col in output_cols:
+            before = {doc['_id']: doc for doc in snapshots[col.name]}
+            if {doc['_id']: doc for doc in col.find({})} == before:
+                continue
+            col.delete_many({})
+            if snapshots[col.name]:
+                col.insert_many(snapshots[col.name])
+            restored += 1
+        changes['documents'] = restored
+        logger.info(f"Rollback complete — DB restored to pre-run state "
+                    f"({restored} collection(s) rewritten)")
 
     try:
-        # ── Step 1: Delete existing data ─────────────────────────────────────
-        logger.info("\n[STEP 1] Deleting existing timetables…")
-        deleted_labs    = master_col.delete_many({}).deleted_count
-        deleted_classes = class_col.delete_many({}).deleted_count
-        logger.info(f"✓ Deleted {deleted_labs} lab docs, {deleted_classes} class docs")
+        # Faculty, labs, subjects and workload — read once, shared by all stages
+        inputs = inputs or input_snapshot.InputSnapshot.load()
+
+        if engine == 'joint':
+            writer.join()
+            return _run_joint_engine(_rollback, write_concern, inputs, changes)
+
+        # ── Resume point (checkpoints) ───────────────────────────────────────
+        # Stages whose inputs are unchanged since their last successful run
+        # reuse the checkpointed output and only re-save it.
+        hashes = checkpoints.stage_hashes(inputs.fingerprint)
+        resume = options.get('resume', True) is not False
+        stages = {}
+
+        def _resumed(stage):
+            output = checkpoints.load(stage, hashes[stage]) if resume else None
+            stages[stage] = 'resumed' if output else 'computed'
+            return output
+
+        def _checkpoint(stage, stage_result):
+            stage_result = stage_result or {}
+            if stage_result.get('success'):
+                checkpoints.save(stage, hashes[stage], {
+                    k: v for k, v in stage_result.items() if k != 'persistence'})
+            else:
+                checkpoints.mark_failed(stage, hashes[stage], stage_result.get(
+                    'error') or stage_result.get('message', ''))
 
         # ── Step 2: Generate master practical timetable ──────────────────────
-        logger.info("\n[STEP 2] Generating master practical timetable…")
-        result = timetable_generator.generate()
+        result = _resumed('practical')
+        if result:
+            logger.info("\n[STEP 2] Practical timetable — resumed from checkpoint")
+            for lab_doc in result['lab_timetables']:
+                lab_doc['generated_at'] = datetime.now()
+            timetable_generator.save_lab_timetables(
+                result['lab_timetables'], write_concern, writer)
+        else:
+            logger.info("\n[STEP 2] Generating master practical timetable…")
+            result = timetable_generator.generate(write_concern, writer, inputs)
+            _checkpoint('practical', result)
 
         if not result or not result.get('success'):
             # Step 2 failed — nothing was written yet, no rollback needed
@@ -228,8 +354,15 @@ def regenerate_master_practical_timetable():
         leftovers = result.get("leftovers", {})
 
         # ── Step 3: Build class timetables ───────────────────────────────────
-        logger.info("\n[STEP 3] Building class timetables…")
-        class_result = class_timetable_handler.generate_class_timetables()
+        class_result = _resumed('class')
+        if class_result:
+            logger.info("\n[STEP 3] Class timetables — resumed from checkpoint")
+        else:
+            logger.info("\n[STEP 3] Building class timetables…")
+            class_result = class_timetable_handler.generate_class_timetables(
+                write_concern, result.get('lab_timetables'), writer, persist=False)
+            # Saved now: the lecture stage fills these docs in place
+            _checkpoint('class', class_result)
 
         if not class_result.get('success'):
             err = class_result.get('error', 'unknown error')
@@ -243,8 +376,18 @@ def regenerate_master_practical_timetable():
         logger.info(f"✓ {class_result.get('message', '')}")
 
         # ── Step 4: Fill lectures ────────────────────────────────────────────
-        logger.info("\n[STEP 4] Generating lecture timetable…")
-        lecture_result = lecture_tt_generator.generate()
+        lecture_result = _resumed('lecture')
+        if lecture_result:
+            logger.info("\n[STEP 4] Lecture timetable — resumed from checkpoint")
+            lecture_result['persistence'] = lecture_tt_generator.save_class_timetables(
+                lecture_result.pop('class_timetables'), write_concern, writer)
+        else:
+            logger.info("\n[STEP 4] Generating lecture timetable…")
+            lecture_result = lecture_tt_generator.generate(
+                write_concern, class_result.get('class_timetables'), writer, inputs)
+            # The checkpoint keeps the finished timetables for a resumed run
+            _checkpoint('lecture', {**lecture_result,
+                                    'class_timetables': class_result.get('class_timetables')})
 
         if not lecture_result.get('success'):
             err = lecture_result.get('error', 'unknown error')
@@ -257,6 +400,21 @@ def regenerate_master_practical_timetable():
 
         logger.info(f"✓ {lecture_result.get('message', '')}")
 
+        # ── Wait for write-behind saves ──────────────────────────────────────
+        write_errors = writer.join()
+        if write_errors:
+            err = "; ".join(str(e) for e in write_errors)
+            logger.error(f"✗ Saving timetables failed: {err}")
+            _rollback(f"write-behind save failed: {err}")
+            return jsonify({
+                "error":  "Failed to save generated timetables.",
+                "detail": err,
+            }), 500
+        saved = persistence.summarise(writer.results)
+        changes['documents'] = saved['documents_changed']
+        version = timetable_history.record_generation(
+            'staged', leftovers, lecture_result.get('leftovers', {}))
+
         # ── Build response ───────────────────────────────────────────────────
         logger.info("\n" + "=" * 80)
         logger.info("✅ COMPLETE TIMETABLE GENERATION FINISHED")
@@ -272,7 +430,9 @@ def regenerate_master_practical_timetable():
 
         return jsonify({
             "message":              response_message,
-            "deleted_records":      deleted_labs,
+            "deleted_records":      sum(c['deleted'] for c in saved['collections'].values()),
+            "documents_changed":    saved['documents_changed'],
+            "persistence":          saved,
             "labs_generated":       result.get('labs_generated', 0),
             "practicals_scheduled": result.get('practicals_scheduled', 0),
             "class_timetables": {
@@ -287,6 +447,8 @@ def regenerate_master_practical_timetable():
                 "leftovers":          lecture_result.get('leftovers', {}),
             },
             "practical_leftovers": leftovers,
+            "stages":              stages,
+            "version":             version,
         }), status_code
 
     except Exception as e:
@@ -294,14 +456,171 @@ def regenerate_master_practical_timetable():
         _rollback(f"unexpected exception: {e}")
         return jsonify({"error": str(e)}), 500
 
+    finally:
+        # Cached read responses go stale only if stored documents changed:
+        # then start a new version and pre-render it for every worker.
+        timetable_cache.end_writes(interrupted or changes['documents'] != 0,
+                                   _snapshot_builders())
+
+
+def _run_joint_engine(rollback, write_concern=None, inputs=None, changes=None):
+    """
+    Steps 2-4 of the pipeline in one pass — see joint_tt_generator.
+    changes['documents'] is set to the number of documents it changed.
+    """
+    logger.info("\n[STEP 2] Generating practicals and lectures jointly…")
+    result = joint_tt_generator.generate(write_concern, inputs)
+
+    if not result.get('success'):
+        err = result.get('error', 'unknown error')
+        logger.error(f"✗ Joint generation failed: {err}")
+        rollback(f"joint generation failed: {err}")
+        return jsonify({
+            "error":  ("Failed to generate timetable. "
+                       "Verify subject, faculty, and workload data."),
+            "detail": err,
+        }), 400
+
+    logger.info("\n" + "=" * 80)
+    logger.info("✅ COMPLETE TIMETABLE GENERATION FINISHED (joint engine)")
+    logger.info("=" * 80)
+
+    leftovers        = result.get('leftovers', {})
+    status_code      = 201
+    response_message = "Timetable regenerated successfully!"
+    if leftovers:
+        unscheduled      = sum(len(v) for v in leftovers.values())
+        response_message = (f"Timetable generated, but {unscheduled} practical "
+                            f"session(s) could not be scheduled.")
+        status_code = 206
+
+    saved = persistence.summarise(result.get('persistence', []))
+    if changes is not None:
+        changes['documents'] = saved['documents_changed']
+    version = timetable_history.record_generation(
+        'joint', leftovers, result.get('lecture_leftovers', {}))
+    return jsonify({
+        "message":              response_message,
+        "engine":               "joint",
+        "deleted_records":      sum(c['deleted'] for c in saved['collections'].values()),
+        "documents_changed":    saved['documents_changed'],
+        "persistence":          saved,
+        "labs_generated":       result.get('labs_generated', 0),
+        "practicals_scheduled": result.get('practicals_scheduled', 0),
+        "class_timetables": {
+            "success":            True,
+            "message":            f"Generated {result.get('timetables_created', 0)} class timetables",
+            "timetables_created": result.get('timetables_created', 0),
+        },
+        "lectures": {
+            "success":            True,
+            "message":            f"Scheduled {result.get('lectures_scheduled', 0)} lectures",
+            "lectures_scheduled": result.get('lectures_scheduled', 0),
+            "leftovers":          result.get('lecture_leftovers', {}),
+        },
+        "practical_leftovers": leftovers,
+        "version":             version,
+    }), status_code
+
+
+# ============================================================================
+# WHAT-IF (dry-run generation — nothing is saved)
+# ============================================================================
+
+@app.route('/api/whatif', methods=['POST'])
+def whatif_generation():
+    """Generate from inline-patched inputs in memory; see whatif.py."""
+    body = request.get_json(silent=True) or {}
+    return generation_pool.run_dry(whatif.run, body, _wants_sparse())
+
+
+# ============================================================================
+# VERSION HISTORY (every published generation — see timetable_history.py)
+# ============================================================================
+
+@app.route('/api/timetable_versions', methods=['GET'])
+def get_timetable_versions():
+    """Newest first, without payload.  ?limit=N (default 50)."""
+    return timetable_history.get_versions(request.args)
+
+
+@app.route('/api/timetable_versions/<int:version>', methods=['GET'])
+def get_timetable_version(version):
+    """Lab and class timetables as published in `version`."""
+    return timetable_history.get_version(version, _wants_sparse())
+
+
+@app.route('/api/timetable_versions/<int:a>/diff/<int:b>', methods=['GET'])
+def diff_timetable_versions(a, b):
+    return timetable_history.get_diff(a, b)
+
+
+@app.route('/api/timetable_versions/<int:version>/rollback', methods=['POST'])
+def rollback_timetable_version(version):
+    # Takes the generation lease: a rollback must not interleave with a run
+    return single_flight.run(f"rollback:{version}", lambda: _rollback_to(version))
+
+
+def _rollback_to(version):
+    interrupted = timetable_cache.begin_writes()
+    changed = True
+    try:
+        response, status = timetable_history.rollback(version)
+        # 404: nothing restored; 500: unknown, so stamp
+        changed = status == 500 or (
+            status == 200 and response.get_json()['documents_changed'] > 0)
+        return response, status
+    finally:
+        timetable_cache.end_writes(interrupted or changed, _snapshot_builders())
+
 
 # ============================================================================
 # MASTER TIMETABLE (read-only)
 # ============================================================================
 
+def _wants_sparse() -> bool:
+    """Clients opt in to the sparse schedule form with ?format=sparse."""
+    return request.args.get('format') == 'sparse'
+
+
+def _cache_key(path: str, sparse: bool) -> str:
+    """Key of a read response in timetable_cache / the response snapshot."""
+    return f"{path}?format=sparse" if sparse else path
+
+
+def _snapshot_builders() -> dict:
+    """
+    Every dense read response, keyed like the endpoints below key them —
+    what the pipeline pre-renders into the shared response snapshot.
+    """
+    from config import db
+    builders = {
+        'master_timetables':  lambda: timetable_handler.get_master_practical_timetable(False),
+        'class_timetables':   lambda: _all_class_timetables(False),
+        'faculty_timetables': lambda: faculty_timetable.get_all_faculty_timetables(False),
+    }
+    for t in db['class_timetable'].find({}, {'class': 1, 'division': 1}):
+        c, d = t['class'], t['division']
+        builders[f'class_timetable/{c}/{d}'] = (
+            lambda c=c, d=d: _class_timetable(c, d, False))
+    for fid in db['faculty_timetable'].distinct('faculty_id'):
+        builders[f'faculty_timetable/{fid}'] = (
+            lambda fid=fid: faculty_timetable.get_faculty_timetable(fid, False))
+    return builders
+
+
 @app.route('/api/master_timetables', methods=['GET'])
 def get_all_master_timetables():
-    return timetable_handler.get_master_practical_timetable()
+    sparse = _wants_sparse()
+    return timetable_cache.cached_response(
+        _cache_key('master_timetables', sparse),
+        lambda: timetable_handler.get_master_practical_timetable(sparse))
+
+
+@app.route('/api/master_timetables/stream', methods=['GET'])
+def stream_master_timetables():
+    """NDJSON, one lab timetable per line (see responses.ndjson_response)."""
+    return timetable_handler.stream_master_practical_timetable(_wants_sparse())
 
 
 # ============================================================================
@@ -311,6 +630,13 @@ def get_all_master_timetables():
 @app.route('/api/class_timetable/<class_name>/<division>', methods=['GET'])
 def get_class_timetable_endpoint(class_name, division):
     """GET /api/class_timetable/SY/A"""
+    sparse = _wants_sparse()
+    return timetable_cache.cached_response(
+        _cache_key(f'class_timetable/{class_name.upper()}/{division.upper()}', sparse),
+        lambda: _class_timetable(class_name, division, sparse))
+
+
+def _class_timetable(class_name, division, sparse):
     try:
         if not class_name or not division:
             return jsonify({'error': 'Missing class_name or division'}), 400
@@ -327,11 +653,7 @@ def get_class_timetable_endpoint(class_name, division):
                 'error': f'No timetable found for {class_name.upper()}-{division.upper()}'
             }), 404
 
-        timetable['_id'] = str(timetable['_id'])
-        if 'generated_at' in timetable:
-            timetable['generated_at'] = timetable['generated_at'].isoformat()
-
-        return jsonify(timetable), 200
+        return jsonify(schedule_format.read_doc(timetable, sparse)), 200
 
     except Exception as e:
         logger.error(f"Error fetching class timetable: {e}", exc_info=True)
@@ -340,16 +662,23 @@ def get_class_timetable_endpoint(class_name, division):
 
 @app.route('/api/class_timetables', methods=['GET'])
 def get_all_class_timetables_endpoint():
+    sparse = _wants_sparse()
+    return timetable_cache.cached_response(
+        _cache_key('class_timetables', sparse),
+        lambda: _all_class_timetables(sparse))
+
+
+@app.route('/api/class_timetables/stream', methods=['GET'])
+def stream_class_timetables():
+    """NDJSON, one class timetable per line (see responses.ndjson_response)."""
+    return class_timetable_handler.stream_all_class_timetables(_wants_sparse())
+
+
+def _all_class_timetables(sparse):
     try:
         from config import db
         collection = db['class_timetable']
-        timetables = list(collection.find({}))
-
-        for t in timetables:
-            t['_id'] = str(t['_id'])
-            if 'generated_at' in t:
-                t['generated_at'] = t['generated_at'].isoformat()
-
+        timetables = [schedule_format.read_doc(t, sparse) for t in collection.find({})]
         return jsonify({'total': len(timetables), 'timetables': timetables}), 200
 
     except Exception as e:
@@ -357,6 +686,92 @@ def get_all_class_timetables_endpoint():
         return jsonify({'error': str(e)}), 500
 
 
+# ============================================================================
+# FACULTY TIMETABLE (read-only)
+# ============================================================================
+
+@app.route('/api/faculty_timetable/<faculty_id>', methods=['GET'])
+def get_faculty_timetable(faculty_id):
+    sparse = _wants_sparse()
+    return timetable_cache.cached_response(
+        _cache_key(f'faculty_timetable/{faculty_id}', sparse),
+        lambda: faculty_timetable.get_faculty_timetable(faculty_id, sparse))
+
+
+@app.route('/api/faculty_timetables', methods=['GET'])
+def get_all_faculty_timetables():
+    sparse = _wants_sparse()
+    return timetable_cache.cached_response(
+        _cache_key('faculty_timetables', sparse),
+        lambda: faculty_timetable.get_all_faculty_timetables(sparse))
+
+
+# ============================================================================
+# EXPORT (XLSX / CSV, ?format=xlsx|csv, default xlsx)
+# ============================================================================
+
+@app.route('/api/export/class/<class_name>/<division>', methods=['GET'])
+def export_class_timetable(class_name, division):
+    return timetable_export.export_class(class_name, division)
+
+
+@app.route('/api/export/lab/<lab_name>', methods=['GET'])
+def export_lab_timetable(lab_name):
+    return timetable_export.export_lab(lab_name)
+
+
+@app.route('/api/export/faculty/<faculty_id>', methods=['GET'])
+def export_faculty_timetable(faculty_id):
+    return timetable_export.export_faculty(faculty_id)
+
+
+@app.route('/api/export/institution', methods=['GET'])
+def export_institution_timetables():
+    return timetable_export.export_institution()
+
+
+# ============================================================================
+# TIMETABLE SESSIONS (read-only, flattened)
+# ============================================================================
+
+@app.route('/api/timetable_sessions', methods=['GET'])
+def get_timetable_sessions():
+    """
+    GET /api/timetable_sessions?faculty_id=F01
+    GET /api/timetable_sessions?lab=DBMS Lab&day=Tuesday&slot=14:15
+    GET /api/timetable_sessions?class=TY&division=B&batch=2
+    """
+    return timetable_sessions.get_sessions(request.args)
+
+
+# ============================================================================
+# INDEXES (read-only report)
+# ============================================================================
+
+@app.route('/api/indexes', methods=['GET'])
+def get_index_report():
+    """Declared vs existing indexes per collection (see db_indexes)."""
+    try:
+        return jsonify(db_indexes.index_report()), 200
+    except Exception as e:
+        logger.error(f"Index report failed: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# HEALTH (probes for the serving layer — see health.py)
+# ============================================================================
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return health.healthz()
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    return health.readyz()
+
+
 # ============================================================================
 # ERROR HANDLERS
 # ============================================================================
@@ -390,6 +805,15 @@ def internal_error(error):
 # RUN
 # ============================================================================
 
+def startup():
+    """One-off setup before serving; wsgi.py runs it once in the master."""
+    db_indexes.ensure_indexes()
+    # After the indexes: the subject unique index guards the copy
+    subjects_handler.migrate_legacy_subjects()
+
+
+# Development server.  Production: gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == '__main__':
     logger.info("Starting Flask Timetable API…")
+    startup()
     app.run(debug=True)
\ No newline at end of file
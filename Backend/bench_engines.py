@@ -0,0 +1,117 @@
+"""
+Engine benchmark: staged pipeline vs the joint engine.
+
+Builds synthetic institutions (3 years x 3 divisions x 3 batches, 5
+subjects a year, 10 labs, 18 faculty, workload assigned at random from a
+fixed seed), runs both engines on each through solve.generate — no
+database — and reports leftovers and generation time:
+
+    python bench_engines.py [datasets] [repeats]
+    python bench_engines.py --write DIR [seed]
+
+--write saves one dataset as solve.py input files instead, so a single
+case can be rerun or profiled with `python solve.py DIR --repeat N`.
+"""
+
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+from bson import json_util
+
+from modules.input_snapshot import YEARS, InputSnapshot
+from solve import generate
+
+DIVISIONS = ('A', 'B', 'C')
+N_FACULTY = 18
+N_LABS    = 10
+ENGINES   = ('staged', 'joint')
+
+
+def build_dataset(seed: int) -> dict:
+    """solve.py's input files, as Python objects."""
+    rng = random.Random(seed)
+    faculty = [{'_id': f'{i:024x}', 'name': f'Faculty {i}', 'short_name': f'F{i}'}
+               for i in range(N_FACULTY)]
+    labs = [{'name': f'Lab {i}'} for i in range(N_LABS)]
+    subjects = {}
+    for y, yr in enumerate(YEARS):
+        subjects[yr] = []
+        for j in range(5):
+            specific = j == 0
+            subjects[yr].append({
+                'name':                   f'{yr}{j}',
+                'short_name':             f'{yr.upper()}S{j}',
+                'hrs_per_week_lec':       3 if j < 4 else 2,
+                'hrs_per_week_practical': 2,
+                'practical_duration':     2 if j % 2 == 0 else 1,
+                'practical_type':         'Specific Lab' if specific else 'Common Lab',
+                **({'required_labs': labs[y]['name']} if specific else {}),
+            })
+    workload = []
+    for yr in YEARS:
+        for d in DIVISIONS:
+            for s in subjects[yr]:
+                workload.append({
+                    'faculty_id':    rng.choice(faculty)['_id'],
+                    'year':          yr.upper(),
+                    'division':      d,
+                    'subject':       s['short_name'],
+                    'subject_full':  s['name'],
+                    'batches':       [1, 2, 3],
+                    'theory_hrs':    3,
+                    'practical_hrs': 2,
+                })
+    class_structure = {yr: [{'div': d, 'batches': 3} for d in DIVISIONS] for yr in YEARS}
+    return {'faculty': faculty, 'labs': labs, 'subjects': subjects,
+            'workload': workload, 'class_structure': class_structure}
+
+
+def write_dataset(directory: str, seed: int):
+    os.makedirs(directory, exist_ok=True)
+    for name, data in build_dataset(seed).items():
+        with open(os.path.join(directory, f'{name}.json'), 'w', encoding='utf-8') as f:
+            f.write(json_util.dumps(data, indent=2))
+    print(f"✓ Dataset {seed} written to {directory}")
+
+
+def leftover_count(result: dict) -> int:
+    return (sum(len(v) for v in result.get('leftovers', {}).values()) +
+            sum(len(v) for v in result.get('lecture_leftovers', {}).values()))
+
+
+def main():
+    if sys.argv[1:2] == ['--write']:
+        write_dataset(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+        return
+    datasets = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    repeats  = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.disable(logging.CRITICAL)
+
+    totals = {engine: {'leftovers': 0, 'seconds': 0.0} for engine in ENGINES}
+    print(f"{'dataset':>7}  {'engine':<7} {'leftovers':>9} {'median ms':>10}")
+    for seed in range(1, datasets + 1):
+        data = build_dataset(seed)
+        inputs = InputSnapshot(faculty=data['faculty'], labs=data['labs'],
+                               subjects=data['subjects'], workloads=data['workload'])
+        for engine in ENGINES:
+            runs = []
+            for _ in range(repeats):
+                t = time.perf_counter()
+                result, _ = generate(inputs, engine)
+                runs.append(time.perf_counter() - t)
+            median = statistics.median(runs)
+            totals[engine]['leftovers'] += leftover_count(result)
+            totals[engine]['seconds']   += median
+            print(f"{seed:>7}  {engine:<7} {leftover_count(result):>9} {median * 1000:>10.1f}")
+
+    staged, joint = totals['staged'], totals['joint']
+    print(f"\nTotal leftovers: staged {staged['leftovers']}, joint {joint['leftovers']}")
+    print(f"Runtime joint / staged: {joint['seconds'] / staged['seconds']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
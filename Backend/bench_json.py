@@ -0,0 +1,107 @@
+"""
+Serialization benchmark for the timetable read payload.
+
+Compares the old path (walk every document turning _id / generated_at into
+strings, then Flask's default jsonify) with the app's FastJSONProvider on a
+synthetic full-institution /api/class_timetables payload.  Needs no database:
+
+    python bench_json.py [classes] [repeats]
+"""
+
+import copy
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from modules.responses import FastJSONProvider, orjson
+
+DAYS  = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+SLOTS = ['09:15', '10:15', '11:15', '12:15', '13:15', '14:15', '15:15', '16:20', '17:20']
+
+
+def build_payload(n_classes: int) -> dict:
+    timetables = []
+    for c in range(n_classes):
+        schedule = {day: {slot: [] for slot in SLOTS} for day in DAYS}
+        for d, day in enumerate(DAYS):
+            for s, slot in enumerate(SLOTS):
+                if slot == '13:15':
+                    continue
+                if (c + d + s) % 3 == 0:
+                    for b in (1, 2, 3):
+                        schedule[day][slot].append({
+                            'type': 'practical', 'subject': f'S{s}', 'subject_full': f'Subject {s}',
+                            'batch': b, 'lab': f'Lab {b}', 'faculty': f'F{b}',
+                            'faculty_id': str(ObjectId()), 'subject_id': ObjectId(),
+                        })
+                else:
+                    schedule[day][slot].append({
+                        'type': 'lecture', 'subject': f'S{s}', 'subject_full': f'Subject {s}',
+                        'batch': None, 'lab': None, 'faculty': f'F{d}',
+                        'faculty_id': str(ObjectId()), 'subject_id': ObjectId(),
+                    })
+        timetables.append({
+            '_id': ObjectId(), 'class': f'C{c // 3}', 'division': 'ABC'[c % 3],
+            'class_key': f'C{c // 3}-{"ABC"[c % 3]}', 'schedule': schedule,
+            'total_practicals': 10, 'generated_at': datetime.now(),
+        })
+    return {'total': len(timetables), 'timetables': timetables}
+
+
+def _legacy_convert(payload: dict) -> dict:
+    for t in payload['timetables']:
+        t['_id'] = str(t['_id'])
+        t['generated_at'] = t['generated_at'].isoformat()
+        for day in t['schedule'].values():
+            for sessions in day.values():
+                for e in sessions:
+                    e['subject_id'] = str(e['subject_id'])
+    return payload
+
+
+def _time(fn, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    n_classes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    repeats   = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payload   = build_payload(n_classes)
+
+    legacy_app = Flask('legacy')
+    legacy_app.json = DefaultJSONProvider(legacy_app)
+    fast_app = Flask('fast')
+    fast_app.json = FastJSONProvider(fast_app)
+
+    # The legacy path mutates the documents, so each run gets a fresh copy;
+    # the copy is made outside the timed region.
+    copies = [copy.deepcopy(payload) for _ in range(repeats)]
+
+    def legacy():
+        with legacy_app.app_context():
+            return legacy_app.json.response(_legacy_convert(copies.pop()))
+
+    def fast():
+        with fast_app.app_context():
+            return fast_app.json.response(payload)
+
+    size = len(fast().get_data())
+    t_legacy = _time(legacy, repeats)
+    t_fast   = _time(fast, repeats)
+    print(f"payload: {n_classes} class timetables, {size / 1024:.0f} KiB")
+    print(f"encoder: {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"legacy convert + jsonify : {t_legacy * 1000:8.2f} ms")
+    print(f"FastJSONProvider         : {t_fast * 1000:8.2f} ms")
+    print(f"speedup                  : {t_legacy / t_fast:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
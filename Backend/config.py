@@ -1,6 +1,8 @@
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring
 from dotenv import load_dotenv
+from modules import storage
 
 # Load environment variables from .env
 load_dotenv()
@@ -8,6 +10,176 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# What config.db is backed by: mongo | memory | sqlite (modules/storage.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "timetable.sqlite3")
+
+
+def _env_int(name: str, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+# Pool, timeout and server-selection settings (None → pymongo default)
+CLIENT_OPTIONS = {
+    "maxPoolSize":              _env_int("MONGO_MAX_POOL_SIZE", 50),
+    "minPoolSize":              _env_int("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS":            _env_int("MONGO_MAX_IDLE_TIME_MS", 60_000),
+    "waitQueueTimeoutMS":       _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10_000),
+    "connectTimeoutMS":         _env_int("MONGO_CONNECT_TIMEOUT_MS", 5_000),
+    # Generation writes whole timetables in one bulk_write; no socket
+    # timeout unless configured
+    "socketTimeoutMS":          _env_int("MONGO_SOCKET_TIMEOUT_MS", None),
+    "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5_000),
+    "appname":                  os.getenv("MONGO_APP_NAME", "timetable-api"),
+}
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection-pool counters for this process (served by /readyz)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.open = self.checked_out = 0
+        self.created = self.checkout_failed = self.cleared = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "max_pool_size":   CLIENT_OPTIONS["maxPoolSize"],
+            "open":            self.open,
+            "in_use":          self.checked_out,
+            "created":         self.created,
+            "checkout_failed": self.checkout_failed,
+            "pool_cleared":    self.cleared,
+        }
+
+    # Counters are only ever incremented/decremented: races under threads
+    # cost a miscount, never an error — fine for a probe.
+    def connection_created(self, event):
+        self.open += 1
+        self.created += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failed += 1
+
+    def pool_cleared(self, event):
+        self.cleared += 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+
+pool_stats = PoolStats()
+
+
+# ── Lazy client ──────────────────────────────────────────────────────────────
+# Nothing connects at import time: the client (DNS lookups, monitor threads,
+# pool) is built on first use.  A forked worker gets a fresh client of its
+# own — pymongo clients must not be shared across fork().
+
+_lock = threading.Lock()
+_client = None
+_db = None
+_pid = None
+
+
+def get_client() -> MongoClient:
+    global _client, _db, _pid
+    if _client is None or _pid != os.getpid():
+        with _lock:
+            if _client is None or _pid != os.getpid():
+                if STORAGE_BACKEND == "mongo":
+                    options = {k: v for k, v in CLIENT_OPTIONS.items() if v is not None}
+                    pool_stats.reset()
+                    _client = MongoClient(MONGO_URI, event_listeners=[pool_stats], **options)
+                else:
+                    _client = storage.connect(STORAGE_BACKEND, SQLITE_PATH)
+                _db = _client.get_database(DB_NAME)
+                _pid = os.getpid()
+    return _client
+
+
+def get_db():
+    get_client()
+    return _db
+
+
+def close_client():
+    """Close the pool (graceful shutdown); the next use reconnects."""
+    global _client, _db
+    with _lock:
+        if _client is not None and _pid == os.getpid():
+            _client.close()
+        _client = _db = None
+
+
+def _after_fork_in_child():
+    # The parent's client (and its lock state) is unusable here; drop it
+    # without closing — its sockets belong to the parent.
+    global _client, _db, _lock
+    _lock = threading.Lock()
+    _client = _db = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _LazyCollection:
+    """Collection handle that resolves against the current client per use."""
+
+    __slots__ = ("_name", "_db", "_coll")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._db = None
+        self._coll = None
+
+    def _resolve(self):
+        db_ = get_db()
+        if self._db is not db_:
+            self._coll = db_[self._name]
+            self._db = db_
+        return self._coll
+
+    @property
+    def name(self) -> str:
+        # Known without connecting: CaptureWriter (solve.py, what-if)
+        # keys captured writes by it with no database configured
+        return self._name
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __getitem__(self, sub):
+        return self._resolve()[sub]
+
+    def __repr__(self):
+        return f"<lazy collection {self._name!r}>"
+
+
+class _LazyDatabase:
+    """`db['x']` at import time without connecting; see get_db()."""
+
+    def __getitem__(self, name: str) -> _LazyCollection:
+        return _LazyCollection(name)
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+
+db = _LazyDatabase()
@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+# Pre-fork serving configuration:  gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every setting can be overridden from the environment (see below) or on
+# the gunicorn command line.  Each worker process runs WEB_THREADS request
+# threads plus its own generation and what-if pools (GENERATION_WORKERS,
+# WHATIF_WORKERS, see modules/generation_pool.py), so a long regeneration
+# never takes a request thread away from reads for more than the wait.
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "4"))
+
+# Import the app (and run startup()) once in the master, then fork
+preload_app = True
+
+# gthread workers heartbeat from their main loop, so `timeout` does not cut
+# off long generation requests; graceful_timeout is how long a stopping
+# worker may spend finishing them.
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "200"))
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # The memory storage backend lives inside one process: every worker
+    # would hold its own data and generation lease (modules/storage.py)
+    from config import STORAGE_BACKEND
+    if STORAGE_BACKEND == "memory" and server.cfg.workers > 1:
+        raise SystemExit(f"STORAGE_BACKEND=memory needs a single worker, not "
+                         f"{server.cfg.workers}: set WEB_CONCURRENCY=1 or use "
+                         f"STORAGE_BACKEND=sqlite / mongo")
+
+
+def worker_exit(server, worker):
+    # Graceful shutdown: finish a running generation, then release the pool
+    from config import close_client
+    from modules import generation_pool
+    generation_pool.shutdown()
+    close_client()
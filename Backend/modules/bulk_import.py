@@ -0,0 +1,199 @@
+# bulk_import.py
+# Semester-start imports: many faculty / labs / subjects / workload rows in
+# one request.
+#
+# The body is either a JSON array of the objects the single-row POST
+# endpoints take, or a CSV file (multipart field "file", or a text/csv body)
+# whose header row names the same fields.  Every row goes through the same
+# sanitiser as the single-row endpoint, all rows are validated before
+# anything is written, and the valid ones go to Mongo in one unordered
+# bulk_write — a bad row never stops the good ones.
+#
+# Duplicates are rejected as the single-row endpoints reject them: within
+# the upload here, against existing data by one query for the upload's keys
+# (name, year + short_name, WORKLOAD_KEY) — the batched form of their
+# find_one — and, for rows added concurrently, by the unique indexes
+# declared in db_indexes.
+#
+# Response: {"inserted": n, "failed": n, "errors": [{"row": i, "error": msg}]}
+# with rows numbered from 1 (the first data line of a CSV).  201 when every
+# row was stored, 207 when some were, 400 when none were.
+
+from flask import jsonify
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from modules import faculty_handler, labs_handler, subjects_handler, workload_handler
+from modules.db_indexes import WORKLOAD_KEY
+import csv
+import io
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# CSV cells are strings; these fields are converted before sanitising
+CSV_LIST_FIELDS = {'workload': ('batches',)}
+CSV_INT_FIELDS = {
+    'subjects': ('hrs_per_week_lec', 'hrs_per_week_practical', 'practical_duration'),
+}
+
+MAX_ROWS = 5000
+
+
+def _read_rows(req) -> tuple[list, bool]:
+    """(rows, is_csv) from a JSON array or a CSV upload; ValueError on a bad body."""
+    upload = req.files.get('file')
+    if upload is not None or req.mimetype == 'text/csv':
+        raw = upload.read() if upload is not None else req.get_data()
+        try:
+            text = raw.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError("CSV must be UTF-8 encoded")
+        return [{k.strip(): v for k, v in row.items() if k}
+                for row in csv.DictReader(io.StringIO(text))], True
+
+    rows = req.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of rows or a CSV file")
+    return rows, False
+
+
+def _coerce_csv(kind: str, row: dict) -> dict:
+    """Empty cells drop out (so defaults apply); typed fields are converted."""
+    row = {k: v.strip() for k, v in row.items() if isinstance(v, str) and v.strip()}
+    for field in CSV_LIST_FIELDS.get(kind, ()):
+        if field in row:
+            row[field] = [b for b in re.split(r'[;,\s]+', row[field]) if b]
+    for field in CSV_INT_FIELDS.get(kind, ()):
+        if field in row:
+            try:
+                row[field] = int(row[field])
+            except ValueError:
+                raise ValueError(f"Invalid field type: {field} must be an integer")
+    return row
+
+
+def _validate(rows, sanitise, key_fields, errors, coerce=None) -> tuple[list, list]:
+    """Sanitise every row; returns (docs, their row numbers)."""
+    docs, doc_rows, seen = [], [], {}
+    for row_no, raw in enumerate(rows, start=1):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError("Row must be an object")
+            doc = sanitise(coerce(raw) if coerce else raw)
+        except ValueError as e:
+            errors.append({'row': row_no, 'error': str(e)})
+            continue
+        k = tuple(doc.get(f) for f in key_fields)
+        if k in seen:
+            errors.append({'row': row_no, 'error': f"Duplicate of row {seen[k]}"})
+            continue
+        seen[k] = row_no
+        docs.append(doc)
+        doc_rows.append(row_no)
+    return docs, doc_rows
+
+
+def _skip_existing(collection, key_fields, docs, doc_rows, duplicate_message,
+                   errors) -> tuple[list, list]:
+    """Drop the docs whose key is already stored (one query for all of them)."""
+    if not docs:
+        return docs, doc_rows
+    first = key_fields[0]
+    stored = {
+        tuple(d.get(f) for f in key_fields)
+        for d in collection.find({first: {'$in': list({d[first] for d in docs})}},
+                                 {f: 1 for f in key_fields})
+    }
+    kept, kept_rows = [], []
+    for doc, row_no in zip(docs, doc_rows):
+        if tuple(doc.get(f) for f in key_fields) in stored:
+            errors.append({'row': row_no, 'error': duplicate_message(doc)})
+        else:
+            kept.append(doc)
+            kept_rows.append(row_no)
+    return kept, kept_rows
+
+
+def _insert_all(collection, docs, doc_rows, duplicate_message, errors) -> int:
+    """One unordered bulk_write; write errors are mapped back to rows."""
+    if not docs:
+        return 0
+    try:
+        return collection.bulk_write([InsertOne(d) for d in docs],
+                                     ordered=False).inserted_count
+    except BulkWriteError as e:
+        for err in e.details.get('writeErrors', []):
+            doc = docs[err['index']]
+            msg = (duplicate_message(doc) if err.get('code') == 11000
+                   else err.get('errmsg', 'Write failed'))
+            errors.append({'row': doc_rows[err['index']], 'error': msg})
+        return e.details.get('nInserted', 0)
+
+
+# ── Per-collection imports ──
+
+def _import(rows, errors, coerce, sanitise, collection, key_fields,
+            duplicate_message) -> int:
+    docs, doc_rows = _validate(rows, sanitise, key_fields, errors, coerce)
+    docs, doc_rows = _skip_existing(collection, key_fields, docs, doc_rows,
+                                    duplicate_message, errors)
+    return _insert_all(collection, docs, doc_rows, duplicate_message, errors)
+
+
+def _import_faculty(rows, errors, coerce) -> int:
+    return _import(rows, errors, coerce, faculty_handler.sanitise_faculty,
+                   faculty_handler.faculty_collection, ('name',),
+                   lambda d: f"Faculty '{d['name']}' already exists")
+
+
+def _import_labs(rows, errors, coerce) -> int:
+    return _import(rows, errors, coerce, labs_handler.sanitise_lab,
+                   labs_handler.labs_collection, ('name',),
+                   lambda d: f"Lab '{d['name']}' already exists")
+
+
+def _import_workload(rows, errors, coerce) -> int:
+    return _import(rows, errors, coerce, workload_handler.sanitise_workload,
+                   workload_handler.workload_collection, WORKLOAD_KEY,
+                   workload_handler.duplicate_workload_message)
+
+
+def _import_subjects(rows, errors, coerce) -> int:
+    return _import(rows, errors, coerce, subjects_handler.sanitise_subject,
+                   subjects_handler.subject_collection, ('year', 'short_name'),
+                   subjects_handler.duplicate_subject_message)
+
+
+IMPORTERS = {
+    'faculty':  _import_faculty,
+    'labs':     _import_labs,
+    'subjects': _import_subjects,
+    'workload': _import_workload,
+}
+
+
+def bulk_import(kind: str, req):
+    """Import every row of `req` into the `kind` collection; see module doc."""
+    try:
+        rows, is_csv = _read_rows(req)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "No rows provided"}), 400
+    if len(rows) > MAX_ROWS:
+        return jsonify({"error": f"Too many rows ({len(rows)}); limit is {MAX_ROWS}"}), 400
+
+    coerce = (lambda row: _coerce_csv(kind, row)) if is_csv else None
+
+    errors = []
+    try:
+        inserted = IMPORTERS[kind](rows, errors, coerce)
+    except Exception as e:
+        logger.error(f"Bulk import of {kind} failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+    errors.sort(key=lambda err: err['row'])
+    logger.info(f"✓ Bulk import {kind}: {inserted} inserted, {len(errors)} failed")
+    status = 201 if not errors else (207 if inserted else 400)
+    return jsonify({"inserted": inserted, "failed": len(errors), "errors": errors}), status
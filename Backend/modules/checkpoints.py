@@ -0,0 +1,101 @@
+# checkpoints.py
+# Stage outputs of the generation pipeline, kept between runs.
+#
+# The staged pipeline is practical → class projection → lecture fill.  Each
+# stage's output is saved here under the hash of everything it was computed
+# from: the input snapshot for the practical stage, the previous stage's
+# hash (plus the inputs, for the lecture fill) further down.  Every hash is
+# known before anything runs, so a rerun resumes at the first stage with no
+# matching checkpoint — the inputs changed, or it failed last time — and
+# reuses the outputs before it.  The AP-01 rollback restores the
+# collections only; checkpoints survive it, so a run that failed in the
+# lecture stage does not redo the practical one.
+#
+# The hashes also cover the generator code: the source of the modules the
+# stages run (GENERATOR_MODULES) and CHECKPOINT_FORMAT, so after a deploy
+# that changes the scheduler the first run recomputes everything instead
+# of resuming the old algorithm's output.
+#
+# One document per stage ('_id' = stage name); a new run overwrites it.
+
+from config import db
+from datetime import datetime
+from importlib.util import find_spec
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+checkpoints_collection = db['generation_checkpoints']
+
+STAGES = ('practical', 'class', 'lecture')
+
+# Bump when the shape of a saved stage output changes
+CHECKPOINT_FORMAT = 1
+
+# Modules whose code decides what the stages produce
+GENERATOR_MODULES = (
+    'modules.timetable_generator',
+    'modules.class_timetable_handler',
+    'modules.lecture_tt_generator',
+    'modules.input_snapshot',
+    'modules.schedule_format',
+)
+
+
+def input_hash(*parts) -> str:
+    """SHA-256 of `parts` (JSON-able; ObjectIds and dates via str)."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _code_fingerprint() -> str:
+    """SHA-256 of CHECKPOINT_FORMAT and the GENERATOR_MODULES sources."""
+    digest = hashlib.sha256(str(CHECKPOINT_FORMAT).encode())
+    for name in GENERATOR_MODULES:
+        with open(find_spec(name).origin, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_FINGERPRINT = _code_fingerprint()
+
+
+def stage_hashes(inputs_fingerprint: str) -> dict:
+    """
+    Input hash of every stage, chained from the input snapshot and the
+    generator code.
+    """
+    practical = input_hash('practical', CODE_FINGERPRINT, inputs_fingerprint)
+    class_    = input_hash('class', practical)
+    lecture   = input_hash('lecture', class_, inputs_fingerprint)
+    return {'practical': practical, 'class': class_, 'lecture': lecture}
+
+
+def load(stage: str, digest: str) -> dict | None:
+    """The saved output of `stage` if it succeeded on these exact inputs."""
+    doc = checkpoints_collection.find_one(
+        {'_id': stage, 'input_hash': digest, 'status': 'ok'}, {'output': 1})
+    return doc['output'] if doc else None
+
+
+def _put(stage: str, doc: dict):
+    # Best effort: a lost checkpoint only costs recomputation next time
+    try:
+        checkpoints_collection.replace_one(
+            {'_id': stage}, {**doc, 'saved_at': datetime.now()}, upsert=True)
+    except Exception as e:
+        logger.warning(f"⚠️  Saving {stage} checkpoint failed: {e}")
+
+
+def save(stage: str, digest: str, output: dict):
+    _put(stage, {'input_hash': digest, 'status': 'ok', 'output': output})
+
+
+def mark_failed(stage: str, digest: str, error: str):
+    _put(stage, {'input_hash': digest, 'status': 'failed', 'error': error})
+
+
+def clear():
+    checkpoints_collection.delete_many({})
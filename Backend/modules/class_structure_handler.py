@@ -40,7 +40,6 @@ def get_class_structure():
     try:
         structure = class_structure_collection.find_one({})
         if structure:
-            structure['_id'] = str(structure['_id'])  # Convert ObjectId to string
             print(structure)
             return jsonify(structure), 200
         else:
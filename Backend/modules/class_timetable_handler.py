@@ -2,6 +2,9 @@
 
 from flask import jsonify
 from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import compact_doc, expand_doc, read_doc
+from modules.responses import ndjson_response
 from datetime import datetime
 import logging
 
@@ -57,13 +60,28 @@ def _is_two_hour_practical(lab_doc: dict, day: str, slot: str, session: dict) ->
     )
 
 
-def generate_class_timetables() -> dict:
+def generate_class_timetables(write_concern=None, lab_timetables=None,
+                              writer=None, persist=True) -> dict:
+    """
+    Project the master lab timetable onto per-class timetables.
+
+    lab_timetables: the lab docs just produced by timetable_generator.  When
+    given they are used instead of re-reading master_lab_timetable, which may
+    still be in flight on a write-behind `writer`.
+
+    persist=False skips saving.  The pipeline uses it when the lecture stage
+    receives these docs in memory and saves the finished timetables itself —
+    saving the practical-only projection first would only rewrite every
+    class document twice.
+    """
     try:
         logger.info("Starting class timetable generation…")
-        deleted = class_timetable_collection.delete_many({}).deleted_count
-        logger.info(f"Deleted {deleted} existing class timetables")
 
-        master_sessions = list(master_lab_timetable_collection.find({}))
+        if lab_timetables is not None:
+            master_sessions = lab_timetables
+        else:
+            master_sessions = [expand_doc(d) for d in
+                               master_lab_timetable_collection.find({})]
         if not master_sessions:
             return {'success': False, 'error': 'Master timetable not found'}
 
@@ -122,7 +140,8 @@ def generate_class_timetables() -> dict:
 
         logger.info(f"Found {len(class_schedules)} class-division groups")
 
-        timetables_created = 0
+        docs = []
+        now  = datetime.now()
         for (class_name, division), schedule in class_schedules.items():
 
             # CH-01 FIX: count only entries that sit in a START_SLOT.
@@ -140,19 +159,31 @@ def generate_class_timetables() -> dict:
                 'division':         division,
                 'class_key':        f"{class_name}-{division}",
                 'schedule':         schedule,
-                'generated_at':     datetime.now(),
+                'generated_at':     now,
                 'total_practicals': total_practicals,
             }
-            class_timetable_collection.insert_one(doc)
-            timetables_created += 1
+            docs.append(doc)
             logger.info(f"Created {class_name}-{division} "
                         f"({total_practicals} practicals)")
 
+        stored = [compact_doc(d, ALL_SLOTS) for d in docs] if persist else []
+        saved  = None
+        if persist and writer:
+            writer.sync_many(class_timetable_collection, stored,
+                             ('class', 'division'), write_concern)
+        elif persist:
+            saved = sync_many(class_timetable_collection, stored,
+                              ('class', 'division'), write_concern)
+        timetables_created = len(docs)
+
         logger.info(f"✅ Created {timetables_created} class timetables")
         return {
             'success':            True,
             'message':            f'Generated {timetables_created} class timetables',
             'timetables_created': timetables_created,
+            # In-memory copy for the lecture stage when saves are write-behind
+            'class_timetables':   docs,
+            'persistence':        saved,   # None when write-behind or not persisted
         }
 
     except Exception as e:
@@ -160,7 +191,7 @@ def generate_class_timetables() -> dict:
         return {'success': False, 'error': str(e)}
 
 
-def get_class_timetable(class_name: str, division: str):
+def get_class_timetable(class_name: str, division: str, sparse: bool = False):
     try:
         if not class_name or not division:
             return jsonify({'error': 'Missing class_name or division'}), 400
@@ -168,34 +199,38 @@ def get_class_timetable(class_name: str, division: str):
             {'class': class_name.upper(), 'division': division.upper()})
         if not tt:
             return jsonify({'error': f'No timetable for {class_name}-{division}'}), 404
-        tt['_id'] = str(tt['_id'])
-        if tt.get('generated_at'):
-            tt['generated_at'] = tt['generated_at'].isoformat()
-        return jsonify(tt), 200
+        return jsonify(read_doc(tt, sparse)), 200
     except Exception as e:
         logger.error(f"get_class_timetable error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
-def get_all_class_timetables():
+def get_all_class_timetables(sparse: bool = False):
     try:
-        timetables = list(class_timetable_collection.find({}))
-        for t in timetables:
-            t['_id'] = str(t['_id'])
-            if t.get('generated_at'):
-                t['generated_at'] = t['generated_at'].isoformat()
+        timetables = [read_doc(t, sparse) for t in class_timetable_collection.find({})]
         return jsonify({'total': len(timetables), 'timetables': timetables}), 200
     except Exception as e:
         logger.error(f"get_all_class_timetables error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
+def stream_all_class_timetables(sparse: bool = False):
+    """Streaming variant of get_all_class_timetables: one timetable per line."""
+    try:
+        cursor = class_timetable_collection.find({}).sort([('class', 1), ('division', 1)])
+        return ndjson_response(cursor, lambda t: read_doc(t, sparse)), 200
+    except Exception as e:
+        logger.error(f"stream_all_class_timetables error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
 def get_class_timetable_summary(class_name: str, division: str):
     try:
         tt = class_timetable_collection.find_one(
             {'class': class_name.upper(), 'division': division.upper()})
         if not tt:
             return jsonify({'error': f'No timetable for {class_name}-{division}'}), 404
+        tt = expand_doc(tt)
         summary = {
             day: {slot: [s.get('subject') for s in sess]
                   for slot, sess in slots.items() if sess}
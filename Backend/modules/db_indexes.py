@@ -0,0 +1,129 @@
+# db_indexes.py
+# The indexes every collection is expected to have, in one place.
+#
+# ensure_indexes() runs at startup: it creates whatever is missing and
+# reports indexes that exist but are not declared here (they are left
+# alone — dropping is an admin decision).  index_report() is the read-only
+# version behind GET /api/indexes.
+#
+# The unique indexes double as constraints: the handlers check for a
+# duplicate with find_one, and the index stops two concurrent requests that
+# both passed the check.  Creating a unique index fails while the collection
+# still holds duplicates; that is logged as an error under 'failed', startup
+# carries on, and /readyz reports the worker not ready (missing_unique())
+# until the duplicates are removed and the index exists — as it does when
+# startup() never ran at all.
+
+from config import db
+from modules.timetable_sessions import SESSION_KEY
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One workload entry per faculty member, class and subject (WH-02)
+WORKLOAD_KEY = ('faculty_id', 'year', 'division', 'subject')
+
+
+def _asc(*fields) -> list:
+    return [(f, 1) for f in fields]
+
+
+# collection → [(name, keys, unique)]
+INDEXES = {
+    'faculty': [
+        ('name_unique', _asc('name'), True),
+    ],
+    'labs': [
+        ('name_unique', _asc('name'), True),
+    ],
+    'subject': [
+        ('year_short_name_unique', _asc('year', 'short_name'), True),
+    ],
+    'workload': [
+        ('assignment_unique', _asc(*WORKLOAD_KEY), True),
+    ],
+    'master_lab_timetable': [
+        ('lab_name_unique', _asc('lab_name'), True),
+    ],
+    'class_timetable': [
+        ('class_division_unique', _asc('class', 'division'), True),
+    ],
+    'faculty_timetable': [
+        ('faculty_id_unique', _asc('faculty_id'), True),
+    ],
+    'timetable_sessions': [
+        ('faculty_day_slot', _asc('faculty_id', 'day_idx', 'slot'), False),
+        ('lab_day_slot', _asc('lab', 'day_idx', 'slot'), False),
+        ('class_batch_day_slot',
+         _asc('class', 'division', 'batch', 'day_idx', 'slot'), False),
+        ('session_unique', _asc(*SESSION_KEY), True),
+    ],
+}
+
+
+def _signature(keys, unique) -> tuple:
+    return tuple((f, int(d)) for f, d in keys), bool(unique)
+
+
+def index_report(create: bool = False) -> dict:
+    """
+    Compare declared and existing indexes, per collection:
+        {'created' | 'missing': [names], 'present': [names],
+         'extra': [names], 'failed': {name: error}}
+    With create=True missing indexes are built and listed under 'created'.
+    """
+    report = {}
+    for coll_name, specs in INDEXES.items():
+        collection = db[coll_name]
+        existing = {
+            _signature(info['key'], info.get('unique')): name
+            for name, info in collection.index_information().items()
+            if name != '_id_'
+        }
+        entry = {'created' if create else 'missing': [], 'present': [],
+                 'extra': [], 'failed': {}}
+        declared = set()
+        for name, keys, unique in specs:
+            sig = _signature(keys, unique)
+            declared.add(sig)
+            if sig in existing:
+                entry['present'].append(existing[sig])
+                continue
+            if not create:
+                entry['missing'].append(name)
+                continue
+            try:
+                collection.create_index(keys, name=name, unique=unique)
+                entry['created'].append(name)
+            except Exception as e:
+                logger.error(f"Creating index {coll_name}.{name} failed: {e}")
+                entry['failed'][name] = str(e)
+        entry['extra'] = sorted(n for sig, n in existing.items() if sig not in declared)
+        report[coll_name] = entry
+    return report
+
+
+def missing_unique() -> dict:
+    """collection → declared unique indexes that do not exist (readiness)."""
+    missing = {}
+    for coll_name, entry in index_report().items():
+        names = [n for n, _, unique in INDEXES[coll_name]
+                 if unique and n in entry['missing']]
+        if names:
+            missing[coll_name] = names
+    return missing
+
+
+def ensure_indexes() -> dict:
+    """Create missing indexes and log anything unexpected.  Startup hook."""
+    report = index_report(create=True)
+    for coll_name, entry in report.items():
+        if entry['created']:
+            logger.info(f"✓ {coll_name}: created {', '.join(entry['created'])}")
+        if entry['extra']:
+            logger.warning(f"⚠️  {coll_name}: undeclared index(es) "
+                           f"{', '.join(entry['extra'])}")
+        for name, err in entry['failed'].items():
+            logger.error(f"✗ {coll_name}: could not create {name}: {err} — "
+                         f"/readyz reports not ready until it exists")
+    return report
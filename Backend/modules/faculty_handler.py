@@ -1,5 +1,6 @@
 from flask import jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from config import db
 
 # Collection for faculty
@@ -8,23 +9,40 @@ faculty_collection = db['faculty']
 # ---------- Display all faculties ----------
 def display_faculty():
     try:
-        faculties = list(faculty_collection.find({}))
-        # Convert ObjectId to string for JSON serialization
-        for faculty in faculties:
-            faculty['_id'] = str(faculty['_id'])
-        return jsonify(faculties)
+        # ObjectIds are serialised by the app's JSON provider (responses.py)
+        return jsonify(list(faculty_collection.find({})))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# ---------- Add a new faculty ----------
-def add_faculty(data):
+# ---------- Sanitise one faculty record ----------
+def sanitise_faculty(data) -> dict:
+    """Document stored for one faculty member; ValueError on bad input."""
     name = data.get('name')
     short_name = data.get('short_name')
     title = data.get('title')
 
     if not name or not short_name:
-        return jsonify({"error": "Missing name or short_name"}), 400
+        raise ValueError("Missing name or short_name")
+
+    faculty_data = {
+        "name": str(name).strip(),
+        "short_name": str(short_name).strip()
+    }
+
+    # Add title if provided
+    if title:
+        faculty_data["title"] = str(title).strip()
+    return faculty_data
+
+
+# ---------- Add a new faculty ----------
+def add_faculty(data):
+    try:
+        faculty_data = sanitise_faculty(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    name = faculty_data["name"]
 
     # Check if faculty already exists
     existing = faculty_collection.find_one({"name": name})
@@ -32,20 +50,14 @@ def add_faculty(data):
         return jsonify({"error": f"Faculty '{name}' already exists"}), 400
 
     try:
-        faculty_data = {
-            "name": name,
-            "short_name": short_name
-        }
-        
-        # Add title if provided
-        if title:
-            faculty_data["title"] = title
-        
         result = faculty_collection.insert_one(faculty_data)
         return jsonify({
             "message": f"Faculty '{name}' added successfully!",
             "_id": str(result.inserted_id)
         })
+    except DuplicateKeyError:
+        # Added by a concurrent request since the check (name_unique index)
+        return jsonify({"error": f"Faculty '{name}' already exists"}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -85,5 +97,8 @@ def update_faculty(data):
         if result.matched_count == 0:
             return jsonify({"error": f"Faculty with ID '{faculty_id}' not found"}), 404
         return jsonify({"message": f"Faculty updated successfully!"})
+    except DuplicateKeyError:
+        # Renamed to a name another faculty has (name_unique index)
+        return jsonify({"error": f"Faculty '{updates.get('name')}' already exists"}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,91 @@
+# faculty_timetable.py
+# Per-faculty timetables, materialized at generation time.
+#
+# A faculty member's week is spread over every class timetable (lectures)
+# and every lab (practicals).  Rather than have the client download all of
+# them and regroup, the pipeline joins the sessions by faculty_id once and
+# stores one document per faculty member.
+
+from flask import jsonify
+from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import DAYS, compact_doc, read_doc
+from modules.timetable_sessions import build_sessions
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+faculty_timetable_collection = db['faculty_timetable']
+
+# Session fields copied into a faculty timetable cell
+_CELL_FIELDS = ('class', 'division', 'batch', 'type', 'subject',
+                'subject_full', 'lab')
+
+
+def build_faculty_timetables(class_timetables, generated_at=None) -> list:
+    """
+    Format-1 class timetable docs → one format-1 doc per faculty_id.
+    Sessions without a faculty_id (unassigned workload) are skipped.
+    """
+    class_timetables = list(class_timetables)
+    slots = sorted({slot for tt in class_timetables
+                    for day in tt.get('schedule', {}).values() for slot in day})
+    now = generated_at or datetime.now()
+
+    docs: dict = {}
+    for s in build_sessions(class_timetables):
+        fid = s['faculty_id']
+        if not fid:
+            continue
+        doc = docs.get(fid)
+        if doc is None:
+            doc = docs[fid] = {
+                'faculty_id':     fid,
+                'faculty':        s['faculty'],
+                'schedule':       {day: {slot: [] for slot in slots} for day in DAYS},
+                'total_sessions': 0,
+                'generated_at':   now,
+            }
+        cell = {k: s[k] for k in _CELL_FIELDS}
+        cell['class_key'] = f"{s['class']}-{s['division']}"
+        doc['schedule'][s['day']][s['slot']].append(cell)
+        doc['total_sessions'] += 1
+
+    return sorted(docs.values(), key=lambda d: d['faculty'] or '')
+
+
+def save_faculty_timetables(class_timetables, write_concern=None, writer=None):
+    """
+    Materialize and save the faculty view of the given class timetables.
+    Returns sync_many stats, or None when queued on a write-behind writer.
+    """
+    docs   = build_faculty_timetables(class_timetables)
+    stored = [compact_doc(d, list(d['schedule']['Monday'])) for d in docs]
+    if writer:
+        writer.sync_many(faculty_timetable_collection, stored, ('faculty_id',),
+                         write_concern)
+        return None
+    return sync_many(faculty_timetable_collection, stored, ('faculty_id',),
+                     write_concern)
+
+
+def get_faculty_timetable(faculty_id: str, sparse: bool = False):
+    try:
+        doc = faculty_timetable_collection.find_one({'faculty_id': faculty_id})
+        if not doc:
+            return jsonify({'error': f'No timetable found for faculty {faculty_id}'}), 404
+        return jsonify(read_doc(doc, sparse)), 200
+    except Exception as e:
+        logger.error(f"get_faculty_timetable error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def get_all_faculty_timetables(sparse: bool = False):
+    try:
+        docs = [read_doc(d, sparse)
+                for d in faculty_timetable_collection.find({}).sort('faculty', 1)]
+        return jsonify({'total': len(docs), 'timetables': docs}), 200
+    except Exception as e:
+        logger.error(f"get_all_faculty_timetables error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
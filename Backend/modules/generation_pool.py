@@ -0,0 +1,114 @@
+# generation_pool.py
+# Timetable generation runs on its own small thread pools.
+#
+# Under the pre-fork server (gunicorn.conf.py) every worker process serves
+# requests from a fixed set of threads.  A generation run holds its thread
+# for seconds; a burst of regenerate clicks could occupy all of them and
+# leave nothing for timetable reads.  Generation therefore runs on a
+# separate executor of GENERATION_WORKERS threads per process, and a
+# request that finds every generation slot taken is turned away at once
+# with 503 + Retry-After instead of queueing on a request thread.
+#
+# What-if dry runs (whatif.py) get a pool of their own, WHATIF_WORKERS
+# threads, so a dry run never takes the slot a regeneration holding the
+# generation lease (single_flight) needs.
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import copy_current_request_context, jsonify
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "1"))
+WHATIF_WORKERS = int(os.getenv("WHATIF_WORKERS", "1"))
+RETRY_AFTER_SECONDS = 10
+
+
+class Pool:
+    """`workers` executor threads; a run that finds them all busy gets 503."""
+
+    def __init__(self, name: str, workers: int, busy_message: str):
+        self.name = name
+        self.workers = workers
+        self.busy_message = busy_message
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._busy = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix=self.name)
+            return self._executor
+
+    def run(self, fn, *args):
+        """
+        Run the view helper `fn(*args)` on this pool and return its
+        response.  The calling request thread only waits; it does no work.
+        """
+        if not self._slots.acquire(blocking=False):
+            response = jsonify({"error": self.busy_message})
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response, 503
+        with self._lock:
+            self._busy += 1
+        try:
+            return self._get_executor().submit(copy_current_request_context(fn),
+                                               *args).result()
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "busy": self._busy}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+generation = Pool("generation", GENERATION_WORKERS,
+                  "Timetable generation is busy on this worker. Retry shortly.")
+dry_runs = Pool("whatif", WHATIF_WORKERS,
+                "What-if generation is busy on this worker. Retry shortly.")
+_POOLS = (generation, dry_runs)
+
+
+def _after_fork_in_child():
+    # Executor threads do not survive fork(); start from scratch
+    for pool in _POOLS:
+        pool._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def run(fn, *args):
+    """generation.run: the pool regeneration runs on."""
+    return generation.run(fn, *args)
+
+
+def run_dry(fn, *args):
+    """dry_runs.run: the pool what-if runs on."""
+    return dry_runs.run(fn, *args)
+
+
+def stats() -> dict:
+    return {**generation.stats(), "whatif": dry_runs.stats()}
+
+
+def shutdown():
+    """Let running generations finish (graceful worker exit)."""
+    for pool in _POOLS:
+        pool.shutdown()
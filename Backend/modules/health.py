@@ -0,0 +1,50 @@
+# health.py
+# Liveness and readiness probes for the serving layer.
+#
+#   /healthz — the process is up and answering; never touches the database,
+#              so a Mongo outage does not get healthy workers restarted.
+#   /readyz  — this worker can serve traffic: Mongo answers a ping within
+#              the client's server-selection timeout (config.py), or the
+#              memory / SQLite storage backend is open — and every unique
+#              index the handlers rely on exists (db_indexes).  Also
+#              reports this process's connection-pool counters and
+#              generation-pool load.  503 when not ready, so the load
+#              balancer stops routing to it.
+
+from flask import jsonify
+from config import STORAGE_BACKEND, get_client, pool_stats
+from modules import db_indexes, generation_pool
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+
+def readyz():
+    body = {"pid": os.getpid(), "storage": STORAGE_BACKEND,
+            "generation": generation_pool.stats()}
+    try:
+        started = time.perf_counter()
+        get_client().admin.command("ping")
+        body["mongo"] = {"ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+        missing = db_indexes.missing_unique()
+        if missing:
+            logger.warning(f"⚠️  Not ready: unique index(es) missing: {missing}")
+            body["missing_unique_indexes"] = missing
+            body["status"] = "unavailable"
+            status = 503
+        else:
+            body["status"] = "ready"
+            status = 200
+    except Exception as e:
+        logger.warning(f"⚠️  Readiness check failed: {e}")
+        body["mongo"] = {"error": str(e)}
+        body["status"] = "unavailable"
+        status = 503
+    body["pool"] = pool_stats.snapshot()
+    return jsonify(body), status
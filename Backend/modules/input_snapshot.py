@@ -0,0 +1,93 @@
+# input_snapshot.py
+# Generation inputs, read once per pipeline run.
+#
+# The practical and lecture stages used to load faculty, subjects and
+# workload separately (subjects twice, with identical code).  InputSnapshot
+# reads each collection once — projected to the fields the stages use — and
+# precomputes the lookups they share, so both stages see the same data.
+# Only the subjects the workload actually references are read.
+#
+# On a replica set the reads run in one snapshot session, i.e. at a single
+# point in time even if an admin is editing workload mid-run.  Standalone
+# servers do not support snapshot reads; there the collections are read
+# back to back without one.
+
+from config import db, get_client
+from modules.subjects_handler import subjects_by_year
+from modules.checkpoints import input_hash
+from pymongo.errors import PyMongoError
+import logging
+
+logger = logging.getLogger(__name__)
+
+faculty_collection  = db['faculty']
+labs_collection     = db['labs']
+workload_collection = db['workload']
+
+YEARS = ['sy', 'ty', 'be']
+
+FACULTY_FIELDS = {'_id': 1, 'name': 1, 'short_name': 1}
+LAB_FIELDS     = {'_id': 0, 'name': 1}
+# Per-subject fields read by the practical and lecture stages
+SUBJECT_FIELDS = ['short_name', 'practical_duration', 'practical_type',
+                  'required_labs', 'hrs_per_week_lec']
+WORKLOAD_FIELDS = {
+    'year': 1, 'division': 1, 'batches': 1, 'subject': 1, 'subject_full': 1,
+    'faculty_id': 1, 'practical_hrs': 1,
+    # lecture-hour fallbacks (LG-03)
+    'theory_hrs': 1, 'lectures_per_week': 1, 'lecture_hours': 1,
+    'theory': 1, 'hours': 1,
+}
+
+
+class InputSnapshot:
+
+    def __init__(self, faculty: list, labs: list, subjects: dict,
+                 workloads: list):
+        self.workloads = workloads
+
+        # faculty _id (str) → short name, falling back to full name
+        self.fid_to_name = {
+            str(f['_id']): f.get('short_name') or f.get('name', '')
+            for f in faculty
+        }
+        self.labs_list = [lab['name'] for lab in labs if lab.get('name')]
+
+        # subject short_name → subject doc
+        self.subject_map = {}
+        for yr in YEARS:
+            for subj in subjects.get(yr, []):
+                sname = subj.get('short_name', '')
+                if sname:
+                    self.subject_map[sname] = subj
+        if not self.subject_map:
+            logger.warning("No subjects found for the workload!")
+
+        # Content hash of everything above — the pipeline's checkpoint key
+        self.fingerprint = input_hash(self.fid_to_name, self.labs_list,
+                                      self.subject_map, self.workloads)
+
+        logger.info(f"✓ Input snapshot: {len(self.fid_to_name)} faculty, "
+                    f"{len(self.labs_list)} labs, {len(self.subject_map)} subjects, "
+                    f"{len(self.workloads)} workload entries")
+
+    @classmethod
+    def _read(cls, session=None) -> 'InputSnapshot':
+        workloads = list(workload_collection.find({}, WORKLOAD_FIELDS, session=session))
+        referenced = {w['subject'] for w in workloads if w.get('subject')}
+        return cls(
+            faculty=list(faculty_collection.find({}, FACULTY_FIELDS, session=session)),
+            labs=list(labs_collection.find({}, LAB_FIELDS, session=session)),
+            subjects=subjects_by_year(referenced, SUBJECT_FIELDS, session=session),
+            workloads=workloads,
+        )
+
+    @classmethod
+    def load(cls) -> 'InputSnapshot':
+        """Read all generation inputs, at one point in time when supported."""
+        try:
+            with get_client().start_session(snapshot=True) as session:
+                return cls._read(session)
+        except (PyMongoError, NotImplementedError) as e:
+            logger.info(f"Snapshot reads unavailable ({e}); reading inputs without one")
+            return cls._read()
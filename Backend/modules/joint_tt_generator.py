@@ -0,0 +1,502 @@
+# joint_tt_generator.py
+#
+# Optional single-pass engine: schedules practical blocks and lecture hours
+# together over one shared class / batch / faculty / lab occupancy model.
+#
+# The default pipeline (timetable_generator → class_timetable_handler →
+# lecture_tt_generator) freezes every practical before the first lecture is
+# placed, so a lecture can never take a cell a practical did not really
+# need.  Here both kinds of item compete in the same most-constrained-first
+# loop, and every cell choice is scored by how much demand it takes away
+# from the items still pending.
+#
+# Output documents have exactly the same shape as the two-stage pipeline:
+# master_lab_timetable gets one doc per lab, class_timetable one per class.
+
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime
+from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import compact_doc
+from modules.timetable_sessions import save_sessions
+from modules.faculty_timetable import save_faculty_timetables
+from modules.input_snapshot import InputSnapshot
+from modules.timetable_generator import (
+    TimetableGenerator,
+    ALL_SLOTS as LAB_SLOTS,
+    DAYS,
+    START_SLOTS,
+    TWO_HR_START_SLOTS,
+)
+from modules.lecture_tt_generator import (
+    LectureTimetableGenerator,
+    ALL_LECTURE_SLOTS,
+    LUNCH_SLOT,
+)
+from modules.class_timetable_handler import ALL_SLOTS as CLASS_SLOTS
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LECTURE_SLOTS = [s for s in ALL_LECTURE_SLOTS if s != LUNCH_SLOT]
+ADJACENT      = LectureTimetableGenerator._ADJACENT
+
+master_lab_timetable_collection = db['master_lab_timetable']
+class_timetable_collection      = db['class_timetable']
+
+
+class JointTimetableGenerator:
+
+    def __init__(self, inputs: InputSnapshot | None = None):
+        # Both halves read the same inputs, loaded once
+        inputs = inputs or InputSnapshot.load()
+        self.practicals       = TimetableGenerator(inputs)
+        self.lectures         = LectureTimetableGenerator(inputs)
+        self.class_timetables = self.lectures.class_timetables   # (year, div) → doc
+
+        # Shared occupancy model
+        self.lab_busy      = set()   # (lab, day, slot)
+        self.faculty_busy  = set()   # (faculty, day, slot)
+        self.batch_busy    = set()   # (year, div, batch, day, slot)
+        self.class_prac    = set()   # (year, div, day, slot) — any batch in a lab
+        self.class_lecture = set()   # (year, div, day, slot)
+        self.class_faculty = set()   # (year, div, faculty, day, slot) — any type
+        self.lecture_days  = set()   # (year, div, subject, day)
+        self.lecture_fac   = set()   # (year, div, faculty, day, slot) — lectures only
+        self.unresolved    = []
+
+        # Demand left on each (resource, day, slot) by pending items' domains
+        self.demand = Counter()
+
+    # ── Data loading ──────────────────────────────────────────────────────────
+
+    def _ensure_class(self, year: str, division: str):
+        key = (year, division)
+        if key not in self.class_timetables:
+            self.class_timetables[key] = {
+                'class':     year,
+                'division':  division,
+                'class_key': f"{year}-{division}",
+                'schedule':  {d: {s: [] for s in CLASS_SLOTS} for d in DAYS},
+            }
+
+    def _load_items(self) -> tuple[list, list]:
+        """
+        Practical items come from TimetableGenerator.prepare_assignments and
+        lecture groups from LectureTimetableGenerator.prepare_lecture_assignments,
+        so workload parsing (TG-03/TG-04/TG-05, LG-02/LG-03) is shared.
+        """
+        self.practicals._load_labs()
+        prac_assignments = self.practicals.prepare_assignments()
+        lec_assignments, self.unresolved = self.lectures.prepare_lecture_assignments()
+
+        self.prac_assignments = prac_assignments
+        self.lec_assignments  = lec_assignments
+
+        prac_rank = {k: i for i, k in enumerate(
+            TimetableGenerator._build_round_robin_order(list(prac_assignments)))}
+        lec_rank  = {k: i for i, k in enumerate(
+            LectureTimetableGenerator._build_round_robin_order(list(lec_assignments)))}
+
+        practicals = []
+        for key, queue in prac_assignments.items():
+            for idx, source in enumerate(queue):
+                # LG-02: class timetables are keyed by uppercase division
+                p = {**source, 'division': source['division'].strip().upper()}
+                self.practicals._ensure_batch(p['year'], p['division'], p['batch'])
+                self._ensure_class(p['year'], p['division'])
+                practicals.append({'kind': 'practical', 'key': key, 'item': p,
+                                   'source': source, 'rank': (prac_rank[key], idx)})
+        lectures = []
+        for key, queue in lec_assignments.items():
+            if queue:
+                self._ensure_class(key[0], key[1])
+                lectures.append({'kind': 'lecture', 'key': key, 'queue': queue,
+                                 'faculty': queue[0]['faculty'],
+                                 'rank': (lec_rank[key], 0)})
+        return practicals, lectures
+
+    # ── Occupancy model ───────────────────────────────────────────────────────
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _occupied_slots(slot: str, hrs: int) -> tuple:
+        return TimetableGenerator._occupied_slots(slot, hrs)
+
+    def _free_labs(self, it: dict, day: str, slot: str) -> list:
+        taken = self._occupied_slots(slot, it['item']['practical_hrs'])
+        return [lab for lab in it['labs']
+                if not any((lab, day, t) in self.lab_busy for t in taken)]
+
+    def _practical_feasible(self, it: dict, day: str, slot: str) -> bool:
+        p   = it['item']
+        hrs = p['practical_hrs']
+        if hrs == 2 and slot not in TWO_HR_START_SLOTS:
+            return False
+        y, d, b, f = p['year'], p['division'], p['batch'], p['faculty']
+        if not self._free_labs(it, day, slot):
+            return False
+        for t in self._occupied_slots(slot, hrs):
+            if ((f, day, t) in self.faculty_busy
+                    or (y, d, b, day, t) in self.batch_busy
+                    or (y, d, day, t) in self.class_lecture):
+                return False
+            # LG-04 rule 3, seen from the practical's side: the same faculty
+            # must not lecture this class in an adjacent slot.
+            for adj in ADJACENT.get(t, []):
+                if (y, d, f, day, adj) in self.lecture_fac:
+                    return False
+        return True
+
+    def _lecture_feasible(self, g: dict, day: str, slot: str) -> bool:
+        y, d, subject = g['key']
+        f = g['faculty']
+        if ((y, d, day, slot) in self.class_lecture
+                or (y, d, day, slot) in self.class_prac
+                or (f, day, slot) in self.faculty_busy
+                or (y, d, subject, day) in self.lecture_days):
+            return False
+        return not any((y, d, f, day, adj) in self.class_faculty
+                       for adj in ADJACENT.get(slot, []))
+
+    def _feasible(self, it: dict, cell: tuple) -> bool:
+        if it['kind'] == 'practical':
+            return self._practical_feasible(it, *cell)
+        return self._lecture_feasible(it, *cell)
+
+    # ── Demand bookkeeping (value ordering) ───────────────────────────────────
+
+    @staticmethod
+    def _lab_key(it: dict, day: str, t: str) -> tuple:
+        # Specific-Lab practicals compete for one named lab; Common-Lab ones
+        # for the shared pool.
+        if it['item'].get('required_lab'):
+            return ('lab', it['item']['required_lab'], day, t)
+        return ('pool', day, t)
+
+    def _contributes(self, it: dict, cell: tuple) -> list:
+        """Demand keys a domain cell adds to while it is still a candidate."""
+        if it['kind'] == 'practical':
+            p = it['item']
+            day, slot = cell
+            y, d = p['year'], p['division']
+            keys = []
+            for t in self._occupied_slots(slot, p['practical_hrs']):
+                keys += [self._lab_key(it, day, t), ('fac', p['faculty'], day, t),
+                         ('batch', y, d, p['batch'], day, t), ('cp', y, d, day, t)]
+            return keys
+        y, d, _ = it['key']
+        day, slot = cell
+        return [('fac', it['faculty'], day, slot), ('cl', y, d, day, slot)]
+
+    def _consumes(self, it: dict, cell: tuple) -> list:
+        """Demand keys whose competing candidates a placement would knock out."""
+        if it['kind'] == 'practical':
+            p = it['item']
+            day, slot = cell
+            y, d = p['year'], p['division']
+            keys = []
+            for t in self._occupied_slots(slot, p['practical_hrs']):
+                keys += [self._lab_key(it, day, t), ('fac', p['faculty'], day, t),
+                         ('batch', y, d, p['batch'], day, t), ('cl', y, d, day, t)]
+            return keys
+        y, d, _ = it['key']
+        day, slot = cell
+        return [('fac', it['faculty'], day, slot), ('cl', y, d, day, slot),
+                ('cp', y, d, day, slot)]
+
+    def _drop(self, it: dict, cells):
+        for cell in list(cells):
+            if cell in it['domain']:
+                it['domain'].discard(cell)
+                for k in self._contributes(it, cell):
+                    self.demand[k] -= 1
+                it['slack'] = None
+
+    # ── Placement ─────────────────────────────────────────────────────────────
+
+    def _place_practical(self, it: dict, day: str, slot: str) -> str:
+        p = it['item']
+        y, d, b, f = p['year'], p['division'], p['batch'], p['faculty']
+
+        # Take the free lab that Specific-Lab practicals want least;
+        # labs_list order on ties, as TimetableGenerator does.
+        taken = self._occupied_slots(slot, p['practical_hrs'])
+        lab   = min(self._free_labs(it, day, slot),
+                    key=lambda l: sum(self.demand[('lab', l, day, t)] for t in taken))
+
+        self.practicals._write_session(p, day, slot, lab)
+        self.prac_assignments[it['key']].remove(it['source'])
+
+        entry = {
+            'batch':        b,
+            'subject':      p['subject'],
+            'subject_full': p['subject_full'],
+            'faculty':      f,
+            'faculty_id':   p['faculty_id'] or None,
+            'lab':          lab,
+            'type':         'practical',
+        }
+        schedule = self.class_timetables[(y, d)]['schedule']
+        for t in taken:
+            schedule[day][t].append(dict(entry))
+            self.lab_busy.add((lab, day, t))
+            self.faculty_busy.add((f, day, t))
+            self.batch_busy.add((y, d, b, day, t))
+            self.class_prac.add((y, d, day, t))
+            self.class_faculty.add((y, d, f, day, t))
+        return lab
+
+    def _place_lecture(self, it: dict, day: str, slot: str):
+        y, d, subject = it['key']
+        f = it['faculty']
+        lecture = it['queue'].pop(0)
+        it['slack'] = None
+        self.lectures._place_lecture(y, d, day, slot, lecture)
+
+        self.faculty_busy.add((f, day, slot))
+        self.class_lecture.add((y, d, day, slot))
+        self.class_faculty.add((y, d, f, day, slot))
+        self.lecture_fac.add((y, d, f, day, slot))
+        self.lecture_days.add((y, d, subject, day))
+
+    # ── Scheduling loop ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _slack(it: dict) -> int:
+        """
+        Spare candidate positions beyond what the item still needs.
+        Cached on the item; _drop and _place_lecture invalidate it.
+        """
+        if it.get('slack') is None:
+            if it['kind'] == 'practical':
+                it['slack'] = len(it['domain']) - 1
+            else:
+                it['slack'] = len({c[0] for c in it['domain']}) - len(it['queue'])
+        return it['slack']
+
+    def _cells_near(self, it: dict, day: str, near: set) -> list:
+        """Candidate cells of `it` on `day` whose slots touch `near`."""
+        if it['kind'] == 'lecture':
+            return [(day, s) for s in LECTURE_SLOTS if s in near]
+        hrs = it['item']['practical_hrs']
+        return [(day, s) for s in START_SLOTS
+                if not near.isdisjoint(self._occupied_slots(s, hrs))]
+
+    def _pending(self, it: dict) -> bool:
+        return it['kind'] == 'practical' or bool(it['queue'])
+
+    def _label(self, it: dict) -> str:
+        if it['kind'] == 'practical':
+            p = it['item']
+            return f"{p['year']}-{p['division']}-B{p['batch']} {p['subject']}"
+        return "{}-{}-{}".format(*it['key'])
+
+    def _schedule(self, practicals: list, lectures: list) -> tuple[int, int]:
+        """
+        One most-constrained-first loop over practicals and lecture groups.
+
+        Item selection: least slack first (practicals win ties, then the
+        TG-01/LG-01 round-robin rank).  Value selection: the feasible cell
+        that takes away the least pending demand, calendar order on ties —
+        this is what lets a practical line up with its sibling batches and
+        leave whole class slots free for lectures, and lets lectures stay
+        off the start slots practicals still need.
+        """
+        labs_list = self.practicals.labs_list
+        items = practicals + lectures
+
+        # Practical cells are (day, slot); the lab is picked from the item's
+        # candidate labs when it is placed, so a Common-Lab practical keeps
+        # a cell for as long as any lab is free there.
+        for it in practicals:
+            p = it['item']
+            required = p.get('required_lab')
+            labs = [required] if required else labs_list
+            starts = (TWO_HR_START_SLOTS if p['practical_hrs'] == 2
+                      else START_SLOTS)
+            it['labs']   = [lab for lab in labs if lab in self.practicals.lab_schedule]
+            it['domain'] = ({(day, slot) for day in DAYS for slot in starts}
+                            if it['labs'] else set())
+        for it in lectures:
+            it['domain'] = {(day, slot) for day in DAYS for slot in LECTURE_SLOTS}
+
+        for it in items:
+            for cell in it['domain']:
+                for k in self._contributes(it, cell):
+                    self.demand[k] += 1
+
+        by_class:   dict = {}
+        by_faculty: dict = {}
+        for it in items:
+            if it['kind'] == 'practical':
+                y, d, f = it['item']['year'], it['item']['division'], it['item']['faculty']
+            else:
+                (y, d, _), f = it['key'], it['faculty']
+            by_class.setdefault((y, d), []).append(it)
+            by_faculty.setdefault(f, []).append(it)
+
+        day_rank  = {d: i for i, d in enumerate(DAYS)}
+        slot_rank = {s: i for i, s in enumerate(CLASS_SLOTS)}
+
+        live    = [it for it in items if self._pending(it)]
+        short   = set()
+        n_prac  = 0
+        n_lec   = 0
+
+        while True:
+            still = []
+            for it in live:
+                if not self._pending(it) or it.get('done'):
+                    continue
+                if not it['domain']:
+                    logger.warning(f"  ✗ {self._label(it)}: no feasible cell left")
+                    continue
+                if it['kind'] == 'lecture' and self._slack(it) < 0 and id(it) not in short:
+                    short.add(id(it))
+                    logger.warning(f"  ✗ {self._label(it)}: fewer free days than "
+                                   f"{len(it['queue'])} pending lecture(s)")
+                still.append(it)
+            live = still
+            if not live:
+                break
+
+            it = min(live, key=lambda i: (self._slack(i),
+                                          i['kind'] != 'practical', i['rank']))
+
+            # Domains are kept exact by the pruning below, so the feasibility
+            # re-check on the chosen cell is only a safety net.
+            demand = self.demand
+            best = min(it['domain'], key=lambda c: (
+                sum(demand[k] for k in self._consumes(it, c)),
+                day_rank[c[0]], slot_rank[c[1]]))
+            if not self._feasible(it, best):
+                self._drop(it, [best])
+                continue
+
+            day = best[0]
+            if it['kind'] == 'practical':
+                lab = self._place_practical(it, *best)
+                it['done'] = True
+                self._drop(it, it['domain'])
+                n_prac += 1
+                y, d, f = it['item']['year'], it['item']['division'], it['item']['faculty']
+            else:
+                self._place_lecture(it, *best)
+                if not it['queue']:
+                    self._drop(it, it['domain'])
+                n_lec += 1
+                (y, d, _), f = it['key'], it['faculty']
+
+            # Forward checking: only items sharing the class, the faculty or
+            # (for practicals) the lab can lose cells, and only cells on this
+            # day that overlap or sit next to the slots just taken.
+            if it['kind'] == 'practical':
+                taken = set(self._occupied_slots(best[1], it['item']['practical_hrs']))
+            else:
+                taken = {best[1]}
+                self._drop(it, [c for c in it['domain'] if c[0] == day])
+            near = set(taken)
+            for t in taken:
+                near.update(ADJACENT.get(t, []))
+
+            peers = {id(o): o for o in by_class[(y, d)] + by_faculty[f]}
+            for o in peers.values():
+                if o.get('done') or not self._pending(o):
+                    continue
+                self._drop(o, [c for c in self._cells_near(o, day, near)
+                               if c in o['domain'] and not self._feasible(o, c)])
+            if it['kind'] == 'practical':
+                for o in practicals:
+                    if o.get('done') or id(o) in peers or lab not in o['labs']:
+                        continue
+                    self._drop(o, [c for c in self._cells_near(o, day, taken)
+                                   if c in o['domain'] and not self._feasible(o, c)])
+
+        return n_prac, n_lec
+
+    # ── Main ──────────────────────────────────────────────────────────────────
+
+    def generate(self, write_concern=None, writer=None) -> dict:
+        """writer: optional persistence writer; saves go through it instead."""
+        logger.info("=" * 80)
+        logger.info("STARTING JOINT PRACTICAL + LECTURE GENERATION")
+        logger.info("=" * 80)
+
+        try:
+            practicals, lectures = self._load_items()
+
+            if not practicals and not lectures:
+                return {'success': False, 'error': 'No assignments found'}
+            if practicals and not self.practicals.labs_list:
+                return {'success': False, 'error': 'No labs found'}
+
+            n_prac, n_lec = self._schedule(practicals, lectures)
+
+            # ── Save ──────────────────────────────────────────────────────
+            now = datetime.now()
+            save = writer.sync_many if writer else sync_many
+            saved_labs = save(
+                master_lab_timetable_collection,
+                [compact_doc({'lab_name': lab_name, 'schedule': schedule,
+                              'generated_at': now}, LAB_SLOTS)
+                 for lab_name, schedule in self.practicals.lab_schedule.items()],
+                ('lab_name',),
+                write_concern,
+            )
+
+            for tt in self.class_timetables.values():
+                # CH-01: count START_SLOT practical entries only
+                tt['total_practicals'] = sum(
+                    1 for day in DAYS for slot in START_SLOTS
+                    for e in tt['schedule'][day].get(slot, [])
+                    if e.get('type') == 'practical'
+                )
+                tt['generated_at'] = now
+            saved_classes = save(class_timetable_collection,
+                                 [compact_doc(tt, CLASS_SLOTS)
+                                  for tt in self.class_timetables.values()],
+                                 ('class', 'division'), write_concern)
+            saved_sessions = save_sessions(self.class_timetables.values(),
+                                           write_concern, writer)
+            saved_faculty  = save_faculty_timetables(self.class_timetables.values(),
+                                                     write_concern, writer)
+
+            leftovers = {
+                f"{y}-{d}-B{b}": [p['subject'] for p in q]
+                for (y, d, b), q in self.prac_assignments.items() if q
+            }
+            lecture_leftovers = {
+                f"{y}-{d}-{s}": [f"L#{l['lecture_number']}" for l in q]
+                for (y, d, s), q in self.lec_assignments.items() if q
+            }
+            if leftovers or lecture_leftovers:
+                logger.warning(f"⚠️  Unscheduled: {leftovers} {lecture_leftovers}")
+            else:
+                logger.info("✅ All practicals and lectures scheduled!")
+
+            logger.info(f"DONE: {n_prac} practicals, {n_lec} lectures scheduled")
+            return {
+                'success':              True,
+                'message':              (f'Scheduled {n_prac} practical sessions '
+                                         f'and {n_lec} lectures'),
+                'labs_generated':       len(self.practicals.labs_list),
+                'practicals_scheduled': n_prac,
+                'timetables_created':   len(self.class_timetables),
+                'lectures_scheduled':   n_lec,
+                'leftovers':            leftovers,
+                'lecture_leftovers':    lecture_leftovers,
+                'unresolved_subjects':  self.unresolved,
+                'persistence':          [saved_labs, saved_classes, saved_sessions,
+                                         saved_faculty],
+            }
+
+        except Exception as e:
+            logger.error(f"generate() error: {e}", exc_info=True)
+            return {'success': False, 'error': str(e)}
+
+
+def generate(write_concern=None, inputs=None, writer=None):
+    return JointTimetableGenerator(inputs).generate(write_concern, writer)
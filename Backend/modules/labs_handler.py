@@ -1,5 +1,6 @@
 from flask import jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from config import db
 
 # Collection for labs
@@ -8,22 +9,34 @@ labs_collection = db['labs']
 # ---------- Display all labs ----------
 def display_labs():
     try:
-        labs = list(labs_collection.find({}))
-        # Convert ObjectId to string for JSON serialization
-        for lab in labs:
-            lab['_id'] = str(lab['_id'])
-        return jsonify(labs)
+        # ObjectIds are serialised by the app's JSON provider (responses.py)
+        return jsonify(list(labs_collection.find({})))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# ---------- Add a new lab ----------
-def add_lab(data):
+# ---------- Sanitise one lab record ----------
+def sanitise_lab(data) -> dict:
+    """Document stored for one lab; ValueError on bad input."""
     name = data.get('name')
     short_name = data.get('short_name')
 
     if not name or not short_name:
-        return jsonify({"error": "Missing name or short_name"}), 400
+        raise ValueError("Missing name or short_name")
+
+    return {
+        "name": str(name).strip(),
+        "short_name": str(short_name).strip()
+    }
+
+
+# ---------- Add a new lab ----------
+def add_lab(data):
+    try:
+        lab_data = sanitise_lab(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    name = lab_data["name"]
 
     # Check if lab already exists
     existing = labs_collection.find_one({"name": name})
@@ -31,14 +44,14 @@ def add_lab(data):
         return jsonify({"error": f"Lab '{name}' already exists"}), 400
 
     try:
-        result = labs_collection.insert_one({
-            "name": name,
-            "short_name": short_name
-        })
+        result = labs_collection.insert_one(lab_data)
         return jsonify({
             "message": f"Lab '{name}' added successfully!",
             "_id": str(result.inserted_id)
         })
+    except DuplicateKeyError:
+        # Added by a concurrent request since the check (name_unique index)
+        return jsonify({"error": f"Lab '{name}' already exists"}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -78,6 +91,9 @@ def update_lab(data):
         if result.matched_count == 0:
             return jsonify({"error": f"Lab with ID '{lab_id}' not found"}), 404
         return jsonify({"message": f"Lab updated successfully!"})
+    except DuplicateKeyError:
+        # Renamed to a name another lab has (name_unique index)
+        return jsonify({"error": f"Lab '{updates.get('name')}' already exists"}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
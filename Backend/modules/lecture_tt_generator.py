@@ -2,6 +2,11 @@
 
 from datetime import datetime
 from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import compact_doc, expand_doc
+from modules.timetable_sessions import save_sessions
+from modules.faculty_timetable import save_faculty_timetables
+from modules.input_snapshot import InputSnapshot
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -16,40 +21,34 @@ LUNCH_SLOT        = '13:15'
 
 ROUND_ROBIN_CYCLE = ['SY', 'SY', 'TY', 'TY', 'BE']
 
-workload_collection        = db['workload']
-faculty_collection         = db['faculty']
-subjects_collection        = db['subjects']
 class_timetable_collection = db['class_timetable']
 
 
 class LectureTimetableGenerator:
 
-    def __init__(self):
+    def __init__(self, inputs: InputSnapshot | None = None):
         self.class_timetables        = {}   # (year, div) → full timetable doc
-        self.subject_map             = {}   # short_name → subject doc
         self._warned_missing_keys    = set()  # LG-02 FIX: suppress repeated warnings
+        self._inputs                 = inputs
 
     # ── Data loading ──────────────────────────────────────────────────────────
 
-    def _load_class_timetables(self):
-        for tt in class_timetable_collection.find({}):
+    @property
+    def inputs(self) -> InputSnapshot:
+        """The run's shared inputs; loaded here when none were passed in."""
+        if self._inputs is None:
+            self._inputs = InputSnapshot.load()
+        return self._inputs
+
+    def _load_class_timetables(self, class_timetables=None):
+        source = (class_timetables if class_timetables is not None
+                  else map(expand_doc, class_timetable_collection.find({})))
+        for tt in source:
             # LG-02 FIX: normalise to uppercase so 'sy'/'SY' mismatches are caught
             key = (tt['class'].upper(), tt['division'].upper())
             self.class_timetables[key] = tt
         logger.info(f"✓ Loaded {len(self.class_timetables)} class timetables")
 
-    def _load_subject_map(self):
-        doc = subjects_collection.find_one({})
-        if not doc:
-            logger.warning("No subjects document found!")
-            return
-        for yr in ['sy', 'ty', 'be']:
-            for subj in doc.get(yr, []):
-                sname = subj.get('short_name', '')
-                if sname:
-                    self.subject_map[sname] = subj
-        logger.info(f"✓ Loaded {len(self.subject_map)} subjects for lecture lookup")
-
     # ── Assignment preparation ────────────────────────────────────────────────
 
     def prepare_lecture_assignments(self) -> tuple[dict, list]:
@@ -68,14 +67,9 @@ class LectureTimetableGenerator:
         unresolved:  list = []   # LG-03 FIX
 
         try:
-            faculties = list(faculty_collection.find(
-                {}, {'_id': 1, 'name': 1, 'short_name': 1}))
-            fid_to_name = {
-                str(f['_id']): f.get('short_name') or f.get('name', '')
-                for f in faculties
-            }
-
-            workloads = list(workload_collection.find({}))
+            fid_to_name = self.inputs.fid_to_name
+            subject_map = self.inputs.subject_map
+            workloads   = self.inputs.workloads
             logger.info(f"Reading {len(workloads)} workload entries…")
 
             for w in workloads:
@@ -89,7 +83,7 @@ class LectureTimetableGenerator:
                 faculty_name = fid_to_name.get(faculty_id, faculty_id)
 
                 # ── Authoritative theory hours from subjects collection ────
-                subj_doc   = self.subject_map.get(subject, {})
+                subj_doc   = subject_map.get(subject, {})
                 theory_hrs = int(subj_doc['hrs_per_week_lec']) if 'hrs_per_week_lec' in subj_doc else 0
 
                 # Fallback: try workload fields if subject not in map
@@ -297,16 +291,139 @@ class LectureTimetableGenerator:
 
         return ordered
 
+    # ── Forward-checking domains ──────────────────────────────────────────────
+
+    def _cell_feasible(self, year: str, division: str, subject: str,
+                       faculty: str, day: str, slot: str) -> bool:
+        # LG-02 FIX: _slot_free normalises key internally
+        if not self._slot_free(year, division, day, slot):
+            return False
+        if self._faculty_busy(faculty, day, slot):
+            return False
+        # LG-04 FIX: pass faculty to _consecutive_ok
+        return self._consecutive_ok(year, division, day, slot, subject, faculty)
+
+    def _initial_domain(self, key: tuple, lecture: dict) -> set:
+        year, division, subject = key
+        return {
+            (day, slot)
+            for day in DAYS
+            for slot in ALL_LECTURE_SLOTS
+            if slot != LUNCH_SLOT
+            and self._cell_feasible(year, division, subject,
+                                    lecture['faculty'], day, slot)
+        }
+
+    def _prune_domains(self, key: tuple, faculty: str, day: str, slot: str,
+                       assignments: dict, domains: dict):
+        """
+        Remove the cells that placing `key`'s lecture at (day, slot) has made
+        infeasible, mirroring the checks in _cell_feasible:
+          - the class slot is now taken          (_slot_free)
+          - the faculty is now busy at that slot (_faculty_busy)
+          - the subject now has a lecture today  (_consecutive_ok rule 1)
+          - the faculty now teaches this class in an adjacent slot (rule 3)
+        """
+        year, division, subject = key
+        adjacent = self._ADJACENT.get(slot, [])
+
+        for other, domain in domains.items():
+            if not assignments[other] or not domain:
+                continue
+            other_faculty = assignments[other][0]['faculty']
+            same_class    = other[:2] == (year, division)
+
+            if same_class or other_faculty == faculty:
+                domain.discard((day, slot))
+            if other == key:
+                domain.difference_update([c for c in domain if c[0] == day])
+            elif same_class and other_faculty == faculty:
+                for adj in adjacent:
+                    domain.discard((day, adj))
+
+    @staticmethod
+    def _capacity(domain: set) -> int:
+        """Lectures a domain can still hold — one per day (spread constraint)."""
+        return len({day for day, _ in domain})
+
     # ── Main scheduling loop ──────────────────────────────────────────────────
 
-    def generate(self) -> dict:
+    def _schedule(self, assignments: dict) -> int:
+        """
+        Most-constrained-first scheduling with forward checking.
+
+        Every (year, division, subject) keeps an explicit domain of
+        still-feasible (day, slot) cells.  The subject with the least slack —
+        days still available minus lectures still pending — is placed next,
+        in its earliest feasible cell, and every affected domain is pruned
+        straight away.  Shortfalls are logged the moment a domain becomes
+        too small to hold the remaining lectures.
+
+        Ties are broken with the LG-01 round-robin order.
+        """
+        rank = {k: i for i, k in enumerate(
+            self._build_round_robin_order(list(assignments)))}
+        day_rank  = {d: i for i, d in enumerate(DAYS)}
+        slot_rank = {s: i for i, s in enumerate(ALL_LECTURE_SLOTS)}
+
+        domains = {
+            key: self._initial_domain(key, queue[0])
+            for key, queue in assignments.items() if queue
+        }
+        short: set = set()
+
+        scheduled_count = 0
+        while True:
+            for key, domain in domains.items():
+                pending = assignments[key]
+                if key in short or self._capacity(domain) >= len(pending):
+                    continue
+                short.add(key)
+                logger.warning(
+                    f"  ✗ {key[0]}-{key[1]}-{key[2]}: only "
+                    f"{self._capacity(domain)} day(s) left for "
+                    f"{len(pending)} pending lecture(s)")
+
+            live = [k for k in domains if assignments[k] and domains[k]]
+            if not live:
+                break
+
+            key = min(live, key=lambda k: (
+                self._capacity(domains[k]) - len(assignments[k]), rank[k]))
+            year, division, subject = key
+            pending = assignments[key]
+            lecture = pending[0]
+
+            cell = next((c for c in sorted(domains[key],
+                                           key=lambda c: (day_rank[c[0]], slot_rank[c[1]]))
+                         if self._cell_feasible(year, division, subject,
+                                                lecture['faculty'], *c)), None)
+            if cell is None:
+                domains[key].clear()
+                continue
+
+            day, slot = cell
+            self._place_lecture(year, division, day, slot, lecture)
+            pending.pop(0)
+            scheduled_count += 1
+            self._prune_domains(key, lecture['faculty'], day, slot,
+                                assignments, domains)
+
+        return scheduled_count
+
+    def generate(self, write_concern=None, class_timetables=None,
+                 writer=None) -> dict:
+        """
+        class_timetables: the docs just built by class_timetable_handler.
+        When given they are used instead of re-reading class_timetable,
+        which may still be in flight on a write-behind `writer`.
+        """
         logger.info("=" * 80)
         logger.info("STARTING LECTURE TIMETABLE GENERATION")
         logger.info("=" * 80)
 
         try:
-            self._load_class_timetables()
-            self._load_subject_map()
+            self._load_class_timetables(class_timetables)
 
             if not self.class_timetables:
                 return {'success': False, 'error': 'No class timetables found'}
@@ -322,65 +439,11 @@ class LectureTimetableGenerator:
                     'unresolved_subjects': unresolved_subjects,
                 }
 
-            scheduled_count = 0
-
-            for pass_num in range(30):
-                progress = False
-
-                for day in DAYS:
-                    for slot in ALL_LECTURE_SLOTS:
-                        if slot == LUNCH_SLOT:
-                            continue
-
-                        # LG-01 FIX: use round-robin ordering instead of fixed year_order
-                        pending_keys = [(y, d, s) for (y, d, s) in assignments
-                                        if assignments[(y, d, s)]]
-                        ordered_keys = self._build_round_robin_order(pending_keys)
-
-                        for year, division, subject in ordered_keys:
-                            pending = assignments[(year, division, subject)]
-                            if not pending:
-                                continue
-                            lecture = pending[0]
-
-                            # LG-02 FIX: _slot_free normalises key internally
-                            if not self._slot_free(year, division, day, slot):
-                                continue
-                            if self._faculty_busy(lecture['faculty'], day, slot):
-                                continue
-                            # LG-04 FIX: pass faculty to _consecutive_ok
-                            if not self._consecutive_ok(
-                                    year, division, day, slot,
-                                    subject, lecture['faculty']):
-                                continue
-
-                            self._place_lecture(year, division, day, slot, lecture)
-                            pending.pop(0)
-                            scheduled_count += 1
-                            progress = True
-
-                if not progress:
-                    logger.info(f"Stable after {pass_num + 1} pass(es).")
-                    break
-
-                if all(len(q) == 0 for q in assignments.values()):
-                    logger.info(f"All lectures placed after {pass_num + 1} pass(es).")
-                    break
+            scheduled_count = self._schedule(assignments)
 
             # ── Save ──────────────────────────────────────────────────────
-            # Use ALL_LECTURE_SLOTS + LUNCH_SLOT so the scaffold always matches
-            # whatever slots are defined at the top of this file.
-            # Previously this was a hardcoded list that didn't include 17:20.
-            save_slots = sorted(set(ALL_LECTURE_SLOTS + [LUNCH_SLOT]))
-            for (year, division), tt in self.class_timetables.items():
-                for day in DAYS:
-                    for sl in save_slots:
-                        tt['schedule'].setdefault(day, {}).setdefault(sl, [])
-                tt['generated_at'] = datetime.now()
-                class_timetable_collection.replace_one(
-                    {'class': year, 'division': division}, tt, upsert=True
-                )
-                logger.info(f"✓ Saved {year}-{division}")
+            persistence = save_class_timetables(self.class_timetables.values(),
+                                                write_concern, writer)
 
             # ── Leftovers ─────────────────────────────────────────────────
             leftovers = {
@@ -408,6 +471,8 @@ class LectureTimetableGenerator:
                 # LG-03 FIX: expose unresolved subjects so the API caller can
                 # show them in the UI rather than leaving the user confused
                 'unresolved_subjects': unresolved_subjects,
+                # None entries when write-behind
+                'persistence':         persistence,
             }
 
         except Exception as e:
@@ -415,5 +480,34 @@ class LectureTimetableGenerator:
             return {'success': False, 'error': str(e)}
 
 
-def generate():
-    return LectureTimetableGenerator().generate()
\ No newline at end of file
+def save_class_timetables(class_timetables, write_concern=None, writer=None) -> list:
+    """
+    Persist finished class timetables together with their session and
+    faculty views.  Returns the three save summaries (None when write-behind).
+    """
+    class_timetables = list(class_timetables)
+    # Use ALL_LECTURE_SLOTS + LUNCH_SLOT so the scaffold always matches
+    # whatever slots are defined at the top of this file.
+    # Previously this was a hardcoded list that didn't include 17:20.
+    save_slots = sorted(set(ALL_LECTURE_SLOTS + [LUNCH_SLOT]))
+    now = datetime.now()
+    for tt in class_timetables:
+        for day in DAYS:
+            for sl in save_slots:
+                tt['schedule'].setdefault(day, {}).setdefault(sl, [])
+        tt['generated_at'] = now
+    stored = [compact_doc(tt, save_slots) for tt in class_timetables]
+    saved  = None
+    if writer:
+        writer.sync_many(class_timetable_collection, stored,
+                         ('class', 'division'), write_concern)
+    else:
+        saved = sync_many(class_timetable_collection, stored,
+                          ('class', 'division'), write_concern)
+    saved_sessions = save_sessions(class_timetables, write_concern, writer)
+    saved_faculty  = save_faculty_timetables(class_timetables, write_concern, writer)
+    return [saved, saved_sessions, saved_faculty]
+
+
+def generate(write_concern=None, class_timetables=None, writer=None, inputs=None):
+    return LectureTimetableGenerator(inputs).generate(write_concern, class_timetables, writer)
\ No newline at end of file
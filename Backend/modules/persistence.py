@@ -0,0 +1,210 @@
+# persistence.py
+# Batched writes for the generation pipeline.
+#
+# Every stage saves a whole collection's worth of timetable documents at
+# once.  sync_many sends them as one unordered bulk_write — one round-trip
+# per stage instead of one per lab or class — and skips documents whose
+# content fingerprint matches what is already stored.
+#
+# WriteBehindWriter moves those saves onto a background thread so the next
+# stage can start computing while Mongo acknowledges the previous one.
+
+import copy
+import hashlib
+import json
+import queue
+import threading
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import ConfigurationError
+from pymongo.write_concern import WriteConcern
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_write_concern(raw) -> WriteConcern | None:
+    """
+    Build a WriteConcern from a request payload such as
+    {"w": "majority", "j": true, "wtimeout": 5000}.
+    Returns None for a missing/empty value (collection default applies).
+    Raises ValueError on anything pymongo would reject.
+    """
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("write_concern must be an object")
+    allowed = {'w', 'j', 'wtimeout', 'fsync'}
+    unknown = set(raw) - allowed
+    if unknown:
+        raise ValueError(f"Unknown write_concern field(s): {', '.join(sorted(unknown))}")
+    try:
+        return WriteConcern(**raw)
+    except (TypeError, ValueError, ConfigurationError) as e:
+        raise ValueError(f"Invalid write_concern: {e}") from e
+
+
+def _with_concern(collection, write_concern: WriteConcern | None):
+    if write_concern is None:
+        return collection
+    return collection.with_options(write_concern=write_concern)
+
+
+# Fields that change on every save without the timetable itself changing
+_VOLATILE_FIELDS = {'_id', 'generated_at', 'fingerprint'}
+
+
+def fingerprint(doc: dict) -> str:
+    """
+    Stable SHA-256 of a timetable document's content.  _id, generated_at and
+    the fingerprint itself are excluded, so regenerating an identical
+    schedule yields the same value.
+    """
+    content = {k: v for k, v in doc.items() if k not in _VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'),
+                         default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def sync_many(collection, docs: list, key_fields: tuple,
+              write_concern: WriteConcern | None = None) -> dict:
+    """
+    Make `collection` hold exactly `docs`, writing only what changed.
+
+    Each doc is stamped with its fingerprint and compared against the one
+    stored for the same `key_fields` (e.g. ('lab_name',) or
+    ('class', 'division')).  Unchanged docs are skipped — their stored
+    generated_at is kept — changed or new ones are upserted, and stored docs
+    whose key no longer appears are deleted.  One projected find plus one
+    unordered bulk_write, whatever the number of docs.
+
+    Returns {'collection', 'written', 'unchanged', 'deleted'}.
+    """
+    stored = {
+        tuple(d.get(k) for k in key_fields): d.get('fingerprint')
+        for d in collection.find({}, {**{k: 1 for k in key_fields},
+                                      'fingerprint': 1})
+    }
+
+    ops  = []
+    seen = set()
+    unchanged = 0
+    for doc in docs:
+        key = tuple(doc[k] for k in key_fields)
+        seen.add(key)
+        doc['fingerprint'] = fingerprint(doc)
+        if stored.get(key) == doc['fingerprint']:
+            unchanged += 1
+            continue
+        ops.append(ReplaceOne(dict(zip(key_fields, key)), doc, upsert=True))
+    written = len(ops)
+
+    stale = [key for key in stored if key not in seen]
+    ops  += [DeleteOne(dict(zip(key_fields, key))) for key in stale]
+
+    if ops:
+        _with_concern(collection, write_concern).bulk_write(ops, ordered=False)
+    logger.info(f"✓ {collection.name}: {written} written, {unchanged} unchanged, "
+                f"{len(stale)} deleted")
+    return {
+        'collection': collection.name,
+        'written':    written,
+        'unchanged':  unchanged,
+        'deleted':    len(stale),
+    }
+
+
+def summarise(results: list) -> dict:
+    """Fold sync_many stats (None entries ignored) into one response block."""
+    collections: dict = {}
+    for r in results:
+        if not r:
+            continue
+        c = collections.setdefault(r['collection'],
+                                   {'written': 0, 'unchanged': 0, 'deleted': 0})
+        for k in ('written', 'unchanged', 'deleted'):
+            c[k] += r[k]
+    return {
+        'documents_changed':   sum(c['written'] + c['deleted'] for c in collections.values()),
+        'documents_unchanged': sum(c['unchanged'] for c in collections.values()),
+        'collections':         collections,
+    }
+
+
+class WriteBehindWriter:
+    """
+    Background thread that applies queued bulk saves in submission order.
+
+    The queue is bounded, so a stage that outpaces Mongo blocks on submit
+    instead of buffering unbounded copies.  Documents are deep-copied at
+    submit time: later stages keep mutating their in-memory timetables
+    while the writer encodes the snapshot.
+
+    join() must be called before the pipeline reports success — it drains
+    the queue, stops the thread and returns every error raised by a save.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self._queue  = queue.Queue(maxsize=maxsize)
+        self._errors:  list = []
+        self._results: list = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='write-behind',
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            fn, args = job
+            try:
+                self._results.append(fn(*args))
+            except Exception as e:
+                logger.error(f"write-behind {fn.__name__} failed: {e}", exc_info=True)
+                self._errors.append(e)
+
+    def _submit(self, fn, *args):
+        if self._closed:
+            raise RuntimeError("WriteBehindWriter is already joined")
+        self._queue.put((fn, args))
+
+    def sync_many(self, collection, docs: list, key_fields: tuple,
+                  write_concern: WriteConcern | None = None):
+        self._submit(sync_many, collection, copy.deepcopy(docs),
+                     key_fields, write_concern)
+
+    @property
+    def results(self) -> list:
+        """Return values of the saves applied so far (sync_many stats)."""
+        return list(self._results)
+
+    def join(self) -> list:
+        """Flush pending saves and stop the thread.  Safe to call twice."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        return list(self._errors)
+
+
+class CaptureWriter:
+    """
+    Writer stand-in for dry runs (what-if): records what each save would
+    write, per collection name, and writes nothing.  Same interface as
+    WriteBehindWriter.
+    """
+
+    def __init__(self):
+        self.docs: dict = {}   # collection name → (docs, key_fields)
+
+    def sync_many(self, collection, docs: list, key_fields: tuple,
+                  write_concern: WriteConcern | None = None):
+        self.docs[collection.name] = (copy.deepcopy(docs), tuple(key_fields))
+
+    @property
+    def results(self) -> list:
+        return []
+
+    def join(self) -> list:
+        return []
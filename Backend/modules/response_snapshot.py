@@ -0,0 +1,191 @@
+# response_snapshot.py
+# Pre-rendered read responses shared by every worker on a host.
+#
+# After each run the pipeline writes one file holding the encoded bodies
+# of every timetable read endpoint plus an offset index.  Each worker
+# memory-maps it for the index and answers reads from the file itself — no
+# timetable query, no JSON encoding, no compression.  A body goes out as a
+# file (Snapshot.open) through the server's wsgi.file_wrapper, which
+# gunicorn sends with sendfile(): the bytes are never copied into Python.
+# Publishing writes a temp file and os.replace()s it over the old one, so a
+# reader sees either the old or the new snapshot, never a torn one; workers
+# notice the new inode on their next read and remap, while requests still
+# sending from the old file finish normally.
+#
+# File layout:
+#   MAGIC | 8-byte big-endian header length | header JSON | bodies…
+# header = {"version", "generated_at", "index": {key: [mimetype,
+#           {encoding: [offset, length]}]}}, offsets relative to the bodies.
+
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TTSNAP1\n'
+_LEN  = struct.Struct('>Q')
+
+# Empty string disables the snapshot (reads fall back to timetable_cache)
+SNAPSHOT_PATH = os.getenv(
+    'TIMETABLE_SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 'snapshots', 'timetables.snap'),
+)
+
+_lock    = threading.Lock()
+_current = None     # (stat identity, Snapshot) of the mapped file
+
+
+class Body:
+    """
+    One snapshot body as a read-only file for wsgi.file_wrapper: its own
+    descriptor, positioned at the body and reading no further than its end,
+    so the server may sendfile() it or read() it in blocks.
+    """
+
+    def __init__(self, fd: int, offset: int, length: int):
+        self._fd  = fd
+        self._end = offset + length
+        os.lseek(fd, offset, os.SEEK_SET)
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def tell(self) -> int:
+        return os.lseek(self._fd, 0, os.SEEK_CUR)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return os.lseek(self._fd, offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        left = self._end - self.tell()
+        if size is not None and size >= 0:
+            left = min(left, size)
+        return os.read(self._fd, left) if left > 0 else b''
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class Snapshot:
+    """One mapped snapshot file."""
+
+    def __init__(self, fileobj):
+        st = os.fstat(fileobj.fileno())
+        self._path  = fileobj.name
+        self._inode = (st.st_dev, st.st_ino)
+        self._map = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a timetable snapshot")
+        start = len(MAGIC) + _LEN.size
+        (hlen,) = _LEN.unpack(view[len(MAGIC):start])
+        header = json.loads(bytes(view[start:start + hlen]))
+        self.version      = header['version']
+        self.generated_at = (datetime.fromisoformat(header['generated_at'])
+                             if header.get('generated_at') else None)
+        self._index = header['index']
+        self._base  = start + hlen
+        self._view  = view
+
+    def get(self, key: str):
+        """(mimetype, {encoding: memoryview}) for `key`, or None."""
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        mimetype, spans = entry
+        base = self._base
+        return mimetype, {enc: self._view[base + off:base + off + n]
+                          for enc, (off, n) in spans.items()}
+
+    def open(self, key: str, encoding: str) -> Body | None:
+        """
+        The `encoding` body of `key` as a Body on a descriptor of its own,
+        or None if the file was replaced since it was mapped (the caller
+        then sends the mapped slice from get()).
+        """
+        off, n = self._index[key][1][encoding]
+        try:
+            fd = os.open(self._path, os.O_RDONLY)
+        except OSError:
+            return None
+        st = os.fstat(fd)
+        if (st.st_dev, st.st_ino) != self._inode:
+            os.close(fd)
+            return None
+        return Body(fd, self._base + off, n)
+
+
+def write(version, generated_at, entries: dict, path: str = SNAPSHOT_PATH):
+    """
+    Atomically publish a snapshot.
+    entries: key → (mimetype, {encoding: bytes}).
+    """
+    if not path:
+        return
+    index, chunks, offset = {}, [], 0
+    for key, (mimetype, bodies) in entries.items():
+        spans = {}
+        for enc, body in bodies.items():
+            spans[enc] = [offset, len(body)]
+            chunks.append(body)
+            offset += len(body)
+        index[key] = [mimetype, spans]
+
+    header = json.dumps({
+        'version':      version,
+        'generated_at': generated_at.isoformat() if generated_at else None,
+        'index':        index,
+    }, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header)))
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    logger.info(f"✓ Published response snapshot v{version}: "
+                f"{len(entries)} responses, {offset} bytes")
+
+
+def current(path: str = SNAPSHOT_PATH):
+    """
+    The mapped snapshot, remapped if the file was replaced since the last
+    call.  None when disabled, missing or unreadable.
+    """
+    global _current
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    ident = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cur = _current
+    if cur and cur[0] == ident:
+        return cur[1]
+    with _lock:
+        if _current and _current[0] == ident:
+            return _current[1]
+        try:
+            with open(path, 'rb') as f:
+                snap = Snapshot(f)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Cannot map response snapshot {path}: {e}")
+            return None
+        # The old map is not closed: in-flight responses may still hold
+        # slices or files of it; it is released with the last of them.
+        _current = (ident, snap)
+        return snap
@@ -0,0 +1,76 @@
+# schedule_format.py
+# Storage format for timetable schedules.
+#
+# Format 1 (legacy): 'schedule' is a full day → slot → [sessions] scaffold,
+#   mostly empty lists.
+# Format 2 (sparse): only occupied cells are stored, as
+#     'sessions': [[day_idx, slot_idx, session], …]
+#   with 'slots' holding the slot axis the indexes refer to, so a reader
+#   can rebuild the exact format-1 scaffold.  Days are always DAYS.
+#
+# Generators still work on the nested form in memory; documents are
+# compacted just before they are saved and expanded again on read, unless
+# the client opts in to the sparse form.
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+LEGACY_FORMAT = 1
+SPARSE_FORMAT = 2
+
+
+def to_sparse(schedule: dict, slots: list) -> list:
+    """Nested schedule → [[day_idx, slot_idx, session], …] in calendar order."""
+    entries = []
+    for d_idx, day in enumerate(DAYS):
+        day_sched = schedule.get(day, {})
+        for s_idx, slot in enumerate(slots):
+            for session in day_sched.get(slot, []):
+                entries.append([d_idx, s_idx, session])
+    return entries
+
+
+def to_dense(entries: list, slots: list) -> dict:
+    """[[day_idx, slot_idx, session], …] → full nested scaffold."""
+    schedule = {day: {slot: [] for slot in slots} for day in DAYS}
+    for d_idx, s_idx, session in entries:
+        schedule[DAYS[d_idx]][slots[s_idx]].append(session)
+    return schedule
+
+
+def compact_doc(doc: dict, slots: list) -> dict:
+    """Copy of a format-1 timetable doc in sparse storage form."""
+    out = {k: v for k, v in doc.items() if k != 'schedule'}
+    out['schedule_format'] = SPARSE_FORMAT
+    out['slots']           = list(slots)
+    out['sessions']        = to_sparse(doc.get('schedule', {}), slots)
+    return out
+
+
+def expand_doc(doc: dict) -> dict:
+    """
+    Return `doc` with a format-1 'schedule', whatever format it was stored
+    in.  Legacy docs are returned unchanged; sparse docs are expanded in
+    place and lose their storage-only fields.
+    """
+    if doc.get('schedule_format') != SPARSE_FORMAT:
+        return doc
+    doc['schedule'] = to_dense(doc.pop('sessions', []), doc.pop('slots', []))
+    doc.pop('schedule_format', None)
+    return doc
+
+
+def sparse_doc(doc: dict) -> dict:
+    """
+    Return `doc` in sparse form for clients that opted in.  Legacy docs
+    are converted using the slots present in their own scaffold.
+    """
+    if doc.get('schedule_format') == SPARSE_FORMAT:
+        return doc
+    schedule = doc.get('schedule', {})
+    slots = sorted({slot for day in schedule.values() for slot in day})
+    return compact_doc(doc, slots)
+
+
+def read_doc(doc: dict, sparse: bool = False) -> dict:
+    """Versioned reader used by the API handlers."""
+    return sparse_doc(doc) if sparse else expand_doc(doc)
@@ -0,0 +1,222 @@
+# single_flight.py
+# At most one generation pipeline at a time, across every worker process.
+#
+# Two pipelines running together would delete_many the same collections,
+# interleave their writes and roll back each other's output.  Before
+# running, a request takes a lease — one document in timetable_meta,
+# claimed with an atomic find_one_and_update.  The leader renews the lease
+# while it works and stores its response in generation_runs when done.
+#
+# A request that finds the lease taken
+#   • by a run with the same options and inputs (request_key) waits for
+#     that run and returns its stored response — one pipeline, many
+#     identical callers;
+#   • by any other run waits its turn, then takes the lease itself
+#     (queued, never in parallel; not strictly first-come-first-served).
+#
+# Waiting holds a request thread, so at most MAX_WAITERS requests per
+# process wait; the next is turned away at once with 503 + Retry-After, as
+# generation_pool does, and the threads timetable reads need stay free.
+#
+# A leader that dies stops renewing; its lease expires after LEASE_SECONDS
+# and the next waiter takes over.  Waiting gives up with 503 after
+# WAIT_SECONDS.
+
+from flask import current_app, jsonify
+from pymongo.errors import DuplicateKeyError
+from bson import Binary
+from config import db
+from modules.responses import dumps_bytes
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+meta_collection = db['timetable_meta']
+runs_collection = db['generation_runs']
+
+LEASE_ID = 'generation_lease'
+LEASE_SECONDS = int(os.getenv("GENERATION_LEASE_SECONDS", "60"))
+WAIT_SECONDS = int(os.getenv("GENERATION_WAIT_SECONDS", "600"))
+MAX_WAITERS = int(os.getenv("GENERATION_MAX_WAITERS", "1"))
+POLL_SECONDS = 0.5
+RETRY_AFTER_SECONDS = 10
+# Stored responses are only needed by callers of the same run
+RESULT_KEEP = timedelta(hours=1)
+
+_waiters = threading.BoundedSemaphore(MAX_WAITERS)
+
+
+def _after_fork_in_child():
+    global _waiters
+    _waiters = threading.BoundedSemaphore(MAX_WAITERS)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def request_key(options: dict, inputs_fingerprint: str) -> str:
+    """
+    Identity of a regeneration request: its pipeline options and the
+    fingerprint of the inputs it generates from (InputSnapshot).
+    """
+    return hashlib.sha1(dumps_bytes({
+        'engine':        options.get('engine', 'staged'),
+        'write_concern': options.get('write_concern'),
+        'resume':        options.get('resume', True),
+        'inputs':        inputs_fingerprint,
+    })).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _try_acquire(run_id: str, key: str) -> bool:
+    now = _now()
+    try:
+        # Matches only a free or expired lease; otherwise the upsert
+        # collides with the existing _id
+        meta_collection.find_one_and_update(
+            {'_id': LEASE_ID,
+             '$or': [{'holder': None}, {'expires_at': {'$lt': now}}]},
+            {'$set': {'holder': run_id, 'key': key, 'acquired_at': now,
+                      'expires_at': now + timedelta(seconds=LEASE_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def _keep_alive(run_id: str, stop: threading.Event):
+    while not stop.wait(LEASE_SECONDS / 3):
+        try:
+            meta_collection.update_one(
+                {'_id': LEASE_ID, 'holder': run_id},
+                {'$set': {'expires_at': _now() + timedelta(seconds=LEASE_SECONDS)}})
+        except Exception as e:
+            logger.warning(f"⚠️  Renewing generation lease failed: {e}")
+
+
+def _release(run_id: str):
+    meta_collection.update_one(
+        {'_id': LEASE_ID, 'holder': run_id},
+        {'$set': {'holder': None, 'key': None, 'expires_at': None}})
+
+
+def _store_result(run_id: str, key: str, response):
+    now = _now()
+    runs_collection.insert_one({
+        '_id':         run_id,
+        'key':         key,
+        'status':      response.status_code,
+        'mimetype':    response.mimetype,
+        'body':        Binary(response.get_data()),
+        'finished_at': now,
+    })
+    runs_collection.delete_many({'finished_at': {'$lt': now - RESULT_KEEP}})
+
+
+def _stored_response(doc: dict):
+    response = current_app.response_class(bytes(doc['body']), status=doc['status'],
+                                          mimetype=doc['mimetype'])
+    response.headers['X-Generation-Run'] = doc['_id']
+    response.headers['X-Generation-Shared'] = 'true'
+    return response
+
+
+def _lead(run_id: str, key: str, fn):
+    stop = threading.Event()
+    threading.Thread(target=_keep_alive, args=(run_id, stop), daemon=True,
+                     name='generation-lease').start()
+    try:
+        response = current_app.make_response(fn())
+        # Before the release, so waiters find it when the lease frees up.
+        # A 503 (e.g. this worker's generation pool was busy) is not a
+        # result: waiters find none and take the lease themselves.
+        if response.status_code != 503:
+            _store_result(run_id, key, response)
+        response.headers['X-Generation-Run'] = run_id
+        return response
+    finally:
+        stop.set()
+        _release(run_id)
+
+
+def _wait_for_result(holder: str, deadline: float):
+    """The stored response of run `holder`, or None if it ended without one."""
+    while time.monotonic() < deadline:
+        doc = runs_collection.find_one({'_id': holder})
+        if doc:
+            return _stored_response(doc)
+        live = meta_collection.find_one(
+            {'_id': LEASE_ID, 'holder': holder, 'expires_at': {'$gte': _now()}},
+            {'_id': 1})
+        if not live:
+            # Finished just now, or the leader died
+            doc = runs_collection.find_one({'_id': holder})
+            return _stored_response(doc) if doc else None
+        time.sleep(POLL_SECONDS)
+    return None
+
+
+def _retry_later(message: str, retry_after: int):
+    response = jsonify({"error": message})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
+
+def run(key: str, fn):
+    """Run `fn` (a view helper) as the only generation in flight; see above."""
+    run_id = uuid.uuid4().hex
+    if not _try_acquire(run_id, key):
+        if not _waiters.acquire(blocking=False):
+            return _retry_later("A timetable generation is already running. "
+                                "Retry shortly.", RETRY_AFTER_SECONDS)
+        try:
+            waited = _wait_turn(run_id, key)
+        finally:
+            _waiters.release()
+        if waited is not None:
+            return waited
+    return _lead(run_id, key, fn)
+
+
+def _wait_turn(run_id: str, key: str):
+    """
+    Wait until `run_id` holds the lease (returns None) or a run with the
+    same key has finished (returns its stored response); 503 on timeout.
+    """
+    deadline = time.monotonic() + WAIT_SECONDS
+    queued = False
+    while True:
+        if _try_acquire(run_id, key):
+            if queued:
+                logger.info(f"Queued generation {run_id} starting")
+            return None
+
+        if time.monotonic() >= deadline:
+            return _retry_later("Another timetable generation is still "
+                                "running. Retry shortly.", LEASE_SECONDS)
+
+        lease = meta_collection.find_one({'_id': LEASE_ID}) or {}
+        holder = lease.get('holder')
+        if holder and lease.get('key') == key:
+            logger.info(f"Generation {holder} already running with the same "
+                        f"options and inputs; waiting for its result")
+            shared = _wait_for_result(holder, deadline)
+            if shared is not None:
+                return shared
+            continue
+
+        if holder and not queued:
+            logger.info(f"Generation {holder} in progress; {run_id} queued")
+            queued = True
+        time.sleep(POLL_SECONDS)
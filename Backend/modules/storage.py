@@ -0,0 +1,52 @@
+# storage.py
+# Storage backends behind config.db.
+#
+# Handlers and generators read and write through config.db, whose interface
+# is pymongo's Collection.  STORAGE_BACKEND (config.py) picks what is behind
+# it:
+#   mongo   (default) MongoDB through pymongo
+#   memory  mongomock, in-process — tests, benchmarks, offline runs.  Data
+#           lives for the life of the process (a forked worker gets a copy),
+#           so gunicorn refuses it with more than one worker.
+#   sqlite  one SQLite file, SQLITE_PATH — single-machine installs; every
+#           worker process shares it (storage_sqlite.py)
+#
+# Both non-Mongo backends get their query and update semantics, results and
+# errors — DuplicateKeyError / BulkWriteError included — from mongomock, so
+# handler code runs unchanged.  Neither has snapshot sessions: start_session
+# raises NotImplementedError, which input_snapshot already falls back from.
+
+BACKENDS = ('mongo', 'memory', 'sqlite')
+
+# config.DB_NAME is optional off Mongo
+DEFAULT_DB_NAME = 'timetable'
+
+_memory_client = None
+
+
+def _memory():
+    global _memory_client
+    if _memory_client is None:
+        import mongomock
+
+        class MemoryClient(mongomock.MongoClient):
+
+            def get_database(self, name=None, **kwargs):
+                return super().get_database(name or DEFAULT_DB_NAME, **kwargs)
+
+            def start_session(self, *args, **kwargs):
+                raise NotImplementedError("memory storage has no sessions")
+
+        _memory_client = MemoryClient()
+    return _memory_client
+
+
+def connect(backend: str, sqlite_path: str | None = None):
+    """Client of a non-Mongo backend (see config.get_client)."""
+    if backend == 'memory':
+        return _memory()
+    if backend == 'sqlite':
+        from modules.storage_sqlite import SQLiteClient
+        return SQLiteClient(sqlite_path)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'. "
+                     f"Use one of: {', '.join(BACKENDS)}")
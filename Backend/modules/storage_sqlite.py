@@ -0,0 +1,411 @@
+# storage_sqlite.py
+# SQLite storage backend (STORAGE_BACKEND=sqlite) — see storage.py.
+#
+# SQLite only stores the documents: one table per collection, (id TEXT
+# PRIMARY KEY, doc TEXT), the document as MongoDB Extended JSON
+# (bson.json_util) so ObjectIds, datetimes and binary values round-trip,
+# and its _id encoded the same way as the key.  Index specs are kept in
+# __storage_indexes.
+#
+# What a query or update means is mongomock's: each call loads the
+# documents it may touch into a scratch mongomock collection, runs there
+# unchanged, and writes the documents it changed back.  Reads load what a
+# pushdown of the filter's top-level equalities selects — a superset;
+# mongomock filters exactly.  Writes run in one BEGIN IMMEDIATE transaction,
+# so a find_one_and_update (the generation lease) is atomic across
+# processes, and load what their filters select — or, if the collection has
+# unique indexes, all of it, so mongomock checks them against every
+# document.  Sized for single-machine installs.  WAL mode lets readers
+# proceed while one process writes.
+
+from bson import ObjectId, json_util
+from bson.json_util import JSONOptions, JSONMode
+from pymongo import InsertOne
+from pymongo.errors import OperationFailure, PyMongoError
+from modules.storage import DEFAULT_DB_NAME
+from collections.abc import Mapping
+from contextlib import contextmanager
+import json
+import mongomock
+import sqlite3
+import threading
+
+_JSON = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=False)
+_INDEX_TABLE = '__storage_indexes'
+
+
+def _encode(doc) -> str:
+    return json_util.dumps(doc, json_options=_JSON)
+
+
+def _decode(text: str):
+    return json_util.loads(text, json_options=_JSON)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _json_path(field: str) -> str:
+    """SQL string literal of the JSON path of a top-level field."""
+    path = '$."' + field.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _is_operator_doc(value) -> bool:
+    return isinstance(value, Mapping) and any(str(k).startswith('$') for k in value)
+
+
+def _where(query) -> tuple[str | None, list]:
+    """
+    SQL condition selecting a superset of the documents `query` matches,
+    or None when nothing in it can be pushed down.
+    """
+    if query is not None and not isinstance(query, Mapping):
+        query = {'_id': query}              # find_one(<_id>)
+    clauses, params = [], []
+    for field, value in (query or {}).items():
+        if field.startswith('$') or '.' in field:
+            continue
+        if _is_operator_doc(value):
+            if field == '_id' and set(value) == {'$in'} and isinstance(value['$in'], list):
+                clauses.append(f"id IN ({', '.join('?' * len(value['$in']))})")
+                params.extend(_encode(v) for v in value['$in'])
+        elif field == '_id':
+            clauses.append("id = ?")
+            params.append(_encode(value))
+        elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            path = _json_path(field)
+            # Arrays match on any element: leave those to mongomock
+            clauses.append(f"(json_extract(doc, {path}) = ? "
+                           f"OR json_type(doc, {path}) = 'array')")
+            params.append(value)
+    return (" AND ".join(clauses) or None), params
+
+
+def _where_any(queries: list, ids: list) -> tuple[str | None, list]:
+    """_where of any of `queries`, or of any of the _ids; None selects all."""
+    clauses, params = [], []
+    for query in queries:
+        where, where_params = _where(query)
+        if where is None:
+            return None, []
+        clauses.append(f"({where})")
+        params += where_params
+    if ids:
+        clauses.append(f"id IN ({', '.join('?' * len(ids))})")
+        params += [_encode(i) for i in ids]
+    return " OR ".join(clauses) or "0", params
+
+
+def _index_keys(keys) -> list:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(k, 1) if isinstance(k, str) else (k[0], k[1]) for k in keys]
+
+
+def _read(method: str):
+    def read(self, filter=None, *args, **kwargs):
+        return getattr(self._scratch_for(filter), method)(filter, *args, **kwargs)
+    read.__name__ = method
+    return read
+
+
+def _filtered_write(method: str):
+    def write(self, filter, *args, **kwargs):
+        return self._write([filter], [], lambda c: getattr(c, method)(filter, *args, **kwargs))
+    write.__name__ = method
+    return write
+
+
+class SQLiteCollection:
+
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._table = _quote(name)
+        with database.client.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self._table} "
+                         f"(id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+
+    def with_options(self, **kwargs):
+        # One file, one writer: write concerns have nothing to tune
+        return self
+
+    # ── Scratch collections ─────────────────────────────────────────────────
+
+    def _rows(self, conn, where: str | None = None, params=()) -> list:
+        sql = f"SELECT id, doc FROM {self._table}"
+        if where:
+            sql += f" WHERE {where}"
+        return conn.execute(sql + " ORDER BY rowid", params).fetchall()
+
+    def _scratch(self, rows, indexes=()):
+        scratch = mongomock.MongoClient().get_database(self.database.name)[self.name]
+        if rows:
+            scratch.insert_many([_decode(doc) for _, doc in rows])
+        for name, keys, unique in indexes:
+            scratch.create_index(keys, name=name, unique=unique)
+        return scratch
+
+    def _scratch_for(self, query):
+        where, params = _where(query)
+        with self.database.client.connection() as conn:
+            rows = self._rows(conn, where, params)
+        return self._scratch(rows)
+
+    def _write(self, filters: list, inserted_ids: list, op):
+        """
+        Run op(scratch) over every document `filters` may select, or that
+        may collide with inserted_ids, and store what it changed.  Write
+        errors keep the writes before them, as in Mongo.
+        """
+        with self.database.client.transaction() as conn:
+            indexes = self._index_specs(conn)
+            if any(unique for _, _, unique in indexes):
+                rows = self._rows(conn)
+            else:
+                rows = self._rows(conn, *_where_any(filters, inserted_ids))
+
+            scratch = self._scratch(rows, indexes)
+            try:
+                result, error = op(scratch), None
+            except PyMongoError as e:
+                result, error = None, e
+
+            before = dict(rows)
+            for doc in scratch.find({}):
+                key, text = _encode(doc['_id']), _encode(doc)
+                if key not in before:
+                    conn.execute(f"INSERT INTO {self._table} (id, doc) VALUES (?, ?)",
+                                 (key, text))
+                elif before.pop(key) != text:
+                    conn.execute(f"UPDATE {self._table} SET doc = ? WHERE id = ?", (text, key))
+            for key in before:
+                conn.execute(f"DELETE FROM {self._table} WHERE id = ?", (key,))
+        if error is not None:
+            raise error
+        return result
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    find = _read('find')
+    find_one = _read('find_one')
+    count_documents = _read('count_documents')
+
+    def distinct(self, key, filter=None, **kwargs):
+        return self._scratch_for(filter).distinct(key, filter, **kwargs)
+
+    def estimated_document_count(self, **kwargs) -> int:
+        with self.database.client.connection() as conn:
+            return conn.execute(f"SELECT count(*) FROM {self._table}").fetchone()[0]
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def insert_one(self, document, *args, **kwargs):
+        document.setdefault('_id', ObjectId())
+        return self._write([], [document['_id']],
+                           lambda c: c.insert_one(document, *args, **kwargs))
+
+    def insert_many(self, documents, *args, **kwargs):
+        documents = list(documents)
+        for doc in documents:
+            doc.setdefault('_id', ObjectId())
+        return self._write([], [doc['_id'] for doc in documents],
+                           lambda c: c.insert_many(documents, *args, **kwargs))
+
+    def bulk_write(self, requests, *args, **kwargs):
+        requests = list(requests)
+        filters, inserted_ids = [], []
+        for request in requests:
+            if isinstance(request, InsertOne):
+                request._doc.setdefault('_id', ObjectId())
+                inserted_ids.append(request._doc['_id'])
+            else:
+                filters.append(request._filter)
+        return self._write(filters, inserted_ids,
+                           lambda c: c.bulk_write(requests, *args, **kwargs))
+
+    update_one = _filtered_write('update_one')
+    update_many = _filtered_write('update_many')
+    replace_one = _filtered_write('replace_one')
+    delete_one = _filtered_write('delete_one')
+    delete_many = _filtered_write('delete_many')
+    find_one_and_update = _filtered_write('find_one_and_update')
+    find_one_and_replace = _filtered_write('find_one_and_replace')
+    find_one_and_delete = _filtered_write('find_one_and_delete')
+
+    # ── Indexes ──────────────────────────────────────────────────────────────
+
+    def _index_specs(self, conn) -> list:
+        rows = conn.execute(f"SELECT name, keys, is_unique FROM {_INDEX_TABLE} "
+                            f"WHERE collection = ? ORDER BY rowid", (self.name,)).fetchall()
+        return [(name, [tuple(k) for k in json.loads(keys)], bool(unique))
+                for name, keys, unique in rows]
+
+    def create_index(self, keys, name=None, unique=False, **kwargs) -> str:
+        keys = _index_keys(keys)
+        name = name or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        with self.database.client.transaction() as conn:
+            for existing, existing_keys, existing_unique in self._index_specs(conn):
+                if existing == name:
+                    if (existing_keys, existing_unique) == (keys, bool(unique)):
+                        return name
+                    raise OperationFailure(f"Index with name: {name} already exists "
+                                           f"with different options", code=86)
+            if unique:
+                # DuplicateKeyError if the documents already break it
+                self._scratch(self._rows(conn)).create_index(keys, name=name, unique=True)
+            conn.execute(f"INSERT INTO {_INDEX_TABLE} (collection, name, keys, is_unique) "
+                         f"VALUES (?, ?, ?, ?)", (self.name, name, json.dumps(keys), int(unique)))
+        return name
+
+    def index_information(self) -> dict:
+        info = {'_id_': {'v': 2, 'key': [('_id', 1)]}}
+        with self.database.client.connection() as conn:
+            for name, keys, unique in self._index_specs(conn):
+                info[name] = {'v': 2, 'key': keys, **({'unique': True} if unique else {})}
+        return info
+
+    def drop_index(self, name: str, **kwargs):
+        with self.database.client.transaction() as conn:
+            if not conn.execute(f"DELETE FROM {_INDEX_TABLE} WHERE collection = ? AND name = ?",
+                                (self.name, name)).rowcount:
+                raise OperationFailure(f"index not found with name [{name}]", code=27)
+
+    # ── Collection ───────────────────────────────────────────────────────────
+
+    def rename(self, new_name: str, **kwargs):
+        # The old name is left as an empty collection, as in Mongo
+        if new_name in self.database.list_collection_names():
+            raise OperationFailure("target namespace exists", code=48)
+        with self.database.client.transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(new_name)}")
+            conn.execute(f"ALTER TABLE {self._table} RENAME TO {_quote(new_name)}")
+            conn.execute(f"CREATE TABLE {self._table} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            conn.execute(f"UPDATE {_INDEX_TABLE} SET collection = ? WHERE collection = ?",
+                         (new_name, self.name))
+
+    def drop(self, **kwargs):
+        self.database.drop_collection(self.name)
+
+
+class SQLiteDatabase:
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> SQLiteCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs) -> SQLiteCollection:
+        return self[name]
+
+    def list_collection_names(self, **kwargs) -> list:
+        # Tables are created on first access; a collection "exists" once it
+        # holds documents or indexes, as in Mongo
+        with self.client.connection() as conn:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                  "AND name NOT LIKE '\\_\\_storage%' ESCAPE '\\'"
+                                  ).fetchall()
+            indexed = {c for (c,) in conn.execute(
+                f"SELECT DISTINCT collection FROM {_INDEX_TABLE}")}
+            return [name for (name,) in tables if name in indexed or conn.execute(
+                f"SELECT 1 FROM {_quote(name)} LIMIT 1").fetchone()]
+
+    def drop_collection(self, name_or_collection, **kwargs):
+        name = getattr(name_or_collection, 'name', name_or_collection)
+        # Emptied rather than dropped: handles to it stay usable
+        with self.client.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(name)} "
+                         f"(id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            conn.execute(f"DELETE FROM {_INDEX_TABLE} WHERE collection = ?", (name,))
+            conn.execute(f"DELETE FROM {_quote(name)}")
+
+    def command(self, command, *args, **kwargs):
+        return self.client.admin.command(command, *args, **kwargs)
+
+
+class _Admin:
+
+    def command(self, command, *args, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name != 'ping':
+            raise OperationFailure(f"no such command: '{name}'", code=59)
+        return {'ok': 1.0}
+
+
+class SQLiteClient:
+    """
+    One connection per process, shared by its threads under a lock.
+    (config.get_client builds a new client after fork.)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.admin = _Admin()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_INDEX_TABLE} "
+                           f"(collection TEXT, name TEXT, keys TEXT, is_unique INTEGER, "
+                           f"PRIMARY KEY (collection, name))")
+        self._conn_lock = threading.RLock()
+        self._depth = 0
+        self._databases = {}
+
+    def get_database(self, name=None, **kwargs) -> SQLiteDatabase:
+        # One file, one database: the name is only reported back
+        name = name or DEFAULT_DB_NAME
+        if name not in self._databases:
+            self._databases[name] = SQLiteDatabase(self, name)
+        return self._databases[name]
+
+    __getitem__ = get_database
+
+    def start_session(self, *args, **kwargs):
+        raise NotImplementedError("SQLite storage has no sessions")
+
+    @contextmanager
+    def connection(self):
+        with self._conn_lock:
+            if self._conn is None:
+                raise OperationFailure("SQLite storage client is closed")
+            yield self._conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; nested uses join the outermost one."""
+        with self.connection() as conn:
+            outermost = self._depth == 0
+            if outermost:
+                conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if outermost:
+                    conn.execute("COMMIT")
+
+    def close(self):
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,8 +1,143 @@
 from flask import jsonify
 from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from config import db
+import logging
+import time
 
-subjects_collection = db['subjects']
+logger = logging.getLogger(__name__)
+
+# One document per subject: {_id, year, name, short_name, …}, unique on
+# (year, short_name) — see db_indexes.
+subject_collection = db['subject']
+
+# Pre-normalisation layout: a single document holding "sy"/"ty"/"be" arrays.
+# Merged in by the compatibility reader until migrate_legacy_subjects() has
+# copied it into subject_collection.
+legacy_subjects_collection = db['subjects']
+
+YEARS = ['sy', 'ty', 'be']
+
+
+def sanitise_subject(data) -> dict:
+    """
+    Validate one subject from client data.
+    Returns the document to store (with a fresh ObjectId _id and its year);
+    raises ValueError with a client-facing message on bad input.  Shared by
+    save_subjects and the bulk import.
+    """
+    required_fields = [
+        'year', 'name', 'short_name', 'hrs_per_week_lec',
+        'hrs_per_week_practical', 'practical_duration', 'practical_type'
+    ]
+    for field in required_fields:
+        if field not in data:
+            raise ValueError(f"Missing required field: '{field}'")
+
+    year = str(data.get('year')).lower()
+    if year not in YEARS:
+        raise ValueError(f"Invalid year. Must be one of: {', '.join(YEARS)}")
+
+    # SH-02 FIX: store a real ObjectId, not str(ObjectId()).
+    # Serialise to string only in the API response.
+    subject_obj = {
+        "_id":                    ObjectId(),       # real ObjectId in DB
+        "year":                   year,
+        "name":                   data.get('name'),
+        "short_name":             data.get('short_name'),
+        "hrs_per_week_lec":       data.get('hrs_per_week_lec'),
+        "hrs_per_week_practical": data.get('hrs_per_week_practical'),
+        "practical_duration":     data.get('practical_duration'),
+        "practical_type":         data.get('practical_type'),
+    }
+
+    if 'required_labs' in data and data.get('required_labs'):
+        subject_obj['required_labs'] = data.get('required_labs')
+
+    return subject_obj
+
+
+def duplicate_subject_message(doc: dict) -> str:
+    return (f"Subject with short_name '{doc['short_name']}' "
+            f"already exists in {doc['year'].upper()}")
+
+
+def _id_values(subject_id_raw) -> list:
+    # Accept both ObjectId and legacy string _ids stored by older code (SH-02
+    # migration compatibility: existing docs may still have string _ids).
+    values = [subject_id_raw]
+    if ObjectId.is_valid(subject_id_raw):
+        values.append(ObjectId(subject_id_raw))
+    return values
+
+
+# ---------- Compatibility reader ----------
+def subjects_by_year(short_names=None, fields=None, session=None) -> dict:
+    """
+    Subjects grouped as {"sy": [...], "ty": [...], "be": [...]} — the shape
+    the API and the generators have always used.
+
+    short_names limits the read to those subjects (one indexed query);
+    fields projects each subject.  Until the legacy document has been
+    migrated its subjects are served too, except where subject_collection
+    has one with the same year and short_name — what the migration keeps.
+    """
+    query = {'short_name': {'$in': list(short_names)}} if short_names is not None else {}
+    projection = {'year': 1, 'short_name': 1, **{f: 1 for f in fields}} if fields else None
+    grouped = {yr: [] for yr in YEARS}
+
+    for doc in subject_collection.find(query, projection, session=session):
+        yr = doc.pop('year', None)
+        if yr in grouped:
+            grouped[yr].append(doc)
+
+    legacy = legacy_subjects_collection.find_one({}, session=session)
+    if legacy:
+        for yr in YEARS:
+            stored = {s.get('short_name') for s in grouped[yr]}
+            grouped[yr].extend(
+                s for s in legacy.get(yr, [])
+                if isinstance(s, dict) and s.get('short_name') not in stored
+                and (short_names is None or s.get('short_name') in short_names))
+    return grouped
+
+
+# ---------- Migration ----------
+def migrate_legacy_subjects() -> int:
+    """
+    Copy the legacy single-document layout into subject_collection, then
+    rename the old collection to subjects_legacy_<timestamp> as a backup.
+    Safe to call on every startup: it does nothing once the legacy
+    collection is gone.  Returns the number of subjects copied.
+    """
+    legacy = legacy_subjects_collection.find_one({})
+    if not legacy:
+        return 0
+
+    ops = [InsertOne({**subj, 'year': yr})
+           for yr in YEARS for subj in legacy.get(yr, []) if isinstance(subj, dict)]
+    migrated = 0
+    if ops:
+        try:
+            migrated = subject_collection.bulk_write(ops, ordered=False).inserted_count
+        except BulkWriteError as e:
+            # Subjects already copied by an interrupted earlier run, or
+            # repeated short_names within a year (kept in the backup only)
+            migrated = e.details.get('nInserted', 0)
+            for err in e.details.get('writeErrors', []):
+                logger.warning(f"⚠️  Subject not migrated: {err.get('errmsg')}")
+
+    backup = f"subjects_legacy_{int(time.time())}"
+    try:
+        legacy_subjects_collection.rename(backup)
+    except PyMongoError as e:
+        # Another worker finished the migration first
+        logger.warning(f"⚠️  Could not rename legacy subjects collection: {e}")
+        return migrated
+    logger.info(f"✓ Migrated {migrated} subject(s) to '{subject_collection.name}'; "
+                f"old document kept in '{backup}'")
+    return migrated
 
 
 def save_subjects(data):
@@ -21,63 +156,23 @@ def save_subjects(data):
     }
     """
     try:
-        required_fields = [
-            'year', 'name', 'short_name', 'hrs_per_week_lec',
-            'hrs_per_week_practical', 'practical_duration', 'practical_type'
-        ]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: '{field}'"}), 400
-
-        year = data.get('year').lower()
-        valid_years = ['sy', 'ty', 'be']
-        if year not in valid_years:
-            return jsonify({"error": f"Invalid year. Must be one of: {', '.join(valid_years)}"}), 400
-
-        # SH-02 FIX: store a real ObjectId, not str(ObjectId()).
-        # Serialise to string only in the API response below.
-        new_oid = ObjectId()
-
-        subject_obj = {
-            "_id":                    new_oid,          # real ObjectId in DB
-            "name":                   data.get('name'),
-            "short_name":             data.get('short_name'),
-            "hrs_per_week_lec":       data.get('hrs_per_week_lec'),
-            "hrs_per_week_practical": data.get('hrs_per_week_practical'),
-            "practical_duration":     data.get('practical_duration'),
-            "practical_type":         data.get('practical_type'),
-        }
-
-        if 'required_labs' in data and data.get('required_labs'):
-            subject_obj['required_labs'] = data.get('required_labs')
-
-        existing_doc = subjects_collection.find_one({})
-
-        if existing_doc:
-            year_subjects = existing_doc.get(year, [])
-            subject_exists = any(
-                s.get('short_name') == subject_obj['short_name']
-                for s in year_subjects
-            )
-            if subject_exists:
-                return jsonify({
-                    "error": (f"Subject with short_name '{subject_obj['short_name']}' "
-                              f"already exists in {year.upper()}")
-                }), 409
-
-            subjects_collection.update_one(
-                {"_id": existing_doc["_id"]},
-                {"$push": {year: subject_obj}}
-            )
-            message = f"Subject '{data.get('name')}' added to {year.upper()}"
-        else:
-            new_doc = {"sy": [], "ty": [], "be": []}
-            new_doc[year] = [subject_obj]
-            subjects_collection.insert_one(new_doc)
-            message = (f"Subjects collection created and "
-                       f"'{data.get('name')}' added to {year.upper()}")
+        try:
+            subject_obj = sanitise_subject(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Checked here; the (year, short_name) unique index rejects the
+        # duplicate of a concurrent request that passed the check too
+        if subject_collection.find_one({"year": subject_obj["year"],
+                                        "short_name": subject_obj["short_name"]}, {"_id": 1}):
+            return jsonify({"error": duplicate_subject_message(subject_obj)}), 409
+        try:
+            subject_collection.insert_one(subject_obj)
+        except DuplicateKeyError:
+            return jsonify({"error": duplicate_subject_message(subject_obj)}), 409
 
-        return jsonify({"message": message, "subject_id": str(new_oid)}), 201
+        message = f"Subject '{data.get('name')}' added to {subject_obj['year'].upper()}"
+        return jsonify({"message": message, "subject_id": str(subject_obj['_id'])}), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -89,22 +184,8 @@ def get_subjects():
     Subject _id ObjectIds are serialised to strings for JSON transport.
     """
     try:
-        subjects_doc = subjects_collection.find_one({})
-
-        if not subjects_doc:
-            return jsonify({"sy": [], "ty": [], "be": []}), 200
-
-        subjects_doc.pop('_id', None)
-
-        for yr in ['sy', 'ty', 'be']:
-            if yr not in subjects_doc:
-                subjects_doc[yr] = []
-            # Serialise any ObjectId _ids to strings so JSON doesn't choke
-            for subj in subjects_doc[yr]:
-                if isinstance(subj.get('_id'), ObjectId):
-                    subj['_id'] = str(subj['_id'])
-
-        return jsonify(subjects_doc), 200
+        # ObjectId _ids are serialised by the app's JSON provider (responses.py)
+        return jsonify(subjects_by_year()), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -114,10 +195,6 @@ def update_subject(data):
     """
     Update a subject by its _id.
 
-    SH-01 FIX: uses the $ positional operator with an array-element filter
-    instead of a positional index.  This is atomic — no race condition even
-    if two requests arrive simultaneously.
-
     Expected data:
     {
         "id": "<subject_id>",   # string representation of the ObjectId
@@ -138,44 +215,12 @@ def update_subject(data):
         if not subject_id_raw or not year:
             return jsonify({"error": "Missing 'id' or 'year'"}), 400
 
-        valid_years = ['sy', 'ty', 'be']
-        if year not in valid_years:
+        if year not in YEARS:
             return jsonify({
-                "error": f"Invalid year. Must be one of: {', '.join(valid_years)}"
+                "error": f"Invalid year. Must be one of: {', '.join(YEARS)}"
             }), 400
 
-        # Accept both ObjectId and legacy string _ids stored by older code (SH-02
-        # migration compatibility: existing docs may still have string _ids).
-        try:
-            subject_id_oid = ObjectId(subject_id_raw)
-            id_filter_value = subject_id_oid   # real ObjectId
-        except Exception:
-            id_filter_value = subject_id_raw   # fallback: plain string
-
-        # SH-02 compatibility: also try matching as the string form in case the
-        # document was written before this fix was deployed.
-        # We match whichever form is actually stored.
-        existing_doc = subjects_collection.find_one({})
-        if not existing_doc:
-            return jsonify({"error": "No subjects found"}), 404
-
-        # Detect which form is stored so we use the right filter value
-        year_subjects = existing_doc.get(year, [])
-        stored_id = None
-        for subj in year_subjects:
-            raw = subj.get('_id')
-            if str(raw) == str(subject_id_raw):
-                stored_id = raw   # use exactly what's in the DB as the filter
-                break
-
-        if stored_id is None:
-            return jsonify({
-                "error": f"Subject with ID '{subject_id_raw}' not found in {year.upper()}"
-            }), 404
-
-        # Build the replacement object, preserving the stored _id type
         updated_subject = {
-            "_id":                    stored_id,
             "name":                   data.get('name'),
             "short_name":             data.get('short_name'),
             "hrs_per_week_lec":       data.get('hrs_per_week_lec'),
@@ -183,15 +228,21 @@ def update_subject(data):
             "practical_duration":     data.get('practical_duration'),
             "practical_type":         data.get('practical_type'),
         }
+        update = {"$set": updated_subject}
         if 'required_labs' in data and data.get('required_labs'):
             updated_subject['required_labs'] = data.get('required_labs')
+        else:
+            update["$unset"] = {"required_labs": ""}
 
-        # SH-01 FIX: $ positional operator — filter on the array element's _id,
-        # then set the matched element to the new object.  No index needed.
-        result = subjects_collection.update_one(
-            {f"{year}._id": stored_id},
-            {"$set": {f"{year}.$": updated_subject}}
-        )
+        # One atomic update of the subject's own document
+        try:
+            result = subject_collection.update_one(
+                {"_id": {"$in": _id_values(subject_id_raw)}, "year": year}, update
+            )
+        except DuplicateKeyError:
+            return jsonify({
+                "error": duplicate_subject_message({**updated_subject, 'year': year})
+            }), 409
 
         if result.matched_count == 0:
             return jsonify({
@@ -216,31 +267,16 @@ def delete_subject(data):
         if not subject_id_raw or not year:
             return jsonify({"error": "Missing 'id' or 'year'"}), 400
 
-        valid_years = ['sy', 'ty', 'be']
-        if year not in valid_years:
+        if year not in YEARS:
             return jsonify({
-                "error": f"Invalid year. Must be one of: {', '.join(valid_years)}"
+                "error": f"Invalid year. Must be one of: {', '.join(YEARS)}"
             }), 400
 
-        # Migration compatibility: try $pull with both ObjectId and string forms
-        # so documents written before the SH-02 fix are also deletable.
-        try:
-            oid = ObjectId(subject_id_raw)
-        except Exception:
-            oid = None
-
-        # Try ObjectId form first
-        result = subjects_collection.update_one(
-            {}, {"$pull": {year: {"_id": oid}}}
-        ) if oid else None
-
-        if not result or result.modified_count == 0:
-            # Fall back to string form (pre-fix documents)
-            result = subjects_collection.update_one(
-                {}, {"$pull": {year: {"_id": subject_id_raw}}}
-            )
+        result = subject_collection.delete_one(
+            {"_id": {"$in": _id_values(subject_id_raw)}, "year": year}
+        )
 
-        if result.modified_count > 0:
+        if result.deleted_count > 0:
             return jsonify({"message": f"Subject deleted successfully from {year.upper()}"}), 200
         else:
             return jsonify({
@@ -248,4 +284,4 @@ def delete_subject(data):
             }), 404
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,227 @@
+# timetable_cache.py
+# Versioned, pre-encoded responses for the timetable read endpoints.
+#
+# Timetables only change when the generation pipeline (or a rollback) runs,
+# so every run that changes stored documents stamps a new version in
+# timetable_meta.  Read endpoints go through
+# cached_response(), which
+#   • answers If-None-Match / If-Modified-Since with 304 (ETag = version),
+#   • otherwise serves the body from an in-process cache keyed by version,
+#     already gzip- (and, when the optional `brotli` package is installed,
+#     br-) compressed, so repeat reads neither hit the timetable
+#     collections nor re-serialise or re-compress anything.
+#
+# When the pipeline has published a response snapshot (response_snapshot)
+# of the current version, reads are served straight from that file, with
+# no database work at all: runs on this host replace the file, which every
+# worker notices on its next read.  A run on another host does not, so a
+# worker confirms its snapshot's version against timetable_meta at most
+# every SNAPSHOT_RECHECK_SECONDS and stops serving it once it is outdated.
+# Reads not in the snapshot cost one _id lookup of the version doc.
+
+from flask import current_app, request
+from pymongo import ReturnDocument
+from config import db
+from modules import response_snapshot
+from datetime import datetime, timezone
+from werkzeug.wsgi import wrap_file
+import gzip
+import os
+import threading
+import time
+import logging
+
+try:
+    import brotli
+except ImportError:            # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+meta_collection = db['timetable_meta']
+
+_VERSION_ID = 'timetable_version'
+
+# Bodies below this size are not worth compressing
+_MIN_COMPRESS_BYTES = 512
+
+# How long a worker serves its snapshot before re-reading the version doc
+SNAPSHOT_RECHECK_SECONDS = float(os.getenv("SNAPSHOT_RECHECK_SECONDS", "1"))
+
+_lock  = threading.Lock()
+_cache: dict = {}              # key → (version, {encoding: bytes}, mimetype)
+_confirmed = (None, 0.0)       # (snapshot version, monotonic time it matched)
+
+
+def stamp_version() -> dict:
+    """Start a new timetable version: cached and snapshot responses go stale."""
+    doc = meta_collection.find_one_and_update(
+        {'_id': _VERSION_ID},
+        {'$inc': {'version': 1},
+         '$set': {'generated_at': datetime.now(timezone.utc).replace(microsecond=0),
+                  'writing': False}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    logger.info(f"Timetable version {doc['version']}")
+    return doc
+
+
+def begin_writes() -> bool:
+    """
+    Mark the timetables as being rewritten (a generation run or rollback).
+    Returns True if the previous run never called end_writes() — its worker
+    died mid-write — so this one must stamp a new version whatever it saves.
+    """
+    before = meta_collection.find_one_and_update(
+        {'_id': _VERSION_ID},
+        {'$set': {'writing': True}, '$setOnInsert': {'version': 0}},
+        upsert=True,
+    )
+    return bool(before and before.get('writing'))
+
+
+def end_writes(changed: bool, builders: dict) -> dict:
+    """
+    Finish what begin_writes() started.  Only a run that changed stored
+    documents stamps a new version; otherwise the current one stays valid,
+    with its ETags and cached bodies — whatever was read mid-run equals its
+    content.  The response snapshot is (re)published when the version is
+    new or this host has none of it yet.
+    """
+    if changed:
+        meta = stamp_version()
+    else:
+        meta = meta_collection.find_one_and_update(
+            {'_id': _VERSION_ID}, {'$set': {'writing': False}},
+            return_document=ReturnDocument.AFTER)
+    snap = response_snapshot.current()
+    if changed or snap is None or snap.version != meta['version']:
+        publish_snapshot(meta, builders)
+    return meta
+
+
+def current_version() -> dict:
+    """The stamped version doc, or version 0 if nothing was generated yet."""
+    return meta_collection.find_one({'_id': _VERSION_ID}) or {'version': 0}
+
+
+def _encode(body: bytes) -> dict:
+    bodies = {'identity': body}
+    if len(body) >= _MIN_COMPRESS_BYTES:
+        bodies['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body)
+    return bodies
+
+
+def _lookup(key, version):
+    with _lock:
+        entry = _cache.get(key)
+    if entry and entry[0] == version:
+        return entry[1], entry[2]
+    return None
+
+
+def _store(key, version, bodies, mimetype):
+    with _lock:
+        # Entries from older versions can never be served again
+        for k in [k for k, e in _cache.items() if e[0] != version]:
+            del _cache[k]
+        _cache[key] = (version, bodies, mimetype)
+
+
+def publish_snapshot(meta: dict, builders: dict):
+    """
+    Pre-render every response in `builders` (key → build, as for
+    cached_response) into the shared response snapshot for version `meta`.
+    If that fails the old snapshot is removed, so reads fall back to this
+    module's cache instead of serving an outdated version.
+    """
+    try:
+        entries = {}
+        for key, build in builders.items():
+            response, status = build()
+            if status == 200:
+                entries[key] = (response.mimetype, _encode(response.get_data()))
+        response_snapshot.write(meta['version'], meta.get('generated_at'), entries)
+    except Exception as e:
+        logger.error(f"Publishing response snapshot failed: {e}", exc_info=True)
+        if response_snapshot.SNAPSHOT_PATH:
+            try:
+                os.remove(response_snapshot.SNAPSHOT_PATH)
+            except FileNotFoundError:
+                pass
+
+
+def _snapshot_is_current(snap) -> bool:
+    """snap.version is the stamped version, as of SNAPSHOT_RECHECK_SECONDS ago."""
+    global _confirmed
+    now = time.monotonic()
+    version, at = _confirmed
+    if version == snap.version and now - at < SNAPSHOT_RECHECK_SECONDS:
+        return True
+    if current_version()['version'] != snap.version:
+        return False
+    _confirmed = (snap.version, now)
+    return True
+
+
+def _respond(bodies: dict, mimetype: str, version, generated_at, snap=None, key=None):
+    encoding = request.accept_encodings.best_match(
+        [e for e in ('br', 'gzip') if e in bodies]) or 'identity'
+
+    body = bodies[encoding]
+    opened = snap.open(key, encoding) if snap is not None else None
+    if opened is not None:
+        # Sent from the snapshot file by the server (sendfile under gunicorn)
+        response = current_app.response_class(
+            wrap_file(request.environ, opened), mimetype=mimetype,
+            direct_passthrough=True)
+        response.content_length = len(body)
+    else:
+        # A slice of a replaced snapshot's mapping: WSGI servers take bytes only
+        if isinstance(body, memoryview):
+            body = bytes(body)
+        response = current_app.response_class(body, mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # Weak: the gzip/br/identity bodies are equivalent, not byte-identical
+    response.set_etag(f"v{version}", weak=True)
+    if generated_at:
+        response.last_modified = generated_at
+    # Clients may keep the body but must revalidate — a cheap 304
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def cached_response(key: str, build):
+    """
+    Serve a read endpoint from the shared response snapshot when it is of
+    the current version and has `key`, else through the in-process version
+    cache.
+
+    key:   string identifying the representation, e.g. 'class_timetables'
+           or 'class_timetable/SY/A?format=sparse'.
+    build: zero-arg callable returning the handler's usual
+           (response, status); only 200 responses are cached.
+    """
+    snap = response_snapshot.current()
+    if snap is not None:
+        hit = snap.get(key)
+        if hit is not None and _snapshot_is_current(snap):
+            mimetype, bodies = hit
+            return _respond(bodies, mimetype, snap.version, snap.generated_at, snap, key)
+
+    meta    = current_version()
+    version = meta['version']
+    hit = _lookup(key, version)
+    if hit is None:
+        response, status = build()
+        if status != 200:
+            return response, status
+        hit = (_encode(response.get_data()), response.mimetype)
+        _store(key, version, *hit)
+    bodies, mimetype = hit
+    return _respond(bodies, mimetype, version, meta.get('generated_at'))
@@ -0,0 +1,432 @@
+# timetable_export.py
+# Server-side XLSX / CSV export of the stored timetables.
+#
+# Same sheet layout as the browser export (Frontend/src/lib/excelExport.js):
+# one row per session, a blank spacer row after every time slot, 13:15 as
+# LUNCH BREAK.  Files are produced row by row from the stored schedules and
+# streamed as they are built — XLSX through zipfile on a non-seekable sink,
+# so no extra dependency — and the finished bytes are kept per timetable
+# version, so repeat downloads are served from memory.
+
+from flask import current_app, jsonify, request, stream_with_context
+from config import db
+from modules.schedule_format import DAYS, expand_doc
+from modules.timetable_cache import current_version
+from xml.sax.saxutils import escape
+import csv
+import io
+import re
+import threading
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+class_timetable_collection      = db['class_timetable']
+master_lab_timetable_collection = db['master_lab_timetable']
+faculty_timetable_collection    = db['faculty_timetable']
+
+LUNCH_SLOT = '13:15'
+FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv':  'text/csv; charset=utf-8',
+}
+
+# Documents fetched from Mongo per round-trip for the institution export
+_BATCH_SIZE = 20
+
+_lock  = threading.Lock()
+_cache: dict = {}              # key → (version, bytes)
+
+
+# ── Cell content (mirrors excelExport.js) ─────────────────────────────────────
+
+def _batch_label(batch) -> str:
+    """Batches are ints in class docs but 'Batch N' strings in lab docs."""
+    return f"B{batch}" if isinstance(batch, int) else str(batch)
+
+
+def _cell_for_class_session(s: dict) -> str:
+    lines = []
+    if s.get('subject'):
+        full = f" ({s['subject_full']})" if s.get('subject_full') else ''
+        lines.append(f"{s['subject']}{full}")
+    if s.get('faculty'):
+        lines.append(f"Faculty: {s['faculty']}")
+    if s.get('batch') and s['batch'] != 'All':
+        lines.append(f"Batch: {s['batch']}")
+    if s.get('lab'):
+        lines.append(f"Lab: {s['lab']}")
+    return '\n'.join(lines)
+
+
+def _cell_for_lab_session(s: dict) -> str:
+    cls = '-'.join(x for x in (s.get('class'), s.get('division')) if x)
+    lines = []
+    if cls:
+        lines.append(f"Class: {cls}")
+    if s.get('batch'):
+        lines.append(f"Batch: {_batch_label(s['batch'])}")
+    if s.get('subject'):
+        lines.append(f"Sub: {s['subject']}")
+    if s.get('faculty'):
+        lines.append(f"Faculty: {s['faculty']}")
+    return '\n'.join(lines)
+
+
+def _cell_for_faculty_session(s: dict) -> str:
+    cls = ' '.join(x for x in (s.get('class_key'),
+                               f"Div {s['division']}" if s.get('division') else '') if x)
+    lines = []
+    if cls:
+        lines.append(f"Class: {cls}")
+    if s.get('subject'):
+        lines.append(f"Sub: {s['subject']}")
+    if s.get('batch') and s['batch'] != 'All':
+        lines.append(f"Batch: {s['batch']}")
+    if s.get('lab'):
+        lines.append(f"Lab: {s['lab']}")
+    return '\n'.join(lines)
+
+
+def _slot_minutes(slot: str) -> int:
+    h, _, m = slot.replace('.', ':').partition(':')
+    return int(h) * 60 + int(m or 0)
+
+
+def _grid_rows(schedule: dict, cell_fn):
+    """Yield the expanded grid for one schedule, row by row."""
+    slots = sorted({slot for day in schedule.values() for slot in day},
+                   key=_slot_minutes)
+    spacer = [''] * (len(DAYS) + 1)
+    yield ['Time / Day', *DAYS]
+    for slot in slots:
+        if slot == LUNCH_SLOT:
+            yield [slot, *['--- LUNCH BREAK ---'] * len(DAYS)]
+            yield spacer
+            continue
+        by_day = [schedule.get(day, {}).get(slot, []) for day in DAYS]
+        for i in range(max(1, *map(len, by_day))):
+            yield [slot if i == 0 else '',
+                   *[cell_fn(s[i]) if i < len(s) else '' for s in by_day]]
+        yield spacer
+
+
+# ── Sheets: (title, rows) pairs ───────────────────────────────────────────────
+
+def _class_sheet(doc: dict):
+    doc = expand_doc(doc)
+    return (f"{doc['class']}-{doc['division']}",
+            _grid_rows(doc['schedule'], _cell_for_class_session))
+
+
+def _lab_sheet(doc: dict):
+    doc = expand_doc(doc)
+    return doc['lab_name'], _grid_rows(doc['schedule'], _cell_for_lab_session)
+
+
+def _faculty_sheet(doc: dict):
+    doc = expand_doc(doc)
+    return (doc.get('faculty') or doc['faculty_id'],
+            _grid_rows(doc['schedule'], _cell_for_faculty_session))
+
+
+def _institution_sheets():
+    """Every class, then every lab, then every faculty member — streamed."""
+    for collection, sort, sheet in (
+        (class_timetable_collection,      [('class', 1), ('division', 1)], _class_sheet),
+        (master_lab_timetable_collection, [('lab_name', 1)],               _lab_sheet),
+        (faculty_timetable_collection,    [('faculty', 1)],                _faculty_sheet),
+    ):
+        for doc in collection.find({}).sort(sort).batch_size(_BATCH_SIZE):
+            yield sheet(doc)
+
+
+# ── Writers ───────────────────────────────────────────────────────────────────
+
+class _Sink:
+    """Write-only, non-seekable file object that collects what is written."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b''.join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _csv_stream(sheets, multi: bool):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\r\n')
+    # BOM: Excel opens the file as UTF-8 instead of the system code page
+    yield '\ufeff'.encode('utf-8')
+    for title, rows in sheets:
+        if multi:
+            writer.writerow([title])
+        for row in rows:
+            writer.writerow(row)
+        if multi:
+            writer.writerow([])
+        yield buf.getvalue().encode('utf-8')
+        buf.seek(0)
+        buf.truncate()
+
+
+_NS     = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_XML    = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_STYLES = (
+    f'{_XML}<styleSheet xmlns="{_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" applyAlignment="1">'
+    '<alignment wrapText="1" vertical="top"/></xf>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs></styleSheet>'
+)
+_WRAP, _BOLD = 1, 2
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _col_name(idx: int) -> str:
+    name = ''
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _row_xml(r: int, row: list, style: int) -> str:
+    cells = ''.join(
+        f'<c r="{_col_name(c)}{r}" t="inlineStr" s="{style}"><is>'
+        f'<t xml:space="preserve">{escape(_INVALID_XML.sub("", str(v)))}</t></is></c>'
+        for c, v in enumerate(row) if v not in ('', None)
+    )
+    return f'<row r="{r}">{cells}</row>'
+
+
+def _sheet_name(title: str, used: set) -> str:
+    """Excel sheet names: ≤31 chars, no []:*?/\\, unique (case-insensitive)."""
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(title)).strip("'")[:31] or 'Sheet'
+    name, n = base, 2
+    while name.lower() in used:
+        suffix = f" ({n})"
+        name, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(name.lower())
+    return name
+
+
+def _xlsx_stream(sheets):
+    sink = _Sink()
+    names: list = []
+    used: set = set()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for idx, (title, rows) in enumerate(sheets, start=1):
+            names.append(_sheet_name(title, used))
+            with zf.open(f'xl/worksheets/sheet{idx}.xml', 'w') as f:
+                f.write((f'{_XML}<worksheet xmlns="{_NS}"><cols>'
+                         '<col min="1" max="1" width="12" customWidth="1"/>'
+                         f'<col min="2" max="{len(DAYS) + 1}" width="30" customWidth="1"/>'
+                         '</cols><sheetData>').encode('utf-8'))
+                for r, row in enumerate(rows, start=1):
+                    f.write(_row_xml(r, row, _BOLD if r == 1 else _WRAP).encode('utf-8'))
+                    if r % 50 == 0:
+                        yield sink.drain()
+                f.write(b'</sheetData></worksheet>')
+            yield sink.drain()
+
+        if not names:
+            # A workbook needs at least one sheet
+            names.append('Timetable')
+            zf.writestr('xl/worksheets/sheet1.xml',
+                        f'{_XML}<worksheet xmlns="{_NS}"><sheetData/></worksheet>')
+
+        # Package metadata goes last: only now are the sheet names known
+        sheet_ids = range(1, len(names) + 1)
+        zf.writestr('xl/workbook.xml', (
+            f'{_XML}<workbook xmlns="{_NS}" xmlns:r="{_REL_NS}"><sheets>'
+            + ''.join(f'<sheet name="{escape(n, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                      for i, n in zip(sheet_ids, names))
+            + '</sheets></workbook>'))
+        zf.writestr('xl/_rels/workbook.xml.rels', (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" '
+                      f'Target="worksheets/sheet{i}.xml"/>' for i in sheet_ids)
+            + f'<Relationship Id="rId{len(names) + 1}" Type="{_REL_NS}/styles" '
+              'Target="styles.xml"/></Relationships>'))
+        zf.writestr('xl/styles.xml', _STYLES)
+        zf.writestr('_rels/.rels', (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'))
+        zf.writestr('[Content_Types].xml', (
+            f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/'
+                      'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in sheet_ids)
+            + '</Types>'))
+    yield sink.drain()
+
+
+# ── Version cache + response ──────────────────────────────────────────────────
+
+def _lookup(key, version):
+    """(filename, bytes) cached for `key` at `version`, or None."""
+    with _lock:
+        entry = _cache.get(key)
+    return entry[1:] if entry and entry[0] == version else None
+
+
+def _store(key, version, filename: str, body: bytes):
+    with _lock:
+        for k in [k for k, e in _cache.items() if e[0] != version]:
+            del _cache[k]
+        _cache[key] = (version, filename, body)
+
+
+def _teed(key, version, filename, chunks):
+    """Pass chunks through and cache the whole file once it is complete."""
+    parts = []
+    for chunk in chunks:
+        if chunk:
+            parts.append(chunk)
+            yield chunk
+    _store(key, version, filename, b''.join(parts))
+
+
+def _export(key: str, fmt: str, load, missing: str, multi: bool = False):
+    """
+    load: zero-arg callable reading the stored timetables and returning
+    (filename, sheets), or None when there is nothing to export (404 with
+    `missing`).  It runs only on a cache miss and after the version is
+    read, as in timetable_cache.cached_response: a run publishing in
+    between can make the file newer than its version, never older.
+    """
+    meta    = current_version()
+    version = meta['version']
+    cache_key = f"{key}.{fmt}"
+
+    hit = _lookup(cache_key, version)
+    if hit is not None:
+        filename, body = hit
+        response = current_app.response_class(body, mimetype=FORMATS[fmt])
+    else:
+        loaded = load()
+        if loaded is None:
+            return jsonify({'error': missing}), 404
+        filename, sheets = loaded
+        chunks = _xlsx_stream(sheets) if fmt == 'xlsx' else _csv_stream(sheets, multi)
+        response = current_app.response_class(
+            stream_with_context(_teed(cache_key, version, filename, chunks)),
+            mimetype=FORMATS[fmt])
+
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response.set_etag(f"v{version}", weak=True)
+    if meta.get('generated_at'):
+        response.last_modified = meta['generated_at']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _format():
+    fmt = request.args.get('format', 'xlsx').lower()
+    return fmt if fmt in FORMATS else None
+
+
+def _safe(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_-]', '_', name)
+
+
+def export_class(class_name: str, division: str):
+    """GET /api/export/class/<class>/<division>?format=xlsx|csv"""
+    try:
+        fmt = _format()
+        if not fmt:
+            return jsonify({'error': "format must be 'xlsx' or 'csv'"}), 400
+        c, d = class_name.upper(), division.upper()
+
+        def load():
+            doc = class_timetable_collection.find_one({'class': c, 'division': d})
+            return doc and (f"Class_Timetable_{_safe(c)}-Div{_safe(d)}", [_class_sheet(doc)])
+
+        return _export(f"class/{c}/{d}", fmt, load, f'No timetable found for {c}-{d}')
+    except Exception as e:
+        logger.error(f"export_class error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def export_lab(lab_name: str):
+    """GET /api/export/lab/<lab_name>?format=xlsx|csv"""
+    try:
+        fmt = _format()
+        if not fmt:
+            return jsonify({'error': "format must be 'xlsx' or 'csv'"}), 400
+        def load():
+            doc = master_lab_timetable_collection.find_one({'lab_name': lab_name})
+            return doc and (f"Lab_Timetable_{_safe(lab_name)}", [_lab_sheet(doc)])
+
+        return _export(f"lab/{lab_name}", fmt, load, f'No timetable found for lab {lab_name}')
+    except Exception as e:
+        logger.error(f"export_lab error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def export_faculty(faculty_id: str):
+    """GET /api/export/faculty/<faculty_id>?format=xlsx|csv"""
+    try:
+        fmt = _format()
+        if not fmt:
+            return jsonify({'error': "format must be 'xlsx' or 'csv'"}), 400
+        def load():
+            doc = faculty_timetable_collection.find_one({'faculty_id': faculty_id})
+            name = doc and (doc.get('faculty') or faculty_id)
+            return doc and (f"Faculty_Timetable_{_safe(name)}", [_faculty_sheet(doc)])
+
+        return _export(f"faculty/{faculty_id}", fmt, load,
+                       f'No timetable found for faculty {faculty_id}')
+    except Exception as e:
+        logger.error(f"export_faculty error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def export_institution():
+    """
+    GET /api/export/institution?format=xlsx|csv
+    XLSX: one sheet per class, lab and faculty member.
+    CSV:  the same grids one after another, each under a title row.
+    """
+    try:
+        fmt = _format()
+        if not fmt:
+            return jsonify({'error': "format must be 'xlsx' or 'csv'"}), 400
+        return _export("institution", fmt,
+                       lambda: ("Institution_Timetables", _institution_sheets()),
+                       None, multi=True)
+    except Exception as e:
+        logger.error(f"export_institution error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
@@ -2,6 +2,9 @@
 
 from datetime import datetime
 from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import compact_doc
+from modules.input_snapshot import InputSnapshot
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -24,10 +27,6 @@ COVERS = {'12:15': '11:15', '15:15': '14:15'}
 # preserving priority while guaranteeing BE is never locked out.
 ROUND_ROBIN_CYCLE = ['SY', 'SY', 'TY', 'TY', 'BE']
 
-subjects_collection             = db['subjects']
-faculty_collection              = db['faculty']
-workload_collection             = db['workload']
-labs_collection                 = db['labs']
 master_lab_timetable_collection = db['master_lab_timetable']
 
 
@@ -45,34 +44,23 @@ def _normalise_batch(raw) -> int | None:
 
 class TimetableGenerator:
 
-    def __init__(self):
+    def __init__(self, inputs: InputSnapshot | None = None):
         self.lab_schedule   = {}   # lab_name → day → slot → [sessions]
         self.batch_occupied = {}   # (year, div, batch) → day → slot → bool
-        self.faculty_names  = {}
         self.labs_list      = []
-        self.subject_map    = {}   # short_name → subject doc
+        self._inputs        = inputs
 
     # ── Data loading ─────────────────────────────────────────────────────────
 
-    def _load_faculty_names(self):
-        for f in faculty_collection.find({}, {'_id': 1, 'name': 1, 'short_name': 1}):
-            self.faculty_names[str(f['_id'])] = f.get('short_name') or f.get('name', '')
-        logger.info(f"✓ Loaded {len(self.faculty_names)} faculty")
-
-    def _load_subject_map(self):
-        doc = subjects_collection.find_one({})
-        if not doc:
-            return
-        for yr in ['sy', 'ty', 'be']:
-            for subj in doc.get(yr, []):
-                sname = subj.get('short_name', '')
-                if sname:
-                    self.subject_map[sname] = subj
-        logger.info(f"✓ Loaded {len(self.subject_map)} subjects")
+    @property
+    def inputs(self) -> InputSnapshot:
+        """The run's shared inputs; loaded here when none were passed in."""
+        if self._inputs is None:
+            self._inputs = InputSnapshot.load()
+        return self._inputs
 
     def _load_labs(self):
-        labs = list(labs_collection.find({}))
-        self.labs_list = [lab['name'] for lab in labs if lab.get('name')]
+        self.labs_list = list(self.inputs.labs_list)
         for lab_name in self.labs_list:
             self.lab_schedule[lab_name] = {
                 day: {slot: [] for slot in ALL_SLOTS}
@@ -93,9 +81,9 @@ class TimetableGenerator:
     def prepare_assignments(self) -> dict:
         assignments: dict = {}
         try:
-            self._load_faculty_names()
-            self._load_subject_map()
-            workloads = list(workload_collection.find({}))
+            fid_to_name = self.inputs.fid_to_name
+            subject_map = self.inputs.subject_map
+            workloads   = self.inputs.workloads
             logger.info(f"Reading {len(workloads)} workload entries…")
 
             # TG-04 FIX: track seen (year, division, batch, subject) combos
@@ -109,9 +97,9 @@ class TimetableGenerator:
                 subject      = w.get('subject', '')
                 subject_full = w.get('subject_full', subject)
                 faculty_id   = str(w.get('faculty_id', '')) if w.get('faculty_id') else ''
-                faculty_name = self.faculty_names.get(faculty_id, faculty_id)
+                faculty_name = fid_to_name.get(faculty_id, faculty_id)
 
-                subj_doc       = self.subject_map.get(subject, {})
+                subj_doc       = subject_map.get(subject, {})
 
                 # TG-05 FIX: warn when subject not found in subject_map
                 if not subj_doc:
@@ -192,45 +180,6 @@ class TimetableGenerator:
     def _lab_slot_free(self, lab: str, day: str, slot: str) -> bool:
         return len(self.lab_schedule.get(lab, {}).get(day, {}).get(slot, [])) == 0
 
-    def _select_lab(self, practical: dict, day: str, slot: str,
-                    used_labs: set) -> str | None:
-        hrs       = practical['practical_hrs']
-        next_slot = NEXT_SLOT.get(slot) if hrs == 2 else None
-        required  = practical.get('required_lab')
-        candidates = [required] if required else self.labs_list
-
-        for lab in candidates:
-            if lab not in self.lab_schedule:
-                continue
-            if lab in used_labs:
-                continue
-            if not self._lab_slot_free(lab, day, slot):
-                continue
-            if next_slot and not self._lab_slot_free(lab, day, next_slot):
-                continue
-            return lab
-        return None
-
-    def _can_schedule(self, practical: dict, day: str, slot: str,
-                      used_faculty: set, used_labs: set) -> bool:
-        year, division, batch = practical['year'], practical['division'], practical['batch']
-        faculty, hrs          = practical['faculty'], practical['practical_hrs']
-
-        if hrs == 2 and slot not in TWO_HR_START_SLOTS:
-            return False
-        if faculty in used_faculty:
-            return False
-        if self._faculty_busy(faculty, day, slot):   # TG-02 fix applied inside here
-            return False
-        if not self._batch_slot_free(year, division, batch, day, slot):
-            return False
-        if hrs == 2:
-            if not self._batch_slot_free(year, division, batch, day, NEXT_SLOT[slot]):
-                return False
-        if self._select_lab(practical, day, slot, used_labs) is None:
-            return False
-        return True
-
     # ── Write ─────────────────────────────────────────────────────────────────
 
     def _write_session(self, practical: dict, day: str, slot: str, lab: str):
@@ -330,9 +279,140 @@ class TimetableGenerator:
 
         return ordered
 
+    # ── Forward-checking domains ──────────────────────────────────────────────
+
+    @staticmethod
+    def _occupied_slots(slot: str, hrs: int) -> tuple:
+        """Slots a practical starting at `slot` occupies (both halves of a 2-hr block)."""
+        if hrs == 2 and slot in NEXT_SLOT:
+            return (slot, NEXT_SLOT[slot])
+        return (slot,)
+
+    def _cell_feasible(self, practical: dict, day: str, slot: str, lab: str) -> bool:
+        year, division, batch = practical['year'], practical['division'], practical['batch']
+        hrs = practical['practical_hrs']
+
+        if hrs == 2 and slot not in TWO_HR_START_SLOTS:
+            return False
+        for s in self._occupied_slots(slot, hrs):
+            if self._faculty_busy(practical['faculty'], day, s):   # TG-02 fix applied inside here
+                return False
+            if not self._batch_slot_free(year, division, batch, day, s):
+                return False
+            if not self._lab_slot_free(lab, day, s):
+                return False
+        return True
+
+    def _initial_domain(self, practical: dict) -> set:
+        """
+        Every (day, slot, lab) cell this practical could still be placed in.
+        Specific-Lab practicals only get their required lab, so their domain
+        is a fraction of a Common-Lab practical's and they are picked first.
+        """
+        required = practical.get('required_lab')
+        labs     = [required] if required else self.labs_list
+        return {
+            (day, slot, lab)
+            for day in DAYS
+            for slot in START_SLOTS
+            for lab in labs
+            if lab in self.lab_schedule
+            and self._cell_feasible(practical, day, slot, lab)
+        }
+
+    def _prune_domains(self, placed: dict, day: str, slot: str, lab: str,
+                       pending: dict, domains: dict):
+        """
+        Remove every cell that the placement of `placed` at (day, slot, lab)
+        has made infeasible.  A cell conflicts when it overlaps the placed
+        block in time and shares the lab, the faculty or the batch — the
+        same rules _cell_feasible applies, evaluated incrementally.
+        """
+        taken     = set(self._occupied_slots(slot, placed['practical_hrs']))
+        batch_key = (placed['year'], placed['division'], placed['batch'])
+
+        for pid, practical in pending.items():
+            domain = domains[pid]
+            if not domain:
+                continue
+            same_owner = (
+                practical['faculty'] == placed['faculty']
+                or (practical['year'], practical['division'],
+                    practical['batch']) == batch_key
+            )
+            for s in START_SLOTS:
+                if taken.isdisjoint(self._occupied_slots(s, practical['practical_hrs'])):
+                    continue
+                if same_owner:
+                    domain.difference_update(
+                        [c for c in domain if c[0] == day and c[1] == s])
+                else:
+                    domain.discard((day, s, lab))
+
     # ── Main loop ─────────────────────────────────────────────────────────────
 
-    def generate(self) -> dict:
+    def _schedule(self, assignments: dict) -> int:
+        """
+        Most-constrained-first scheduling with forward checking.
+
+        Each pending practical keeps an explicit domain of still-feasible
+        (day, slot, lab) cells.  The practical with the smallest domain is
+        placed next, in the earliest feasible cell, and every other domain
+        is pruned straight away.  A practical whose domain becomes empty is
+        reported the moment it happens and left in its queue as a leftover.
+
+        Ties are broken with the TG-01 round-robin order so SY/TY/BE keep the
+        same relative priority as before.
+        """
+        rank = {k: i for i, k in enumerate(
+            self._build_round_robin_order(list(assignments)))}
+        day_rank  = {d: i for i, d in enumerate(DAYS)}
+        slot_rank = {s: i for i, s in enumerate(START_SLOTS)}
+        lab_rank  = {l: i for i, l in enumerate(self.labs_list)}
+
+        def cell_order(cell):
+            day, slot, lab = cell
+            return day_rank[day], slot_rank[slot], lab_rank.get(lab, len(lab_rank))
+
+        pending: dict = {}
+        order:   dict = {}
+        for key, queue in assignments.items():
+            for idx, practical in enumerate(queue):
+                pid = len(pending)
+                pending[pid] = practical
+                order[pid]   = (rank[key], idx)
+        domains = {pid: self._initial_domain(p) for pid, p in pending.items()}
+
+        scheduled_count = 0
+        while pending:
+            for pid in [pid for pid in pending if not domains[pid]]:
+                p = pending.pop(pid)
+                logger.warning(f"  ✗ {p['year']}-{p['division']}-B{p['batch']} "
+                               f"{p['subject']}: no feasible (day, slot, lab) left")
+            if not pending:
+                break
+
+            pid       = min(pending, key=lambda i: (len(domains[i]), order[i]))
+            practical = pending.pop(pid)
+
+            cell = next((c for c in sorted(domains[pid], key=cell_order)
+                         if self._cell_feasible(practical, *c)), None)
+            if cell is None:
+                logger.warning(f"  ✗ {practical['year']}-{practical['division']}-"
+                               f"B{practical['batch']} {practical['subject']}: "
+                               f"no feasible (day, slot, lab) left")
+                continue
+
+            day, slot, lab = cell
+            self._write_session(practical, day, slot, lab)
+            assignments[(practical['year'], practical['division'],
+                         practical['batch'])].remove(practical)
+            scheduled_count += 1
+            self._prune_domains(practical, day, slot, lab, pending, domains)
+
+        return scheduled_count
+
+    def generate(self, write_concern=None, writer=None) -> dict:
         logger.info("=" * 80)
         logger.info("STARTING PRACTICAL TIMETABLE GENERATION")
         logger.info("=" * 80)
@@ -346,67 +426,15 @@ class TimetableGenerator:
             if not self.labs_list:
                 return {'success': False, 'error': 'No labs found'}
 
-            scheduled_count = 0
-
-            for pass_num in range(30):
-                progress = False
-
-                for day in DAYS:
-                    for slot in START_SLOTS:
-
-                        # TG-01 FIX: build round-robin ordered list instead of
-                        # fixed year_order sort.  Only include keys that still
-                        # have pending practicals.
-                        pending_keys = [k for k in assignments if assignments[k]]
-                        ordered_keys = self._build_round_robin_order(pending_keys)
-
-                        used_faculty: set = set()
-                        used_labs:    set = set()
-
-                        for key in ordered_keys:
-                            queue = assignments[key]
-                            if not queue:
-                                continue
-
-                            placed_idx = None
-                            for idx, practical in enumerate(queue):
-                                if not self._can_schedule(practical, day, slot,
-                                                          used_faculty, used_labs):
-                                    continue
-                                lab = self._select_lab(practical, day, slot, used_labs)
-                                if lab is None:
-                                    continue
-
-                                used_faculty.add(practical['faculty'])
-                                used_labs.add(lab)
-                                self._write_session(practical, day, slot, lab)
-                                scheduled_count += 1
-                                progress = True
-                                placed_idx = idx
-                                break
-
-                            if placed_idx is not None:
-                                queue.pop(placed_idx)
-
-                if not progress:
-                    logger.info(f"Stable after pass {pass_num + 1}.")
-                    break
-
-                remaining = sum(len(q) for q in assignments.values())
-                logger.info(f"Pass {pass_num + 1}: {remaining} remaining")
-                if remaining == 0:
-                    logger.info(f"✅ All done after {pass_num + 1} pass(es).")
-                    break
+            scheduled_count = self._schedule(assignments)
 
             # ── Save master lab timetable only ────────────────────────────
-            for lab_name, schedule in self.lab_schedule.items():
-                master_lab_timetable_collection.replace_one(
-                    {'lab_name': lab_name},
-                    {'lab_name': lab_name, 'schedule': schedule,
-                     'generated_at': datetime.now()},
-                    upsert=True
-                )
-                logger.info(f"✓ Saved lab: {lab_name}")
+            now = datetime.now()
+            lab_docs = [
+                {'lab_name': lab_name, 'schedule': schedule, 'generated_at': now}
+                for lab_name, schedule in self.lab_schedule.items()
+            ]
+            saved = save_lab_timetables(lab_docs, write_concern, writer)
 
             leftovers = {
                 f"{y}-{d}-B{b}": [p['subject'] for p in q]
@@ -424,6 +452,9 @@ class TimetableGenerator:
                 'labs_generated':       len(self.labs_list),
                 'practicals_scheduled': scheduled_count,
                 'leftovers':            leftovers,
+                # In-memory copy for the next stage when saves are write-behind
+                'lab_timetables':       lab_docs,
+                'persistence':          saved,   # None when write-behind
             }
 
         except Exception as e:
@@ -431,5 +462,16 @@ class TimetableGenerator:
             return {'success': False, 'error': str(e)}
 
 
-def generate():
-    return TimetableGenerator().generate()
\ No newline at end of file
+def save_lab_timetables(lab_docs: list, write_concern=None, writer=None):
+    """Persist lab docs to master_lab_timetable; None when write-behind."""
+    stored = [compact_doc(d, ALL_SLOTS) for d in lab_docs]
+    if writer:
+        writer.sync_many(master_lab_timetable_collection, stored,
+                         ('lab_name',), write_concern)
+        return None
+    return sync_many(master_lab_timetable_collection, stored,
+                     ('lab_name',), write_concern)
+
+
+def generate(write_concern=None, writer=None, inputs=None):
+    return TimetableGenerator(inputs).generate(write_concern, writer)
\ No newline at end of file
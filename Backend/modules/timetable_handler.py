@@ -4,6 +4,8 @@
 
 from flask import jsonify
 from config import db
+from modules.schedule_format import read_doc
+from modules.responses import ndjson_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,13 +13,17 @@ logger = logging.getLogger(__name__)
 master_lab_timetable_collection = db['master_lab_timetable']
 
 
-def get_master_practical_timetable():
+def get_master_practical_timetable(sparse: bool = False):
     """
     GET /api/master_timetables
     Returns all lab timetables from master_lab_timetable collection.
+
+    Schedules are returned in the legacy nested form unless the client
+    opts in with ?format=sparse (see schedule_format).
     """
     try:
-        timetables = list(master_lab_timetable_collection.find({}))
+        timetables = [read_doc(t, sparse)
+                      for t in master_lab_timetable_collection.find({})]
 
         if not timetables:
             return jsonify({
@@ -26,11 +32,6 @@ def get_master_practical_timetable():
                 'message': 'No timetables found. Run generation first.'
             }), 200
 
-        for t in timetables:
-            t['_id'] = str(t['_id'])
-            if t.get('generated_at'):
-                t['generated_at'] = t['generated_at'].isoformat()
-
         return jsonify({
             'total': len(timetables),
             'timetables': timetables
@@ -38,4 +39,17 @@ def get_master_practical_timetable():
 
     except Exception as e:
         logger.error(f"get_master_practical_timetable error: {e}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def stream_master_practical_timetable(sparse: bool = False):
+    """
+    GET /api/master_timetables/stream
+    Streaming variant of get_master_practical_timetable: NDJSON, one lab
+    timetable per line, read from the cursor in batches.
+    """
+    try:
+        cursor = master_lab_timetable_collection.find({}).sort('lab_name', 1)
+        return ndjson_response(cursor, lambda t: read_doc(t, sparse)), 200
+    except Exception as e:
+        logger.error(f"stream_master_practical_timetable error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,273 @@
+# timetable_history.py
+# Every published timetable, kept as a version.
+#
+# After a successful generation (or a rollback) the published lab and class
+# timetables are recorded in timetable_versions.  Faculty timetables and
+# sessions are derived from the class timetables, so they are rebuilt
+# rather than stored.
+#
+# Storage: a version holds only the documents that changed against its
+# parent ('set' / 'unset', in the sparse stored form), except every
+# SNAPSHOT_EVERY-th version, which holds all of them ('full').  Reading any
+# version therefore replays at most SNAPSHOT_EVERY version docs, fetched in
+# one range query.  Every version also carries its manifest — item →
+# content fingerprint — so two versions are diffed by comparing manifests,
+# without reconstructing either.
+#
+# Versions form a line: each one's parent is the one before it.  A rollback
+# restores an old version's documents (diff-based, only what differs is
+# rewritten) and records the result as a new version.
+
+from flask import jsonify
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+from config import db
+from modules.persistence import summarise, sync_many
+from modules.schedule_format import expand_doc, read_doc
+from modules.timetable_sessions import save_sessions
+from modules.faculty_timetable import save_faculty_timetables
+from datetime import datetime
+import copy
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+versions_collection = db['timetable_versions']
+
+SNAPSHOT_EVERY = int(os.getenv("TIMETABLE_SNAPSHOT_EVERY", "10"))
+
+# collection → key fields of its documents
+TRACKED = {
+    'master_lab_timetable': ('lab_name',),
+    'class_timetable':      ('class', 'division'),
+}
+
+# Version doc fields that are payload, left out of listings
+PAYLOAD_FIELDS = ('docs', 'set', 'unset', 'manifest')
+
+
+def _item_key(collection: str, doc: dict) -> tuple:
+    return (collection, *(doc.get(f) for f in TRACKED[collection]))
+
+
+def _published() -> dict:
+    """item key → stored doc (with fingerprint) for every tracked collection."""
+    items = {}
+    for name in TRACKED:
+        for doc in db[name].find({}, {'_id': 0}):
+            items[_item_key(name, doc)] = doc
+    return items
+
+
+def _manifest(items: dict) -> dict:
+    return {key: doc.get('fingerprint') for key, doc in items.items()}
+
+
+# Mongo keeps the maps as arrays: item keys are tuples, and lab names may
+# hold characters field names should not.
+def _to_pairs(mapping: dict, field: str) -> list:
+    return [{'k': list(key), field: value} for key, value in mapping.items()]
+
+
+def _from_pairs(pairs: list, field: str) -> dict:
+    return {tuple(p['k']): p[field] for p in pairs or []}
+
+
+def _without_payload() -> dict:
+    return {f: 0 for f in PAYLOAD_FIELDS}
+
+
+def _head(projection=None):
+    return versions_collection.find_one({}, projection, sort=[('_id', DESCENDING)])
+
+
+def record(source: str = 'generation', **details) -> dict | None:
+    """
+    Record what is published now as a new version.  Returns the version
+    summary, or None when it is identical to the current head.
+    """
+    items = _published()
+    manifest = _manifest(items)
+    head = _head({'set': 0, 'unset': 0, 'docs': 0})
+    parent_manifest = _from_pairs(head.get('manifest'), 'fp') if head else {}
+    if head and manifest == parent_manifest:
+        logger.info(f"Timetables unchanged since version {head['_id']}; not recorded")
+        return None
+
+    depth = (head['depth'] + 1) if head else SNAPSHOT_EVERY
+    doc = {
+        'parent':     head['_id'] if head else None,
+        'source':     source,
+        'created_at': datetime.now(),
+        'manifest':   _to_pairs(manifest, 'fp'),
+        **details,
+    }
+    if depth >= SNAPSHOT_EVERY:
+        doc.update(kind='full', depth=0, docs=_to_pairs(items, 'doc'),
+                   changed=len(items))
+    else:
+        changed = {k: items[k] for k, fp in manifest.items()
+                   if parent_manifest.get(k) != fp}
+        removed = [list(k) for k in parent_manifest if k not in manifest]
+        doc.update(kind='delta', depth=depth, set=_to_pairs(changed, 'doc'),
+                   unset=removed, changed=len(changed) + len(removed))
+
+    doc['_id'] = (head['_id'] + 1) if head else 1
+    doc['base'] = doc['_id'] if doc['kind'] == 'full' else head['base']
+    try:
+        versions_collection.insert_one(doc)
+    except DuplicateKeyError:
+        # Recorded concurrently; generation runs are single-flight, so
+        # this only happens if a rollback raced it
+        logger.warning(f"⚠️  Timetable version {doc['_id']} already exists; not recorded")
+        return None
+    logger.info(f"✓ Recorded timetable version {doc['_id']} "
+                f"({doc['kind']}, {doc['changed']} document(s))")
+    return summary(doc)
+
+
+def record_generation(engine: str, leftovers: dict, lecture_leftovers: dict):
+    """
+    record() after a successful generation.  Best effort: the timetables
+    are already published, a lost version only leaves a gap in the history.
+    Returns the version number now published, or None.
+    """
+    try:
+        recorded = record('generation', engine=engine, leftover_counts={
+            'practical': sum(len(v) for v in leftovers.values()),
+            'lecture':   sum(len(v) for v in lecture_leftovers.values()),
+        })
+        if recorded:
+            return recorded['_id']
+        head = _head({'_id': 1})
+        return head['_id'] if head else None
+    except Exception as e:
+        logger.warning(f"⚠️  Recording timetable version failed: {e}")
+        return None
+
+
+def summary(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in PAYLOAD_FIELDS}
+
+
+def list_versions(limit: int = 50) -> list:
+    return list(versions_collection.find({}, _without_payload(), sort=[('_id', DESCENDING)],
+                                         limit=limit))
+
+
+def materialise(version_id: int) -> tuple[dict, dict] | None:
+    """
+    (version summary, item key → stored doc) for `version_id`, or None.
+    Replays its base snapshot and the deltas after it — at most
+    SNAPSHOT_EVERY documents.
+    """
+    meta = versions_collection.find_one({'_id': version_id}, _without_payload())
+    if not meta:
+        return None
+    items = {}
+    for v in versions_collection.find({'_id': {'$gte': meta['base'], '$lte': version_id}},
+                                      {'manifest': 0}, sort=[('_id', 1)]):
+        if v['kind'] == 'full':
+            items = _from_pairs(v['docs'], 'doc')
+        else:
+            items.update(_from_pairs(v['set'], 'doc'))
+            for key in v['unset']:
+                items.pop(tuple(key), None)
+    return meta, items
+
+
+def grouped(items: dict) -> dict:
+    """Materialised items as {collection: [docs]}."""
+    out = {name: [] for name in TRACKED}
+    for key, doc in sorted(items.items(), key=lambda kv: [str(p) for p in kv[0]]):
+        out[key[0]].append(doc)
+    return out
+
+
+def diff(a: int, b: int) -> dict | None:
+    """What changed from version `a` to `b`, from their manifests alone."""
+    docs = {v['_id']: _from_pairs(v['manifest'], 'fp')
+            for v in versions_collection.find({'_id': {'$in': [a, b]}},
+                                              {'manifest': 1})}
+    if a not in docs or b not in docs:
+        return None
+    old, new = docs[a], docs[b]
+    label = lambda key: {'collection': key[0], 'key': '-'.join(str(p) for p in key[1:])}
+    return {
+        'from':      a,
+        'to':        b,
+        'added':     [label(k) for k in sorted(new, key=str) if k not in old],
+        'removed':   [label(k) for k in sorted(old, key=str) if k not in new],
+        'changed':   [label(k) for k in sorted(new, key=str)
+                      if k in old and old[k] != new[k]],
+        'unchanged': sum(1 for k in new if old.get(k) == new[k]),
+    }
+
+
+def restore(version_id: int) -> dict | None:
+    """
+    Make version `version_id` the published timetable again and record it
+    as a new version.  Returns the persistence stats and the new version,
+    or None if there is no such version.
+    """
+    found = materialise(version_id)
+    if found is None:
+        return None
+    _, items = found
+    docs = grouped(items)
+
+    saved = [sync_many(db[name], docs[name], TRACKED[name]) for name in TRACKED]
+    class_timetables = [expand_doc(copy.deepcopy(d)) for d in docs['class_timetable']]
+    saved.append(save_sessions(class_timetables))
+    saved.append(save_faculty_timetables(class_timetables))
+
+    recorded = record('rollback', rolled_back_to=version_id)
+    return {'persistence': saved, 'version': recorded}
+
+
+# ── Endpoints ────────────────────────────────────────────────────────────────
+
+def get_versions(args):
+    try:
+        limit = max(1, min(int(args.get('limit', 50)), 500))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"snapshot_every": SNAPSHOT_EVERY,
+                    "versions":       list_versions(limit)}), 200
+
+
+def get_version(version_id: int, sparse: bool = False):
+    found = materialise(version_id)
+    if found is None:
+        return jsonify({"error": f"No timetable version {version_id}"}), 404
+    meta, items = found
+    body = {"version": meta}
+    for name, docs in grouped(items).items():
+        body[name] = [read_doc(doc, sparse) for doc in docs]
+    return jsonify(body), 200
+
+
+def get_diff(a: int, b: int):
+    changes = diff(a, b)
+    if changes is None:
+        return jsonify({"error": f"No timetable version {a} or {b}"}), 404
+    return jsonify(changes), 200
+
+
+def rollback(version_id: int):
+    try:
+        restored = restore(version_id)
+    except Exception as e:
+        logger.error(f"Rollback to version {version_id} failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+    if restored is None:
+        return jsonify({"error": f"No timetable version {version_id}"}), 404
+    saved = summarise(restored['persistence'])
+    logger.info(f"✓ Rolled back to timetable version {version_id}")
+    return jsonify({
+        "message":           f"Timetable rolled back to version {version_id}.",
+        "version":           restored['version'],
+        "documents_changed": saved['documents_changed'],
+        "persistence":       saved,
+    }), 200
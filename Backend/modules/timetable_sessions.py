@@ -0,0 +1,115 @@
+# timetable_sessions.py
+# Flattened, indexed view of the generated timetables.
+#
+# class_timetable / master_lab_timetable keep one document per class or lab,
+# so "everything faculty X teaches" or "what is in lab Y on Tuesday 14:15"
+# means loading and walking whole schedules.  Generation also emits one
+# document per session here; the compound indexes below answer those
+# lookups directly (declared in db_indexes).
+
+from flask import jsonify
+from config import db
+from modules.persistence import sync_many
+from modules.schedule_format import DAYS
+import logging
+
+logger = logging.getLogger(__name__)
+
+timetable_sessions_collection = db['timetable_sessions']
+
+# One session per (class, division, day, slot, batch, subject): a class has
+# at most one lecture in a slot, and each batch at most one practical.
+SESSION_KEY = ('class', 'division', 'day_idx', 'slot', 'batch', 'subject')
+
+
+def build_sessions(class_timetables) -> list:
+    """
+    Flatten format-1 class timetable docs into session documents.  Both
+    halves of a 2-hr practical become their own document, so slot lookups
+    need no knowledge of practical durations.
+    """
+    sessions = []
+    for tt in class_timetables:
+        schedule = tt.get('schedule', {})
+        for day_idx, day in enumerate(DAYS):
+            for slot, entries in sorted(schedule.get(day, {}).items()):
+                for e in entries:
+                    sessions.append({
+                        'class':        tt['class'],
+                        'division':     tt['division'],
+                        'batch':        e.get('batch'),        # None for lectures
+                        'type':         e.get('type'),
+                        'subject':      e.get('subject'),
+                        'subject_full': e.get('subject_full'),
+                        'faculty':      e.get('faculty'),
+                        'faculty_id':   e.get('faculty_id'),
+                        'lab':          e.get('lab'),          # None for lectures
+                        'day':          day,
+                        'day_idx':      day_idx,
+                        'slot':         slot,
+                    })
+    return sessions
+
+
+def save_sessions(class_timetables, write_concern=None, writer=None):
+    """
+    Emit the flattened sessions for the given class timetables.
+    Returns sync_many stats, or None when queued on a write-behind writer.
+    """
+    sessions = build_sessions(class_timetables)
+    if writer:
+        writer.sync_many(timetable_sessions_collection, sessions, SESSION_KEY,
+                         write_concern)
+        return None
+    return sync_many(timetable_sessions_collection, sessions, SESSION_KEY,
+                     write_concern)
+
+
+def get_sessions(args: dict):
+    """
+    GET /api/timetable_sessions?faculty_id=…|lab=…|class=…&division=…
+        [&batch=N][&day=Tuesday][&slot=14:15][&type=lecture|practical]
+
+    At least one of faculty_id, lab or class+division is required so every
+    query is served by one of the compound indexes.  batch also returns the
+    class's lectures, which every batch attends.
+    """
+    try:
+        query: dict = {}
+        if args.get('faculty_id'):
+            query['faculty_id'] = args['faculty_id']
+        if args.get('lab'):
+            query['lab'] = args['lab']
+        if args.get('class') or args.get('division'):
+            if not (args.get('class') and args.get('division')):
+                return jsonify({"error": "class and division must be given together"}), 400
+            query['class']    = args['class'].upper()
+            query['division'] = args['division'].upper()
+        if not query:
+            return jsonify({
+                "error": "Provide faculty_id, lab, or class and division"
+            }), 400
+
+        if args.get('batch'):
+            try:
+                query['batch'] = {'$in': [int(args['batch']), None]}
+            except ValueError:
+                return jsonify({"error": "batch must be an integer"}), 400
+        if args.get('day'):
+            if args['day'] not in DAYS:
+                return jsonify({"error": f"day must be one of: {', '.join(DAYS)}"}), 400
+            query['day_idx'] = DAYS.index(args['day'])
+        if args.get('slot'):
+            query['slot'] = args['slot']
+        if args.get('type'):
+            query['type'] = args['type']
+
+        sessions = list(timetable_sessions_collection.find(
+            query, {'_id': 0, 'fingerprint': 0}
+        ).sort([('day_idx', 1), ('slot', 1)]))
+
+        return jsonify({'total': len(sessions), 'sessions': sessions}), 200
+
+    except Exception as e:
+        logger.error(f"get_sessions error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
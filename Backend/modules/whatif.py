@@ -0,0 +1,244 @@
+# whatif.py
+# Dry-run generation: "what if RKD takes TY-B's DBMS lab?"
+#
+# POST /api/whatif takes an inline patch to the generation inputs, runs the
+# generators on the patched inputs entirely in memory and returns what the
+# timetables would be, how they differ from the published ones and what
+# would be left unscheduled.  Nothing is written: the generators save
+# through a persistence.CaptureWriter, which only records the documents.
+#
+# Body:
+#   {
+#     "engine": "staged" | "joint",            (default "staged")
+#     "include_timetables": true,              (default true)
+#     "patch": {
+#       "workload": {"add":    [{...row as for POST /api/faculty_workload}],
+#                    "update": [{"match": {...}, "set": {...}}],
+#                    "remove": [{...match}]},
+#       "subjects": {same ops; "add" rows as for POST /api/subjects},
+#       "labs":     {"add": ["Lab name", ...], "remove": ["Lab name" | {...match}]}
+#     }
+#   }
+# A match is field equality (case-insensitive, _id as its string) and must
+# hit at least one row.  ?format=sparse returns the timetables sparse.
+
+from flask import jsonify
+from config import db
+from modules import (
+    class_timetable_handler,
+    joint_tt_generator,
+    lecture_tt_generator,
+    timetable_generator,
+)
+from modules.input_snapshot import (
+    FACULTY_FIELDS, LAB_FIELDS, SUBJECT_FIELDS, WORKLOAD_FIELDS, YEARS,
+    InputSnapshot, faculty_collection, labs_collection, workload_collection,
+)
+from modules.persistence import CaptureWriter, fingerprint
+from modules.schedule_format import read_doc
+from modules.subjects_handler import sanitise_subject, subjects_by_year
+from modules.workload_handler import sanitise_workload
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Document-level diff for these; sessions are diffed one by one
+DIFFED_COLLECTIONS = ('master_lab_timetable', 'class_timetable', 'faculty_timetable')
+SESSIONS_COLLECTION = 'timetable_sessions'
+
+
+# ── Patching ─────────────────────────────────────────────────────────────────
+
+def _matches(row: dict, match) -> bool:
+    return all(str(row.get(k, '')).casefold() == str(v).casefold()
+               for k, v in match.items())
+
+
+def _check_match(match, where: str) -> dict:
+    if not isinstance(match, dict) or not match:
+        raise ValueError(f"{where}: match must be a non-empty object")
+    return match
+
+
+def _patch_rows(rows: list, ops, label: str, add, update) -> list:
+    """Apply one {"add", "update", "remove"} block to `rows` (copied)."""
+    if not ops:
+        return rows
+    if not isinstance(ops, dict):
+        raise ValueError(f"patch.{label} must be an object")
+    rows = [dict(r) for r in rows]
+
+    for i, match in enumerate(ops.get('remove', [])):
+        where = f"patch.{label}.remove[{i}]"
+        match = _check_match({'name': match} if isinstance(match, str) else match, where)
+        kept = [r for r in rows if not _matches(r, match)]
+        if len(kept) == len(rows):
+            raise ValueError(f"{where} matched nothing")
+        rows = kept
+
+    for i, spec in enumerate(ops.get('update', [])):
+        where = f"patch.{label}.update[{i}]"
+        if not isinstance(spec, dict) or not isinstance(spec.get('set'), dict):
+            raise ValueError(f"{where}: expected {{\"match\": {{...}}, \"set\": {{...}}}}")
+        match = _check_match(spec.get('match'), where)
+        hits = [r for r in rows if _matches(r, match)]
+        if not hits:
+            raise ValueError(f"{where} matched nothing")
+        for r in hits:
+            r.update(update(r, spec['set']))
+
+    for i, data in enumerate(ops.get('add', [])):
+        try:
+            rows.append(add(data))
+        except ValueError as e:
+            raise ValueError(f"patch.{label}.add[{i}]: {e}")
+    return rows
+
+
+def _workload_update(row: dict, changes: dict) -> dict:
+    # Run the merged row through the sanitiser for its casts, but only
+    # apply the fields being changed — the rest of the row stays as stored
+    clean = sanitise_workload({**row, **changes})
+    return {k: clean.get(k, v) for k, v in changes.items()}
+
+
+def _lab_add(data) -> dict:
+    name = data.get('name') if isinstance(data, dict) else data
+    if not name:
+        raise ValueError("Missing lab name")
+    return {'name': str(name).strip()}
+
+
+def _patched_inputs(patch: dict) -> InputSnapshot:
+    if not isinstance(patch, dict):
+        raise ValueError("patch must be an object")
+    unknown = set(patch) - {'workload', 'subjects', 'labs'}
+    if unknown:
+        raise ValueError(f"Unknown patch section(s): {', '.join(sorted(unknown))}")
+
+    workloads = _patch_rows(list(workload_collection.find({}, WORKLOAD_FIELDS)),
+                            patch.get('workload'), 'workload',
+                            sanitise_workload, _workload_update)
+    labs = _patch_rows(list(labs_collection.find({}, LAB_FIELDS)),
+                       patch.get('labs'), 'labs', _lab_add, lambda r, c: c)
+
+    # Only the subjects the patched workload references, as InputSnapshot
+    referenced = {w['subject'] for w in workloads if w.get('subject')}
+    grouped = subjects_by_year(referenced, SUBJECT_FIELDS)
+    subjects = _patch_rows([{**s, 'year': yr} for yr in YEARS for s in grouped[yr]],
+                           patch.get('subjects'), 'subjects',
+                           sanitise_subject, lambda r, c: c)
+    grouped = {yr: [s for s in subjects if s.get('year') == yr] for yr in YEARS}
+
+    return InputSnapshot(faculty=list(faculty_collection.find({}, FACULTY_FIELDS)),
+                         labs=labs, subjects=grouped, workloads=workloads)
+
+
+# ── Generation ───────────────────────────────────────────────────────────────
+
+def run_staged(inputs: InputSnapshot, writer: CaptureWriter) -> dict:
+    """Practical → class projection → lecture fill, saving only to `writer`."""
+    result = timetable_generator.generate(None, writer, inputs)
+    if not result or not result.get('success'):
+        return {'success': False, 'error': (result or {}).get('error', 'practical stage failed')}
+    class_result = class_timetable_handler.generate_class_timetables(
+        None, result['lab_timetables'], writer, persist=False)
+    if not class_result.get('success'):
+        return class_result
+    lecture_result = lecture_tt_generator.generate(
+        None, class_result['class_timetables'], writer, inputs)
+    if not lecture_result.get('success'):
+        return lecture_result
+    return {
+        'success':              True,
+        'practicals_scheduled': result.get('practicals_scheduled', 0),
+        'lectures_scheduled':   lecture_result.get('lectures_scheduled', 0),
+        'leftovers':            result.get('leftovers', {}),
+        'lecture_leftovers':    lecture_result.get('leftovers', {}),
+        'unresolved_subjects':  lecture_result.get('unresolved_subjects', []),
+    }
+
+
+# ── Diff against the published timetables ────────────────────────────────────
+
+def _label(key: tuple) -> str:
+    return '-'.join(str(k) for k in key)
+
+
+def _diff_documents(name: str, docs: list, key_fields: tuple) -> dict:
+    projection = {'_id': 0, 'fingerprint': 1, **{f: 1 for f in key_fields}}
+    published = {tuple(d.get(f) for f in key_fields): d.get('fingerprint')
+                 for d in db[name].find({}, projection)}
+    proposed = {tuple(d.get(f) for f in key_fields): fingerprint(d) for d in docs}
+    return {
+        'added':     sorted(_label(k) for k in proposed if k not in published),
+        'removed':   sorted(_label(k) for k in published if k not in proposed),
+        'changed':   sorted(_label(k) for k, fp in proposed.items()
+                            if k in published and published[k] != fp),
+        'unchanged': sum(1 for k, fp in proposed.items() if published.get(k) == fp),
+    }
+
+
+def _diff_sessions(sessions: list) -> dict:
+    published = {d.pop('fingerprint', None) or fingerprint(d): d
+                 for d in db[SESSIONS_COLLECTION].find({}, {'_id': 0, 'generated_at': 0})}
+    proposed = {fingerprint(s): s for s in sessions}
+    return {
+        'added':   [s for fp, s in proposed.items() if fp not in published],
+        'removed': [s for fp, s in published.items() if fp not in proposed],
+    }
+
+
+def run(body: dict, sparse: bool = False):
+    started = time.perf_counter()
+    engine = body.get('engine', 'staged')
+    if engine not in ('staged', 'joint'):
+        return jsonify({"error": f"Unknown engine '{engine}'. Use 'staged' or 'joint'."}), 400
+    try:
+        inputs = _patched_inputs(body.get('patch') or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        writer = CaptureWriter()
+        if engine == 'joint':
+            result = joint_tt_generator.generate(None, inputs, writer)
+        else:
+            result = run_staged(inputs, writer)
+        if not result.get('success'):
+            return jsonify({"error": "What-if generation failed.",
+                            "detail": result.get('error') or result.get('message', '')}), 400
+
+        diff = {name: _diff_documents(name, *writer.docs[name])
+                for name in DIFFED_COLLECTIONS if name in writer.docs}
+        diff['sessions'] = _diff_sessions(writer.docs.get(SESSIONS_COLLECTION, ([],))[0])
+
+        leftovers = result.get('leftovers', {})
+        lecture_leftovers = result.get('lecture_leftovers', {})
+        body_out = {
+            "engine":               engine,
+            "persisted":            False,
+            "practicals_scheduled": result.get('practicals_scheduled', 0),
+            "lectures_scheduled":   result.get('lectures_scheduled', 0),
+            "leftover_counts": {
+                "practical": sum(len(v) for v in leftovers.values()),
+                "lecture":   sum(len(v) for v in lecture_leftovers.values()),
+            },
+            "practical_leftovers":  leftovers,
+            "lecture_leftovers":    lecture_leftovers,
+            "unresolved_subjects":  result.get('unresolved_subjects', []),
+            "diff":                 diff,
+        }
+        if body.get('include_timetables', True):
+            body_out["timetables"] = {
+                name: [read_doc(doc, sparse) for doc in writer.docs[name][0]]
+                for name in DIFFED_COLLECTIONS if name in writer.docs
+            }
+        body_out["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"✓ What-if ({engine}) in {body_out['elapsed_ms']} ms")
+        return jsonify(body_out), 200
+
+    except Exception as e:
+        logger.error(f"What-if generation error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
@@ -1,6 +1,8 @@
 from flask import jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from config import db
+from modules.db_indexes import WORKLOAD_KEY
 
 # MongoDB collection
 workload_collection = db['workload']
@@ -13,16 +15,63 @@ def get_faculty_workload():
     """
     try:
         workload_data = list(workload_collection.find({}))
-
-        for w in workload_data:
-            w["_id"] = str(w["_id"])
-
         return jsonify({"workloads": workload_data}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ---------- SANITISE ----------
+def sanitise_workload(data) -> dict:
+    """
+    Build the document stored for one workload entry from client data.
+    Raises ValueError with a client-facing message on bad input.
+    Shared by add_faculty_workload and the bulk import.
+    """
+    if not data:
+        raise ValueError("No data provided")
+
+    # Basic presence check before any processing
+    required_fields = ["faculty_id", "year", "subject"]
+    missing = [f for f in required_fields if f not in data]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    # WH-01 FIX: build a sanitised document with explicit type casts instead
+    # of inserting the raw request dict.  This prevents string practical_hrs,
+    # comma-separated batch strings, MongoDB operator injection, and extra
+    # client-supplied fields from reaching the database.
+    faculty_id_str = str(data["faculty_id"]).strip()
+    if not ObjectId.is_valid(faculty_id_str):
+        raise ValueError("Invalid faculty_id — must be a 24-character hex ObjectId")
+
+    try:
+        raw_batches = data.get("batches", [1])
+        # Accept both a list and a single integer
+        if not isinstance(raw_batches, list):
+            raw_batches = [raw_batches]
+        batches = [int(b) for b in raw_batches]
+
+        return {
+            "faculty_id":    faculty_id_str,
+            "year":          str(data["year"]).strip().upper(),
+            "division":      str(data.get("division", "A")).strip().upper(),
+            "subject":       str(data["subject"]).strip(),
+            "subject_full":  str(data.get("subject_full", data["subject"])).strip(),
+            "batches":       batches,
+            "theory_hrs":    int(data.get("theory_hrs", 0)),
+            "practical_hrs": int(data.get("practical_hrs", 2)),
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid field type: {e}") from e
+
+
+def duplicate_workload_message(doc: dict) -> str:
+    return (f"Workload entry already exists for faculty {doc['faculty_id']} — "
+            f"{doc['year']}-{doc['division']} {doc['subject']}. "
+            f"Use PUT /api/faculty_workload to update it.")
+
+
 # ---------- ADD FACULTY WORKLOAD ----------
 def add_faculty_workload(data):
     """
@@ -40,62 +89,24 @@ def add_faculty_workload(data):
     }
     """
     try:
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-
-        # Basic presence check before any processing
-        required_fields = ["faculty_id", "year", "subject"]
-        missing = [f for f in required_fields if f not in data]
-        if missing:
-            return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
-
-        # WH-01 FIX: build a sanitised document with explicit type casts instead
-        # of inserting the raw request dict.  This prevents string practical_hrs,
-        # comma-separated batch strings, MongoDB operator injection, and extra
-        # client-supplied fields from reaching the database.
         try:
-            faculty_id_str = str(data["faculty_id"]).strip()
-            if not ObjectId.is_valid(faculty_id_str):
-                return jsonify({"error": "Invalid faculty_id — must be a 24-character hex ObjectId"}), 400
-
-            raw_batches = data.get("batches", [1])
-            # Accept both a list and a single integer
-            if not isinstance(raw_batches, list):
-                raw_batches = [raw_batches]
-            batches = [int(b) for b in raw_batches]
-
-            sanitised = {
-                "faculty_id":    faculty_id_str,
-                "year":          str(data["year"]).strip().upper(),
-                "division":      str(data.get("division", "A")).strip().upper(),
-                "subject":       str(data["subject"]).strip(),
-                "subject_full":  str(data.get("subject_full", data["subject"])).strip(),
-                "batches":       batches,
-                "theory_hrs":    int(data.get("theory_hrs", 0)),
-                "practical_hrs": int(data.get("practical_hrs", 2)),
-            }
-        except (TypeError, ValueError) as e:
-            return jsonify({"error": f"Invalid field type: {e}"}), 400
-
-        # WH-02 FIX: reject duplicate (faculty_id, year, division, subject) before
-        # inserting.  Without this check a double-click or network retry creates two
-        # identical workload entries which the scheduler then queues twice.
-        existing = workload_collection.find_one({
-            "faculty_id": sanitised["faculty_id"],
-            "year":       sanitised["year"],
-            "division":   sanitised["division"],
-            "subject":    sanitised["subject"],
-        })
-        if existing:
-            return jsonify({
-                "error": (
-                    f"Workload entry already exists for faculty {sanitised['faculty_id']} — "
-                    f"{sanitised['year']}-{sanitised['division']} {sanitised['subject']}. "
-                    f"Use PUT /api/faculty_workload to update it."
-                )
-            }), 409
-
-        result = workload_collection.insert_one(sanitised)
+            sanitised = sanitise_workload(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # WH-02 FIX: reject duplicate (faculty_id, year, division, subject).
+        # Without this a double-click or network retry creates two identical
+        # workload entries which the scheduler then queues twice.  The unique
+        # index declared in db_indexes stops concurrent requests that both
+        # pass this check; the check itself still holds where that index is
+        # missing (see db_indexes — /readyz reports it).
+        if workload_collection.find_one({k: sanitised[k] for k in WORKLOAD_KEY}, {"_id": 1}):
+            return jsonify({"error": duplicate_workload_message(sanitised)}), 409
+        try:
+            result = workload_collection.insert_one(sanitised)
+        except DuplicateKeyError:
+            return jsonify({"error": duplicate_workload_message(sanitised)}), 409
+
         return jsonify({
             "message":     "Workload added successfully",
             "inserted_id": str(result.inserted_id)
@@ -181,10 +192,16 @@ def update_faculty_workload(data):
         if not update_data:
             return jsonify({"error": "No updatable fields provided"}), 400
 
-        result = workload_collection.update_one(
-            {"_id": ObjectId(workload_id)},
-            {"$set": update_data}
-        )
+        try:
+            result = workload_collection.update_one(
+                {"_id": ObjectId(workload_id)},
+                {"$set": update_data}
+            )
+        except DuplicateKeyError:
+            # WH-02: the edit would collide with another entry's
+            # (faculty_id, year, division, subject)
+            return jsonify({"error": "Another workload entry already exists for "
+                                     "this faculty, class and subject"}), 409
 
         if result.matched_count == 0:
             return jsonify({"error": "Workload not found"}), 404
@@ -0,0 +1,233 @@
+"""
+Offline timetable solver: runs the generation pipeline on JSON files.
+
+Reads the generation inputs from a directory of JSON dumps, runs the same
+pipeline as POST /api/regenerate_master_practical_timetable entirely in
+memory and writes the timetables out as JSON.  Needs no database — nothing
+is read from or written to Mongo — so it runs on a laptop or in CI:
+
+    python solve.py DATA_DIR [-o out.json] [--engine joint] [--sparse]
+                    [--repeat N] [--profile out.pstats] [-v]
+
+DATA_DIR holds faculty.json, labs.json, subjects.json, workload.json and,
+optionally, class_structure.json (any of them can be given separately with
+--faculty PATH etc.).  The formats are the collections' own, as test.py
+prints them or `mongoexport --jsonArray` writes them:
+
+    faculty.json          [{"_id": "...", "name": ..., "short_name": ...}, …]
+                          _id is required: workload rows reference it
+    labs.json             [{"name": "DBMS Lab"}, …]   (or ["DBMS Lab", …])
+    subjects.json         {"SY": [...], "TY": [...], "BE": [...]}
+                          (or one list of subjects with a "year" field)
+    workload.json         [{"faculty_id": ..., "year": ..., "division": ...,
+                            "subject": ..., "batches": [...], ...}, …]
+    class_structure.json  {"sy": [{"div": "A", "batches": 2}, …], …}
+                          not used by the generators; workload rows that do
+                          not fit it are reported as warnings
+
+Timings go to stderr; the output JSON carries them too.  --repeat runs the
+generation N times (inputs loaded once) for benchmarking; --profile writes
+cProfile stats of the last run.
+"""
+
+import argparse
+import cProfile
+import logging
+import os
+import statistics
+import sys
+import time
+
+from bson import json_util
+
+from modules import joint_tt_generator
+from modules.input_snapshot import YEARS, InputSnapshot
+from modules.persistence import CaptureWriter
+from modules.responses import dumps_bytes
+from modules.schedule_format import read_doc
+from modules.whatif import run_staged
+
+INPUT_FILES = ('faculty', 'labs', 'subjects', 'workload', 'class_structure')
+TIMETABLE_COLLECTIONS = ('master_lab_timetable', 'class_timetable', 'faculty_timetable')
+SESSIONS_COLLECTION = 'timetable_sessions'
+
+
+# ── Inputs ───────────────────────────────────────────────────────────────────
+
+def _read_json(path: str):
+    # json_util: accepts mongoexport's {"$oid": …} / {"$date": …} as well
+    with open(path, encoding='utf-8') as f:
+        return json_util.loads(f.read())
+
+
+def _input_paths(args) -> dict:
+    paths = {}
+    for name in INPUT_FILES:
+        path = getattr(args, name)
+        if path is None and args.data_dir:
+            path = os.path.join(args.data_dir, f'{name}.json')
+        paths[name] = path
+    missing = [n for n in INPUT_FILES[:-1]
+               if not paths[n] or not os.path.exists(paths[n])]
+    if missing:
+        raise SystemExit(f"Missing input file(s): {', '.join(missing)}")
+    if paths['class_structure'] and not os.path.exists(paths['class_structure']):
+        paths['class_structure'] = None
+    return paths
+
+
+def _subjects_by_year(raw) -> dict:
+    if isinstance(raw, dict):
+        return {yr: list(raw.get(yr) or []) for yr in YEARS}
+    return {yr: [s for s in raw if s.get('year') == yr] for yr in YEARS}
+
+
+def _structure_warnings(structure: dict, workloads: list) -> list:
+    """Workload rows whose division or batches the class structure lacks."""
+    divisions = {(yr.upper(), str(d.get('div', '')).upper()): d.get('batches')
+                 for yr, divs in structure.items() if isinstance(divs, list)
+                 for d in divs}
+    warnings = []
+    for w in workloads:
+        key = (str(w.get('year', '')).upper(), str(w.get('division', '')).upper())
+        if key not in divisions:
+            warnings.append(f"{w.get('subject')} {'-'.join(key)}: division not in "
+                            f"class structure")
+            continue
+        batches = divisions[key]
+        extra = [b for b in w.get('batches') or []
+                 if isinstance(batches, int) and str(b).isdigit() and int(b) > batches]
+        if extra:
+            warnings.append(f"{w.get('subject')} {'-'.join(key)}: batch(es) {extra} "
+                            f"beyond the {batches} in class structure")
+    return warnings
+
+
+def load_inputs(paths: dict) -> tuple[InputSnapshot, list]:
+    faculty = _read_json(paths['faculty'])
+    unkeyed = [f.get('name') for f in faculty if '_id' not in f]
+    if unkeyed:
+        raise SystemExit(f"{len(unkeyed)} faculty without _id (workload rows reference "
+                         f"faculty by _id): {unkeyed[:5]}")
+    labs = [{'name': lab} if isinstance(lab, str) else lab
+            for lab in _read_json(paths['labs'])]
+    workloads = _read_json(paths['workload'])
+    inputs = InputSnapshot(faculty=faculty, labs=labs,
+                           subjects=_subjects_by_year(_read_json(paths['subjects'])),
+                           workloads=workloads)
+    warnings = []
+    if paths['class_structure']:
+        warnings = _structure_warnings(_read_json(paths['class_structure']), workloads)
+    return inputs, warnings
+
+
+# ── Generation ───────────────────────────────────────────────────────────────
+
+def generate(inputs: InputSnapshot, engine: str) -> tuple[dict, CaptureWriter]:
+    writer = CaptureWriter()
+    if engine == 'joint':
+        result = joint_tt_generator.generate(None, inputs, writer)
+    else:
+        result = run_staged(inputs, writer)
+    return result, writer
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate timetables from JSON files, "
+                                                 "without a database.")
+    parser.add_argument('data_dir', nargs='?', help="directory with the input JSON files")
+    for name in INPUT_FILES:
+        parser.add_argument(f'--{name}', metavar='PATH', help=f"{name} JSON file")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--engine', choices=('staged', 'joint'), default='staged')
+    parser.add_argument('--sparse', action='store_true',
+                        help="write timetables in the sparse schedule form")
+    parser.add_argument('--repeat', type=int, default=1, metavar='N',
+                        help="run the generation N times and report each timing")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write cProfile stats of the last run to PATH")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="show the generators' progress logging")
+    args = parser.parse_args(argv)
+
+    # force: the generator modules configure INFO logging on import
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        stream=sys.stderr, force=True)
+
+    started = time.perf_counter()
+    inputs, warnings = load_inputs(_input_paths(args))
+    load_time = time.perf_counter() - started
+    for w in warnings:
+        print(f"warning: {w}", file=sys.stderr)
+
+    repeat = max(1, args.repeat)
+    runs = []
+    for i in range(repeat):
+        profiler = cProfile.Profile() if args.profile and i == repeat - 1 else None
+        t = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        result, writer = generate(inputs, args.engine)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        runs.append(time.perf_counter() - t)
+
+    if not result.get('success'):
+        print(f"Generation failed: {result.get('error') or result.get('message', '')}",
+              file=sys.stderr)
+        return 1
+
+    leftovers = result.get('leftovers', {})
+    lecture_leftovers = result.get('lecture_leftovers', {})
+    timing = {
+        'load_ms':     _ms(load_time),
+        'generate_ms': [_ms(r) for r in runs],
+    }
+    if len(runs) > 1:
+        timing.update(min_ms=_ms(min(runs)), median_ms=_ms(statistics.median(runs)))
+
+    t = time.perf_counter()
+    body = dumps_bytes({
+        'engine':               args.engine,
+        'practicals_scheduled': result.get('practicals_scheduled', 0),
+        'lectures_scheduled':   result.get('lectures_scheduled', 0),
+        'leftover_counts': {
+            'practical': sum(len(v) for v in leftovers.values()),
+            'lecture':   sum(len(v) for v in lecture_leftovers.values()),
+        },
+        'practical_leftovers':  leftovers,
+        'lecture_leftovers':    lecture_leftovers,
+        'unresolved_subjects':  result.get('unresolved_subjects', []),
+        'warnings':             warnings,
+        'timing':               timing,
+        'timetables': {
+            name: [read_doc(doc, args.sparse) for doc in writer.docs[name][0]]
+            for name in TIMETABLE_COLLECTIONS if name in writer.docs
+        },
+        'sessions':             writer.docs.get(SESSIONS_COLLECTION, ([],))[0],
+    }, indent=True)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(body)
+    else:
+        sys.stdout.buffer.write(body + b'\n')
+    write_time = time.perf_counter() - t
+
+    leftover_total = sum(len(v) for v in leftovers.values()) + \
+        sum(len(v) for v in lecture_leftovers.values())
+    runs_note = f" (median of {len(runs)})" if len(runs) > 1 else ""
+    print(f"✓ {args.engine}: {result.get('practicals_scheduled', 0)} practicals, "
+          f"{result.get('lectures_scheduled', 0)} lectures, {leftover_total} left over; "
+          f"load {timing['load_ms']} ms, generate "
+          f"{timing.get('median_ms', timing['generate_ms'][0])} ms{runs_note}, "
+          f"write {_ms(write_time)} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,7 @@ to debug what's in your database
 """
 
 from config import db
+from modules.subjects_handler import subjects_by_year
 import json
 
 # Check subjects collection
@@ -11,8 +12,8 @@ print("=" * 60)
 print("SUBJECTS COLLECTION")
 print("=" * 60)
 
-subjects_doc = db['subjects'].find_one({})
-if subjects_doc:
+subjects_doc = subjects_by_year()
+if any(subjects_doc.values()):
     print(json.dumps(subjects_doc, indent=2, default=str))
 else:
     print("NO SUBJECTS FOUND!")
@@ -0,0 +1,83 @@
+"""
+Shared fixtures.  The suite runs the app against the memory storage
+backend (mongomock, modules/storage.py), so it needs no MongoDB:
+
+    cd Backend && python -m pip install -r requirements-dev.txt
+    python -m pytest tests
+
+Every test starts from an empty database with the app's indexes in place;
+`seeded` fills it with bench_engines' synthetic institution.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Before config / response_snapshot are imported: both read these once
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ['TIMETABLE_SNAPSHOT_PATH'] = os.path.join(
+    tempfile.mkdtemp(prefix='timetable-tests-'), 'timetables.snap')
+
+import pytest
+from bson import ObjectId
+
+import config
+from bench_engines import build_dataset
+
+
+def reset_database():
+    """Empty every collection and drop every per-process cache of it."""
+    from app import startup
+    from modules import response_snapshot, timetable_cache, timetable_export
+
+    db = config.get_db()
+    for name in db.list_collection_names():
+        db.drop_collection(name)
+    startup()
+    timetable_cache._cache.clear()
+    timetable_cache._confirmed = (None, 0.0)
+    timetable_export._cache.clear()
+    try:
+        os.remove(response_snapshot.SNAPSHOT_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def seed_database(seed: int = 1) -> dict:
+    """Insert bench_engines.build_dataset(seed); returns the dataset."""
+    data = build_dataset(seed)
+    db = config.get_db()
+    db['faculty'].insert_many([{**f, '_id': ObjectId(f['_id'])} for f in data['faculty']])
+    db['labs'].insert_many([dict(lab) for lab in data['labs']])
+    db['subject'].insert_many([{**s, 'year': yr}
+                               for yr, subjects in data['subjects'].items()
+                               for s in subjects])
+    db['workload'].insert_many([dict(w) for w in data['workload']])
+    db['class_structure'].insert_one(dict(data['class_structure']))
+    return data
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    app.config.update(TESTING=True)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clean_database(app):
+    reset_database()
+    yield
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded():
+    return seed_database()
@@ -0,0 +1,76 @@
+"""Bulk imports: status mapping, CSV coercion and per-row duplicate errors."""
+
+import io
+
+import config
+from modules import bulk_import
+
+
+def _labs(*names):
+    return [{'name': n, 'short_name': n[:2]} for n in names]
+
+
+def test_status_is_201_207_or_400(client):
+    response = client.post('/api/labs/bulk', json=_labs('Lab A', 'Lab B'))
+    assert response.status_code == 201
+    assert response.get_json() == {'inserted': 2, 'failed': 0, 'errors': []}
+
+    response = client.post('/api/labs/bulk', json=[*_labs('Lab C', 'Lab C'), {'name': 'x'}])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['inserted'] == 1
+    assert [e['row'] for e in body['errors']] == [2, 3]
+    assert body['errors'][0]['error'] == 'Duplicate of row 1'
+
+    response = client.post('/api/labs/bulk', json=_labs('Lab A'))
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'row': 1, 'error': "Lab 'Lab A' already exists"}]
+
+    assert client.post('/api/labs/bulk', json={'name': 'Lab D'}).status_code == 400
+
+
+def test_csv_rows_are_coerced(client, seeded):
+    faculty_id = str(config.get_db()['faculty'].find_one({})['_id'])
+    workload = (
+        'faculty_id,year,division,subject,batches,theory_hrs\n'
+        f'{faculty_id},ty,b,NEW1,1;2 3,\n'
+        f'{faculty_id},ty,b,NEW2,,3\n'
+    )
+    response = client.post('/api/faculty_workload/bulk', data=workload,
+                           content_type='text/csv')
+    assert response.status_code == 201, response.get_json()
+    # Empty cells fall back to the single-row defaults
+    rows = {w['subject']: w for w in config.get_db()['workload'].find(
+        {'subject': {'$in': ['NEW1', 'NEW2']}})}
+    assert rows['NEW1']['batches'] == [1, 2, 3] and rows['NEW1']['theory_hrs'] == 0
+    assert rows['NEW2']['batches'] == [1] and rows['NEW2']['theory_hrs'] == 3
+    assert rows['NEW1']['year'] == 'TY' and rows['NEW1']['division'] == 'B'
+
+    # Excel's UTF-8 BOM; typed cells converted, bad ones reported per row
+    subjects = (
+        '\ufeffyear,name,short_name,hrs_per_week_lec,hrs_per_week_practical,'
+        'practical_duration,practical_type\n'
+        'sy,Graphs,GR,3,2,2,Common Lab\n'
+        'sy,Bad,BD,three,2,2,Common Lab\n'
+    )
+    upload = (io.BytesIO(subjects.encode('utf-8')), 'subjects.csv')
+    response = client.post('/api/subjects/bulk', data={'file': upload},
+                           content_type='multipart/form-data')
+    assert response.status_code == 207
+    assert response.get_json()['errors'] == [
+        {'row': 2, 'error': 'Invalid field type: hrs_per_week_lec must be an integer'}]
+    stored = config.get_db()['subject'].find_one({'short_name': 'GR'})
+    assert stored['hrs_per_week_lec'] == 3 and stored['practical_duration'] == 2
+
+
+def test_rows_added_concurrently_map_to_their_rows(client, monkeypatch):
+    client.post('/api/labs/bulk', json=_labs('Lab B'))
+    # Lab B stored after this import's existence check: the unique index
+    # rejects it inside the bulk write
+    monkeypatch.setattr(bulk_import, '_skip_existing',
+                        lambda coll, fields, docs, rows, message, errors: (docs, rows))
+    response = client.post('/api/labs/bulk', json=_labs('Lab A', 'Lab B', 'Lab C'))
+    assert response.status_code == 207
+    assert response.get_json() == {
+        'inserted': 2, 'failed': 1,
+        'errors': [{'row': 2, 'error': "Lab 'Lab B' already exists"}]}
@@ -0,0 +1,22 @@
+"""Resuming the staged pipeline from stage checkpoints."""
+
+from modules import checkpoints
+
+
+def _stages(client, **options):
+    response = client.post('/api/regenerate_master_practical_timetable', json=options)
+    assert response.status_code in (200, 206), response.get_json()
+    return response.get_json()['stages']
+
+
+def test_unchanged_inputs_resume_every_stage(client, seeded):
+    assert set(_stages(client).values()) == {'computed'}
+    assert set(_stages(client).values()) == {'resumed'}
+    assert set(_stages(client, resume=False).values()) == {'computed'}
+
+
+def test_changed_generator_code_recomputes(client, seeded, monkeypatch):
+    _stages(client)
+    monkeypatch.setattr(checkpoints, 'CODE_FINGERPRINT', 'after-a-deploy')
+    assert set(_stages(client).values()) == {'computed'}
+    assert set(_stages(client).values()) == {'resumed'}
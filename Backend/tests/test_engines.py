@@ -0,0 +1,67 @@
+"""
+Both engines on the benchmark datasets: whatever they schedule must be a
+valid timetable — no faculty, lab, batch or class double-booked, nobody
+teaching a subject they are not assigned, no subject over its weekly hours.
+"""
+
+import logging
+from collections import Counter
+
+import pytest
+
+from bench_engines import ENGINES, build_dataset
+from modules.input_snapshot import InputSnapshot
+from solve import generate
+
+SEEDS = range(1, 6)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def quiet_generators():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _clashes(counter: Counter) -> list:
+    return [key for key, n in counter.items() if n > 1]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_schedule_has_no_clashes_or_excess_hours(seed, engine):
+    data = build_dataset(seed)
+    inputs = InputSnapshot(faculty=data['faculty'], labs=data['labs'],
+                           subjects=data['subjects'], workloads=data['workload'])
+    result, writer = generate(inputs, engine)
+    assert result['success']
+    sessions = writer.docs['timetable_sessions'][0]
+    assert sessions
+
+    # One session document per (division/batch, day, hour slot)
+    def at(s):
+        return s['day_idx'], s['slot']
+
+    assert not _clashes(Counter((s['faculty_id'], *at(s)) for s in sessions))
+    assert not _clashes(Counter((s['lab'], *at(s)) for s in sessions if s['lab']))
+    assert not _clashes(Counter((s['class'], s['division'], s['batch'], *at(s))
+                                for s in sessions))
+    # A division in a lecture has none of its batches in a practical
+    lectures = {(s['class'], s['division'], *at(s)) for s in sessions if s['batch'] is None}
+    assert not [s for s in sessions if s['batch'] is not None
+                and (s['class'], s['division'], *at(s)) in lectures]
+
+    assigned = {(w['year'], w['division'], w['subject']): w['faculty_id']
+                for w in data['workload']}
+    assert all(assigned[(s['class'], s['division'], s['subject'])] == s['faculty_id']
+               for s in sessions)
+
+    subjects = {s['short_name']: s for year in data['subjects'].values() for s in year}
+    lecture_hours = Counter((s['class'], s['division'], s['subject'])
+                            for s in sessions if s['type'] == 'lecture')
+    practical_hours = Counter((s['class'], s['division'], s['batch'], s['subject'])
+                              for s in sessions if s['type'] == 'practical')
+    assert all(hours <= subjects[key[-1]]['hrs_per_week_lec']
+               for key, hours in lecture_hours.items())
+    assert all(hours <= subjects[key[-1]]['hrs_per_week_practical']
+               for key, hours in practical_hours.items())
@@ -0,0 +1,42 @@
+"""Generation and what-if pools, and how single_flight treats a busy pool."""
+
+import threading
+
+from modules import generation_pool, single_flight
+
+
+def test_whatif_does_not_take_the_generation_slot(app):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_dry_run():
+        started.set()
+        release.wait(10)
+        return 'dry', 200
+
+    def dry_request():
+        with app.test_request_context():
+            generation_pool.run_dry(slow_dry_run)
+
+    thread = threading.Thread(target=dry_request)
+    thread.start()
+    try:
+        assert started.wait(5)
+        with app.test_request_context():
+            assert generation_pool.run(lambda: ('generated', 200)) == ('generated', 200)
+            response, status = generation_pool.run_dry(lambda: ('dry', 200))
+        assert status == 503 and 'Retry-After' in response.headers
+    finally:
+        release.set()
+        thread.join(10)
+
+
+def test_busy_result_is_not_shared(app):
+    with app.test_request_context():
+        busy = single_flight.run('key', lambda: ({'error': 'busy'}, 503))
+    assert busy.status_code == 503
+    assert single_flight.runs_collection.count_documents({}) == 0
+
+    with app.test_request_context():
+        done = single_flight.run('key', lambda: ({'ok': True}, 200))
+    assert done.status_code == 200
+    assert single_flight.runs_collection.count_documents({'key': 'key'}) == 1
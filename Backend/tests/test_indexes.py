@@ -0,0 +1,60 @@
+"""The unique indexes as constraints: handler status codes and readiness."""
+
+import pytest
+
+import config
+from modules import faculty_handler, labs_handler
+
+
+@pytest.mark.parametrize('path, handler, collection', [
+    ('/api/faculty', faculty_handler, 'faculty_collection'),
+    ('/api/labs', labs_handler, 'labs_collection'),
+])
+def test_name_collisions_are_409(client, monkeypatch, path, handler, collection):
+    first = client.post(path, json={'name': 'One', 'short_name': 'O'}).get_json()['_id']
+    client.post(path, json={'name': 'Two', 'short_name': 'T'})
+
+    renamed = client.put(path, json={'_id': first, 'updates': {'name': 'Two'}})
+    assert renamed.status_code == 409
+    assert renamed.get_json()['error'].endswith("'Two' already exists")
+
+    # A concurrent add that passed the find_one check before this one's insert
+    class Raced:
+        def __init__(self, coll):
+            self._coll = coll
+
+        def find_one(self, *args, **kwargs):
+            return None
+
+        def __getattr__(self, name):
+            return getattr(self._coll, name)
+
+    monkeypatch.setattr(handler, collection, Raced(getattr(handler, collection)))
+    raced = client.post(path, json={'name': 'Two', 'short_name': 'T2'})
+    assert raced.status_code == 409
+    assert raced.get_json()['error'].endswith("'Two' already exists")
+
+
+def _without_indexes(name: str) -> dict:
+    """Recreate collection `name` without its indexes, as if startup() never ran."""
+    coll = config.get_db()[name]
+    docs = list(coll.find({}))
+    config.get_db().drop_collection(name)
+    if docs:
+        coll.insert_many(docs)
+    return coll
+
+
+def test_duplicate_workload_without_the_index(client, seeded):
+    row = _without_indexes('workload').find_one({}, {'_id': 0})
+    response = client.post('/api/faculty_workload', json=row)
+    assert response.status_code == 409
+    assert config.get_db()['workload'].count_documents(row) == 1
+
+
+def test_not_ready_while_a_unique_index_is_missing(client):
+    assert client.get('/readyz').status_code == 200
+    _without_indexes('workload')
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['missing_unique_indexes'] == {'workload': ['assignment_unique']}
@@ -0,0 +1,95 @@
+"""Single-flight regeneration: shared results, queueing and the waiter cap."""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import config
+from modules import single_flight
+from modules.input_snapshot import InputSnapshot
+
+
+def _hold_lease(holder: str, key: str):
+    """A run of another worker holding the lease."""
+    single_flight.meta_collection.replace_one(
+        {'_id': single_flight.LEASE_ID},
+        {'holder': holder, 'key': key,
+         'expires_at': datetime.now(timezone.utc) + timedelta(minutes=5)},
+        upsert=True)
+
+
+def _store_result(holder: str, key: str, body: bytes = b'{"shared": true}'):
+    single_flight.runs_collection.insert_one({
+        '_id': holder, 'key': key, 'status': 200, 'mimetype': 'application/json',
+        'body': body, 'finished_at': datetime.now(timezone.utc),
+    })
+
+
+@pytest.fixture
+def short_wait(monkeypatch):
+    monkeypatch.setattr(single_flight, 'WAIT_SECONDS', 1)
+    monkeypatch.setattr(single_flight, 'POLL_SECONDS', 0.05)
+
+
+def test_key_covers_options_and_inputs():
+    key = single_flight.request_key({}, 'inputs-a')
+    assert key == single_flight.request_key({'engine': 'staged', 'resume': True}, 'inputs-a')
+    assert key != single_flight.request_key({}, 'inputs-b')
+    assert key != single_flight.request_key({'engine': 'joint'}, 'inputs-a')
+
+
+def test_same_inputs_share_the_running_result(client, seeded, short_wait):
+    key = single_flight.request_key({}, InputSnapshot.load().fingerprint)
+    _hold_lease('other-run', key)
+    _store_result('other-run', key)
+
+    response = client.post('/api/regenerate_master_practical_timetable', json={})
+    assert response.status_code == 200
+    assert response.headers['X-Generation-Shared'] == 'true'
+    assert response.get_json() == {'shared': True}
+
+
+def test_edited_inputs_do_not_share_the_running_result(client, seeded, short_wait):
+    key = single_flight.request_key({}, InputSnapshot.load().fingerprint)
+    _hold_lease('other-run', key)
+    _store_result('other-run', key)
+
+    config.get_db()['workload'].delete_one({'division': 'A', 'year': 'SY'})
+    response = client.post('/api/regenerate_master_practical_timetable', json={})
+    # Queued behind the other run, which outlasts the wait
+    assert response.status_code == 503
+    assert 'X-Generation-Shared' not in response.headers
+
+
+def test_waiters_per_process_are_capped(app, monkeypatch):
+    monkeypatch.setattr(single_flight, 'POLL_SECONDS', 0.05)
+    _hold_lease('other-run', 'other-key')
+    ran = threading.Event()
+    results = []
+
+    def waiter():
+        with app.test_request_context():
+            results.append(single_flight.run('my-key', lambda: ('done', 200)))
+            ran.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    try:
+        # Let the first request settle into waiting, then ask again
+        deadline = time.monotonic() + 5
+        while single_flight._waiters._value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with app.test_request_context():
+            response, status = single_flight.run('my-key', lambda: ('done', 200))
+        assert status == 503
+        assert response.headers['Retry-After'] == str(single_flight.RETRY_AFTER_SECONDS)
+        assert not ran.is_set()
+    finally:
+        single_flight.meta_collection.update_one(
+            {'_id': single_flight.LEASE_ID}, {'$set': {'holder': None, 'expires_at': None}})
+        thread.join(timeout=10)
+
+    assert ran.is_set()
+    assert results[0].get_data() == b'done'
@@ -0,0 +1,178 @@
+"""
+The storage backends against each other: SQLite keeps documents and runs
+each call through mongomock, and must behave as the memory backend (plain
+mongomock) does, both for the Collection API directly and for the app's
+CRUD → regenerate → resume → rollback flow on top of it.
+"""
+
+from datetime import datetime
+
+import pytest
+from pymongo import DESCENDING, ReplaceOne, UpdateOne, InsertOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import config
+from conftest import reset_database, seed_database
+
+BACKENDS = ('memory', 'sqlite')
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path):
+    """config.db switched to one backend for the test, then back to memory."""
+    saved = (config.STORAGE_BACKEND, config.SQLITE_PATH)
+    config.STORAGE_BACKEND = request.param
+    config.SQLITE_PATH = str(tmp_path / 'timetable.sqlite3')
+    config.close_client()
+    reset_database()
+    yield request.param
+    config.close_client()
+    config.STORAGE_BACKEND, config.SQLITE_PATH = saved
+    reset_database()
+
+
+@pytest.fixture
+def coll(backend):
+    return config.get_db()['items']
+
+
+# ── Collection API ───────────────────────────────────────────────────────────
+
+def test_find_filters_projection_sort(coll):
+    coll.insert_many([
+        {'_id': i, 'n': i, 'tag': 'even' if i % 2 == 0 else 'odd',
+         'tags': ['a', 'b'] if i < 3 else ['c'], 'sub': {'k': i * 10}}
+        for i in range(6)
+    ])
+    assert [d['_id'] for d in coll.find({'n': {'$gte': 2, '$lt': 5}}).sort('n', DESCENDING)] \
+        == [4, 3, 2]
+    assert coll.count_documents({'tags': 'a'}) == 3
+    assert coll.count_documents({'sub.k': {'$in': [10, 50]}}) == 2
+    assert coll.count_documents({'$or': [{'n': 0}, {'tag': 'odd'}]}) == 4
+    assert coll.count_documents({'missing': None}) == 6
+    assert coll.count_documents({'tag': {'$regex': '^ev'}}) == 3
+    assert coll.find_one({'n': 3}, {'_id': 0, 'tag': 1}) == {'tag': 'odd'}
+    assert sorted(coll.distinct('tag')) == ['even', 'odd']
+    assert [d['n'] for d in coll.find({}, sort=[('tag', 1), ('n', -1)], skip=1, limit=2)] \
+        == [2, 0]
+
+
+def test_updates_and_upserts(coll):
+    coll.insert_one({'_id': 'a', 'n': 1, 'list': []})
+    coll.update_one({'_id': 'a'}, {'$inc': {'n': 2}, '$push': {'list': 'x'},
+                                   '$set': {'sub.k': True}})
+    assert coll.find_one({'_id': 'a'}) == {'_id': 'a', 'n': 3, 'list': ['x'],
+                                           'sub': {'k': True}}
+    result = coll.update_one({'_id': 'b'}, {'$setOnInsert': {'n': 0}, '$set': {'m': 1}},
+                             upsert=True)
+    assert result.upserted_id == 'b'
+    assert coll.find_one({'_id': 'b'}) == {'_id': 'b', 'n': 0, 'm': 1}
+    coll.replace_one({'_id': 'a'}, {'n': 9})
+    assert coll.find_one({'_id': 'a'}) == {'_id': 'a', 'n': 9}
+    assert coll.delete_many({'n': {'$exists': True}}).deleted_count == 2
+
+    after = coll.find_one_and_update({'_id': 'lease', 'holder': None},
+                                     {'$set': {'holder': 'me'}}, upsert=True,
+                                     return_document=True)
+    assert after['holder'] == 'me'
+    with pytest.raises(DuplicateKeyError):
+        # Taken: the filter misses and the upsert collides on _id
+        coll.find_one_and_update({'_id': 'lease', 'holder': None},
+                                 {'$set': {'holder': 'you'}}, upsert=True)
+
+
+def test_unique_indexes_treat_missing_and_null_alike(coll):
+    coll.create_index('name', unique=True)
+    coll.insert_one({'x': 1})
+    with pytest.raises(DuplicateKeyError):
+        coll.insert_one({'x': 2})
+    with pytest.raises(DuplicateKeyError):
+        coll.insert_one({'name': None})
+
+    pairs = config.get_db()['pairs']
+    pairs.create_index([('a', 1), ('b', 1)], unique=True)
+    pairs.insert_many([{'a': 1, 'b': None}, {'a': 1, 'b': 2}, {'a': 2}])
+    with pytest.raises(DuplicateKeyError):
+        pairs.insert_one({'a': 1})
+    with pytest.raises(DuplicateKeyError):
+        pairs.update_one({'a': 1, 'b': 2}, {'$unset': {'b': ''}})
+    assert pairs.count_documents({}) == 3
+
+
+def test_bulk_write_reports_each_failure(coll):
+    coll.create_index('name', unique=True)
+    coll.insert_one({'_id': 1, 'name': 'a'})
+    with pytest.raises(BulkWriteError) as raised:
+        coll.bulk_write([
+            InsertOne({'_id': 2, 'name': 'b'}),
+            InsertOne({'_id': 3, 'name': 'a'}),
+            UpdateOne({'_id': 1}, {'$set': {'v': 1}}),
+            ReplaceOne({'name': 'c'}, {'name': 'c'}, upsert=True),
+        ], ordered=False)
+    details = raised.value.details
+    assert [(e['index'], e['code']) for e in details['writeErrors']] == [(1, 11000)]
+    assert (details['nInserted'], details['nModified'], details['nUpserted']) == (1, 1, 1)
+    assert sorted(coll.distinct('name')) == ['a', 'b', 'c']
+
+
+def test_rename_keeps_documents_and_indexes(backend):
+    db = config.get_db()
+    db['old'].create_index('k', unique=True)
+    db['old'].insert_one({'k': 1, 'at': datetime(2026, 1, 1)})
+    db['old'].rename('new')
+    assert db['old'].count_documents({}) == 0
+    assert db['new'].find_one({}, {'_id': 0}) == {'k': 1, 'at': datetime(2026, 1, 1)}
+    assert 'k_1' in db['new'].index_information()
+    with pytest.raises(DuplicateKeyError):
+        db['new'].insert_one({'k': 1})
+
+
+# ── The app on each backend ──────────────────────────────────────────────────
+
+def _regenerate(client, **options):
+    response = client.post('/api/regenerate_master_practical_timetable', json=options)
+    assert response.status_code in (200, 206), response.get_json()
+    return response.get_json()
+
+
+def test_crud_regenerate_resume_rollback(backend, client):
+    seed_database()
+
+    # CRUD through the handlers
+    lab = {'name': 'Lab X', 'short_name': 'LX'}
+    lab_id = client.post('/api/labs', json=lab).get_json()['_id']
+    assert client.post('/api/labs', json=lab).status_code == 400
+    assert client.put('/api/labs', json={'_id': lab_id,
+                                         'updates': {'short_name': 'LY'}}).status_code == 200
+    labs = {l['name']: l for l in client.get('/api/labs').get_json()}
+    assert labs['Lab X']['short_name'] == 'LY' and labs['Lab X']['_id'] == lab_id
+    assert client.delete('/api/labs', json={'_id': lab_id}).status_code == 200
+    assert client.delete('/api/labs', json={'_id': lab_id}).status_code == 404
+
+    first = _regenerate(client)
+    assert set(first['stages'].values()) == {'computed'}
+    assert first['version'] == 1
+    classes = client.get('/api/class_timetables').get_json()
+    assert classes['total'] == 9
+
+    # Same inputs: every stage resumes and nothing changes
+    again = _regenerate(client)
+    assert set(again['stages'].values()) == {'resumed'}
+    assert again['version'] == 1
+
+    # Change the inputs: a new version
+    config.get_db()['workload'].delete_many({'year': 'BE', 'division': 'C'})
+    changed = _regenerate(client)
+    assert changed['version'] == 2
+    assert client.get('/api/class_timetables').get_json()['total'] == 8
+    diff = client.get('/api/timetable_versions/1/diff/2').get_json()
+    assert {'collection': 'class_timetable', 'key': 'BE-C'} in diff['removed']
+
+    # Roll back to version 1: its documents again, recorded as version 3
+    rolled = client.post('/api/timetable_versions/1/rollback').get_json()
+    assert rolled['version']['_id'] == 3
+    restored = client.get('/api/timetable_versions/1/diff/3').get_json()
+    assert not (restored['added'] or restored['removed'] or restored['changed'])
+    assert client.get('/api/class_timetables').get_json()['total'] == 9
+    sessions = config.get_db()['timetable_sessions']
+    assert sessions.count_documents({'class': 'BE', 'division': 'C'}) > 0
@@ -0,0 +1,64 @@
+"""The subject collection and its migration from the legacy single document."""
+
+import config
+from modules import subjects_handler
+
+
+def _subject(short_name, name=None, **extra):
+    return {'name': name or short_name.lower(), 'short_name': short_name,
+            'hrs_per_week_lec': 3, 'hrs_per_week_practical': 2,
+            'practical_duration': 2, 'practical_type': 'Common Lab', **extra}
+
+
+def _legacy(**years):
+    config.get_db()['subjects'].insert_one(years)
+
+
+def _short_names(body: dict) -> dict:
+    return {yr: sorted(s['short_name'] for s in subjects) for yr, subjects in body.items()}
+
+
+def test_legacy_subjects_are_served_next_to_new_ones(client):
+    _legacy(sy=[_subject('DS'), _subject('OS')], ty=[_subject('CN')], be=[])
+    response = client.post('/api/subjects', json={**_subject('ML'), 'year': 'sy'})
+    assert response.status_code == 201
+    # Same year and short_name as a legacy subject: the new one wins
+    client.post('/api/subjects', json={**_subject('OS', 'Operating Systems'), 'year': 'sy'})
+
+    body = client.get('/api/subjects').get_json()
+    assert _short_names(body) == {'sy': ['DS', 'ML', 'OS'], 'ty': ['CN'], 'be': []}
+    assert [s['name'] for s in body['sy'] if s['short_name'] == 'OS'] == ['Operating Systems']
+
+    only = subjects_handler.subjects_by_year(['DS', 'CN'], ['short_name'])
+    assert _short_names(only) == {'sy': ['DS'], 'ty': ['CN'], 'be': []}
+
+
+def test_migration_copies_renames_and_drops_duplicates(client):
+    before = client.post('/api/subjects', json={**_subject('OS', 'Kept'), 'year': 'sy'})
+    assert before.status_code == 201
+    _legacy(sy=[_subject('DS'), _subject('DS', 'Second DS'), _subject('OS', 'Legacy OS')],
+            ty=[_subject('CN')], be=[_subject('ML')])
+
+    # DS's repeat and OS (already stored) stay in the backup only
+    assert subjects_handler.migrate_legacy_subjects() == 3
+    db = config.get_db()
+    assert 'subjects' not in db.list_collection_names()
+    backups = [n for n in db.list_collection_names() if n.startswith('subjects_legacy_')]
+    assert len(backups) == 1
+    assert len(db[backups[0]].find_one({})['sy']) == 3
+
+    body = client.get('/api/subjects').get_json()
+    assert _short_names(body) == {'sy': ['DS', 'OS'], 'ty': ['CN'], 'be': ['ML']}
+    names = {s['short_name']: s['name'] for s in body['sy']}
+    assert names == {'DS': 'ds', 'OS': 'Kept'}
+    assert db['subject'].find_one({'short_name': 'CN'})['year'] == 'ty'
+
+    # Nothing left to migrate
+    assert subjects_handler.migrate_legacy_subjects() == 0
+
+
+def test_duplicate_subject_is_409(client):
+    subject = {**_subject('DS'), 'year': 'sy'}
+    assert client.post('/api/subjects', json=subject).status_code == 201
+    assert client.post('/api/subjects', json=subject).status_code == 409
+    assert client.post('/api/subjects', json={**subject, 'year': 'ty'}).status_code == 201
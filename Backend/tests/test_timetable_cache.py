@@ -0,0 +1,117 @@
+"""Read responses served from the response snapshot and the version cache."""
+
+import json
+import os
+import threading
+import urllib.request
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+from werkzeug.wsgi import FileWrapper
+
+import config
+from modules import response_snapshot, timetable_cache
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(app):
+    """The app behind a real WSGI server, which accepts only bytes bodies."""
+    httpd = make_server('127.0.0.1', 0, app, handler_class=_QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _regenerate(client):
+    response = client.post('/api/regenerate_master_practical_timetable', json={})
+    assert response.status_code in (200, 206), response.get_json()
+    return response
+
+
+def test_snapshot_hit_through_wsgi_server(client, seeded, server):
+    _regenerate(client)
+    snap = response_snapshot.current()
+    assert snap is not None and snap.get('master_timetables') is not None
+
+    for encoding in ('identity', 'gzip'):
+        request = urllib.request.Request(f'{server}/api/master_timetables',
+                                         headers={'Accept-Encoding': encoding})
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            assert response.status == 200
+            assert int(response.headers['Content-Length']) == len(body)
+        if encoding == 'identity':
+            assert json.loads(body)['total'] > 0
+        else:
+            assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_snapshot_is_sent_from_its_file(client, seeded, monkeypatch):
+    _regenerate(client)
+    snapshot_inode = os.stat(response_snapshot.SNAPSHOT_PATH).st_ino
+    sent = []
+
+    class ServerFileWrapper(FileWrapper):
+        # What a sendfile()-capable server such as gunicorn is handed
+        def __init__(self, file, buffer_size=8192):
+            sent.append((os.fstat(file.fileno()).st_ino, file.tell()))
+            super().__init__(file, buffer_size)
+
+    first = client.get('/api/master_timetables')
+    # Trusted for SNAPSHOT_RECHECK_SECONDS: no version lookup per read
+    monkeypatch.setattr(timetable_cache, 'current_version', None)
+    response = client.get('/api/master_timetables',
+                          environ_base={'wsgi.file_wrapper': ServerFileWrapper})
+    assert response.data == first.data
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert sent and sent[0][0] == snapshot_inode and sent[0][1] > 0
+
+
+def test_snapshot_of_an_older_version_is_not_served(client, seeded, monkeypatch):
+    _regenerate(client)
+    assert client.get('/api/master_timetables').get_json()['total'] > 0
+
+    # Another host publishes a run; this host's snapshot file is not rewritten
+    config.get_db()['master_lab_timetable'].delete_many({})
+    timetable_cache.stamp_version()
+
+    # ...which this host notices once its snapshot is due for a recheck
+    monkeypatch.setattr(timetable_cache, 'SNAPSHOT_RECHECK_SECONDS', 0)
+    assert response_snapshot.current().version < timetable_cache.current_version()['version']
+    assert client.get('/api/master_timetables').get_json()['total'] == 0
+
+
+def test_not_modified_for_current_version(client, seeded, monkeypatch):
+    _regenerate(client)
+    first = client.get('/api/master_timetables')
+    again = client.get('/api/master_timetables',
+                       headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+    monkeypatch.setattr(timetable_cache, 'SNAPSHOT_RECHECK_SECONDS', 0)
+    timetable_cache.stamp_version()
+    assert client.get('/api/master_timetables',
+                      headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_run_that_changes_nothing_keeps_the_version(client, seeded):
+    _regenerate(client)
+    version = timetable_cache.current_version()['version']
+    etag = client.get('/api/master_timetables').headers['ETag']
+
+    _regenerate(client)
+    assert timetable_cache.current_version()['version'] == version
+    assert client.get('/api/master_timetables',
+                      headers={'If-None-Match': etag}).status_code == 304
+
+    # A run whose predecessor died mid-write stamps even if it saves nothing
+    timetable_cache.begin_writes()
+    _regenerate(client)
+    assert timetable_cache.current_version()['version'] == version + 1
@@ -0,0 +1,49 @@
+"""Server-side XLSX / CSV export and its per-version file cache."""
+
+import config
+from modules import timetable_cache, timetable_export
+
+
+def _regenerate(client):
+    response = client.post('/api/regenerate_master_practical_timetable', json={})
+    assert response.status_code in (200, 206), response.get_json()
+
+
+def test_export_formats_and_missing(client, seeded):
+    _regenerate(client)
+    csv = client.get('/api/export/class/sy/a?format=csv')
+    assert csv.status_code == 200
+    assert 'Class_Timetable_SY-DivA.csv' in csv.headers['Content-Disposition']
+    assert b'LUNCH BREAK' in csv.data
+
+    xlsx = client.get('/api/export/institution')
+    assert xlsx.status_code == 200 and xlsx.data[:2] == b'PK'
+
+    # Served again from the cache, under the same name
+    again = client.get('/api/export/class/SY/A?format=csv')
+    assert again.data == csv.data
+    assert again.headers['Content-Disposition'] == csv.headers['Content-Disposition']
+
+    assert client.get('/api/export/class/XX/Z?format=csv').status_code == 404
+    assert client.get('/api/export/lab/nope').status_code == 404
+    assert client.get('/api/export/class/SY/A?format=pdf').status_code == 400
+
+
+def test_run_publishing_mid_export_is_not_cached_as_new(client, seeded, monkeypatch):
+    _regenerate(client)
+    read_version = timetable_export.current_version
+
+    def publish_then_read():
+        # A run lands between this request's reads
+        config.get_db()['class_timetable'].update_one(
+            {'class': 'SY', 'division': 'A'}, {'$set': {'sessions': []}})
+        timetable_cache.stamp_version()
+        monkeypatch.setattr(timetable_export, 'current_version', read_version)
+        return read_version()
+
+    monkeypatch.setattr(timetable_export, 'current_version', publish_then_read)
+    client.get('/api/export/class/SY/A?format=csv').get_data()
+
+    served = client.get('/api/export/class/SY/A?format=csv').data
+    timetable_export._cache.clear()
+    assert served == client.get('/api/export/class/SY/A?format=csv').data
@@ -0,0 +1,18 @@
+"""
+Production entry point:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (gunicorn.conf.py) this module is imported once in the
+master: startup work (indexes, migrations) runs a single time and the
+workers fork from the already-imported app.  The master's Mongo client is
+closed before forking; every worker opens its own (config.py).
+"""
+
+from config import close_client
+from app import app, startup
+
+startup()
+close_client()
+
+__all__ = ['app']
@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { getClassTimetables } from "../services/classTimetableService";
+import { getFacultyTimetables } from "../services/facultyTimetableService";
 import { getFaculties } from "../services/facultyService";
 import { exportFacultyTimetable } from "../lib/excelExport";
 import {
@@ -38,13 +38,14 @@ export default function FacultyTimetables({
     setIsLoading(true);
     setError(null);
     try {
-      // Fetch both timetables and faculty details
+      // Fetch the per-faculty timetables (materialized at generation time)
+      // and faculty details
       const [res, facRes] = await Promise.all([
-        getClassTimetables(),
+        getFacultyTimetables(),
         getFaculties().catch(() => []), // Fallback to avoid complete failure if this API is down
       ]);
 
-      const classTimetables = res.timetables || res.data?.timetables || [];
+      const facultyTimetables = res.timetables || res.data?.timetables || [];
       const extractedData = {};
 
       // Map short names to full titles/names
@@ -60,8 +61,8 @@ export default function FacultyTimetables({
       // Collect all unique time slots from the actual data
       const timeSlotsSet = new Set();
 
-      classTimetables.forEach((ct) => {
-        const sched = ct.schedule || {};
+      facultyTimetables.forEach((ft) => {
+        const sched = ft.schedule || {};
         Object.values(sched).forEach((dayObj) => {
           Object.keys(dayObj).forEach((t) => timeSlotsSet.add(t));
         });
@@ -76,35 +77,23 @@ export default function FacultyTimetables({
       );
       setAllTimeSlots(combinedTimeSlots);
 
-      classTimetables.forEach((ct) => {
-        const className = ct.class_key;
-        const division = ct.division;
-        const schedule = ct.schedule || {};
+      facultyTimetables.forEach((ft) => {
+        const fac = ft.faculty;
+        if (!fac) return;
+        if (!extractedData[fac]) extractedData[fac] = {};
 
-        Object.entries(schedule).forEach(([day, times]) => {
+        Object.entries(ft.schedule || {}).forEach(([day, times]) => {
           Object.entries(times).forEach(([time, sessions]) => {
-            sessions.forEach((session) => {
-              if (!session.faculty) return;
-
-              const faculties = session.faculty.split(",").map((f) => f.trim());
-
-              faculties.forEach((fac) => {
-                if (!fac) return;
-                if (!extractedData[fac]) extractedData[fac] = {};
-                if (!extractedData[fac][day]) extractedData[fac][day] = {};
-                if (!extractedData[fac][day][time])
-                  extractedData[fac][day][time] = [];
-
-                extractedData[fac][day][time].push({
-                  class_key: className,
-                  division: division,
-                  subject: session.subject,
-                  batch: session.batch,
-                  lab: session.lab,
-                  isPractical: !!session.lab,
-                });
-              });
-            });
+            if (!sessions.length) return;
+            if (!extractedData[fac][day]) extractedData[fac][day] = {};
+            extractedData[fac][day][time] = sessions.map((session) => ({
+              class_key: session.class_key,
+              division: session.division,
+              subject: session.subject,
+              batch: session.batch,
+              lab: session.lab,
+              isPractical: !!session.lab,
+            }));
           });
         });
       });
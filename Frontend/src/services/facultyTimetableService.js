@@ -0,0 +1,23 @@
+import api from '../lib/api';
+
+// ---------- GET ALL FACULTY TIMETABLES ----------
+export const getFacultyTimetables = async () => {
+  try {
+    const res = await api.get('/faculty_timetables');
+    return res;
+  } catch (err) {
+    console.error('Error fetching faculty timetables:', err);
+    throw err;
+  }
+};
+
+// ---------- GET ONE FACULTY TIMETABLE ----------
+export const getFacultyTimetable = async (facultyId) => {
+  try {
+    const res = await api.get(`/faculty_timetable/${facultyId}`);
+    return res;
+  } catch (err) {
+    console.error('Error fetching faculty timetable:', err);
+    throw err;
+  }
+};